@@ -0,0 +1,189 @@
+"""
+Analysis Pipeline - process pool for ResponseAnalyzer decoupled from network I/O
+Generation results are submitted to a bounded queue consumed by worker
+processes, so regex work on long responses never holds the GIL of the
+request loop. Responses above a size threshold are handed over through
+shared memory instead of being pickled. A full queue blocks (or, from
+asyncio, delays) the request stage: memory stays bounded.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import metrics
+from response_analyzer import ResponseAnalyzer
+
+
+SHM_THRESHOLD = 64 * 1024       # bytes; smaller responses are pickled
+
+_analyzer = None                # one ResponseAnalyzer per worker process
+
+
+def _init_worker():
+    global _analyzer
+    _analyzer = ResponseAnalyzer()
+
+
+def _read_shared(name, size):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(shm.buf[:size]).decode('utf-8')
+    finally:
+        shm.close()
+        # The parent owns (and unlinks) the segment; without this the worker's
+        # resource tracker would report it as leaked
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def _analyze_job(response, shared, category):
+    """Worker entry point. Returns (analysis, busy seconds)"""
+    start = time.perf_counter()
+    if shared is not None:
+        response = _read_shared(*shared)
+    analysis = _analyzer.analyze(response, category)
+    return analysis, time.perf_counter() - start
+
+
+class StageStats:
+    """Queue depth and busy time of one pipeline stage"""
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.capacity = capacity    # parallel slots (workers / concurrency)
+        self.depth = 0              # items queued or in progress
+        self.max_depth = 0
+        self.busy = 0.0             # summed seconds spent working
+        self.items = 0
+        self.waits = 0              # producer had to wait for a free slot
+        self.wait_time = 0.0
+        self.started = time.perf_counter()
+        self._depth_area = 0.0
+        self._last_change = self.started
+        self._lock = threading.Lock()
+        metrics.track_stage(self)
+
+    def _advance(self, now):
+        self._depth_area += self.depth * (now - self._last_change)
+        self._last_change = now
+
+    def enter(self):
+        with self._lock:
+            self._advance(time.perf_counter())
+            self.depth += 1
+            self.max_depth = max(self.max_depth, self.depth)
+
+    def leave(self, busy):
+        with self._lock:
+            self._advance(time.perf_counter())
+            self.depth -= 1
+            self.busy += busy
+            self.items += 1
+
+    def waited(self, seconds):
+        with self._lock:
+            self.waits += 1
+            self.wait_time += seconds
+
+    def snapshot(self):
+        with self._lock:
+            now = time.perf_counter()
+            self._advance(now)
+            wall = max(now - self.started, 1e-9)
+            return {
+                "stage": self.name,
+                "depth": self.depth,
+                "max_depth": self.max_depth,
+                "avg_depth": round(self._depth_area / wall, 2),
+                "utilization": round(min(1.0, self.busy / (wall * self.capacity)), 3),
+                "busy": round(self.busy, 3),
+                "items": self.items,
+                "waits": self.waits,
+                "wait_time": round(self.wait_time, 2)
+            }
+
+
+class AnalysisPool:
+    """Bounded process pool running ResponseAnalyzer.analyze()"""
+
+    def __init__(self, workers=2, max_pending=64, shm_threshold=SHM_THRESHOLD):
+        """
+        Args:
+            workers (int): Analyzer processes
+            max_pending (int): Responses queued or in analysis before submit() blocks
+            shm_threshold (int): Responses of at least this many UTF-8 bytes go through shared memory
+        """
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.shm_threshold = shm_threshold
+        self.stats = StageStats("analysis", self.workers)
+        self.shared_handoffs = 0
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def _dispatch(self, response, category):
+        shm = None
+        shared = None
+        data = response.encode('utf-8')
+        if len(data) >= self.shm_threshold:
+            shm = shared_memory.SharedMemory(create=True, size=len(data))
+            shm.buf[:len(data)] = data
+            shared = (shm.name, len(data))
+            self.shared_handoffs += 1
+            response = None
+
+        self.stats.enter()
+        try:
+            future = self._executor.submit(_analyze_job, response, shared, category)
+        except Exception:
+            self._done(shm, None)
+            raise
+        future.add_done_callback(lambda f: self._done(shm, f))
+        return future
+
+    def _done(self, shm, future):
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        busy = 0.0
+        if future is not None and not future.cancelled() and future.exception() is None:
+            busy = future.result()[1]
+            metrics.ANALYZER_SECONDS.observe(busy, "worker")
+        self.stats.leave(busy)
+        self._slots.release()
+
+    def submit(self, response, category='generic'):
+        """
+        Queue one response for analysis, blocking while max_pending are outstanding
+
+        Returns:
+            concurrent.futures.Future: resolves to (analysis dict, busy seconds)
+        """
+        if not self._slots.acquire(blocking=False):
+            start = time.perf_counter()
+            self._slots.acquire()
+            self.stats.waited(time.perf_counter() - start)
+        return self._dispatch(response, category)
+
+    async def submit_async(self, response, category='generic'):
+        """asyncio version of submit(): yields to the event loop while the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            start = time.perf_counter()
+            while not self._slots.acquire(blocking=False):
+                await asyncio.sleep(0.005)
+            self.stats.waited(time.perf_counter() - start)
+        return self._dispatch(response, category)
+
+    def snapshot(self):
+        """Stage stats plus pool configuration"""
+        return dict(
+            self.stats.snapshot(),
+            workers=self.workers,
+            max_pending=self.max_pending,
+            shared_handoffs=self.shared_handoffs
+        )
+
+    def close(self):
+        """Wait for queued analyses and stop the worker processes"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,264 @@
+"""
+Async Execution Engine - concurrent attack dispatch for Ollama
+Runs the (model x prompt) matrix with a bounded number of in-flight
+requests overall, per model and per host. Results are handed back in
+completion order through a callback.
+"""
+import asyncio
+import time
+
+try:
+    import ollama
+    OLLAMA_AVAILABLE = True
+except ImportError:
+    OLLAMA_AVAILABLE = False
+
+from ollama_pool import OllamaHostPool
+from analysis_pipeline import StageStats
+
+
+DEFAULT_OPTIONS = {
+    "temperature": 0.7,
+    "num_predict": 250
+}
+
+
+class AsyncAttackEngine:
+    """Concurrent request engine built on ollama.AsyncClient"""
+
+    def __init__(self, pool=None, concurrency=4, max_per_model=None, max_per_host=None, options=None, cache=None,
+                 stream_analyzer=None, scheduler=None, analysis_pool=None):
+        """
+        Args:
+            pool (OllamaHostPool, optional): Host pool. None = single default host
+            concurrency (int): Total number of in-flight requests
+            max_per_model (int, optional): In-flight limit per model (default: concurrency)
+            max_per_host (int, optional): In-flight limit per host (default: concurrency)
+            options (dict, optional): Generation options passed to Ollama
+            cache (ResponseCache, optional): Response cache consulted before each request
+            stream_analyzer (ResponseAnalyzer, optional): Enables streaming mode; requests are
+                aborted as soon as the incremental analysis settles the verdict
+            scheduler (ModelScheduler, optional): Supplies keep_alive and records model load times
+            analysis_pool (AnalysisPool, optional): Analyze responses in worker processes; results
+                then carry an 'analysis' dict and a full pool throttles new requests
+        """
+        self.pool = pool or OllamaHostPool()
+        self.concurrency = max(1, int(concurrency))
+        self.max_per_model = max_per_model or self.concurrency
+        self.max_per_host = max_per_host or self.concurrency
+        self.options = dict(options or DEFAULT_OPTIONS)
+        self.cache = cache
+        self.stream_analyzer = stream_analyzer
+        self.scheduler = scheduler
+        self.keep_alive = scheduler.keep_alive if scheduler else None
+        self.analysis_pool = analysis_pool
+        self.request_stats = StageStats("request", self.concurrency)
+        self.stopped_models = set()     # cells of these models are skipped (early stopping)
+
+    @staticmethod
+    def build_cells(models, prompts):
+        """
+        Expand models and prompts into an ordered list of work cells
+
+        Returns:
+            list: (model_name, prompt_index, prompt_data) tuples, grouped by model
+        """
+        return [
+            (model_name, idx, prompt_data)
+            for model_name in models
+            for idx, prompt_data in enumerate(prompts, 1)
+        ]
+
+    def run(self, cells, on_result):
+        """
+        Execute all cells and block until they are finished
+
+        Args:
+            cells (list): Work cells from build_cells()
+            on_result (callable): Called with a result dict for every finished cell,
+                in completion order. Keys: model, index, prompt_data, response
+                (None on error), error, elapsed, host ('cache' for cache hits),
+                early_exit (streaming verdict that aborted the request, or None),
+                timing (request_timing() record, None for cache hits and errors),
+                analysis (from the analysis pool, or None = analyze inline)
+        """
+        if not OLLAMA_AVAILABLE:
+            raise RuntimeError("Ollama module not installed!")
+        asyncio.run(self._run(cells, on_result))
+
+    def stage_stats(self):
+        """Queue depth / utilization of the request stage and, if enabled, the analysis stage"""
+        stages = [self.request_stats.snapshot()]
+        if self.analysis_pool is not None:
+            stages.append(self.analysis_pool.snapshot())
+        return stages
+
+    async def _acquire_host(self, model_name, affinity=None):
+        """Wait for a healthy host; ejected hosts are re-admitted by the pool monitor"""
+        deadline = time.monotonic() + self.pool.eject_seconds * 2
+        while True:
+            host = self.pool.acquire(model_name, affinity)
+            if host is not None or time.monotonic() >= deadline:
+                return host
+            await asyncio.sleep(0.5)
+
+    async def _generate_stream(self, client, model_name, prompt_data):
+        """
+        Stream one generation through the incremental analyzer
+
+        Returns:
+            tuple: (response text, early-exit verdict or None, final chunk or None if aborted,
+                seconds to the first token or None)
+        """
+        analysis = self.stream_analyzer.stream(prompt_data.get('category', 'generic'))
+        start = time.perf_counter()
+        ttft = None
+        final = None
+        stream = await client.generate(
+            model=model_name,
+            prompt=prompt_data.get('prompt', ''),
+            options=self.options,
+            keep_alive=self.keep_alive,
+            stream=True
+        )
+        try:
+            async for part in stream:
+                if ttft is None and part['response']:
+                    ttft = time.perf_counter() - start
+                if analysis.feed(part['response']):
+                    break
+                if part.get('done'):
+                    final = part
+                    if self.scheduler is not None:
+                        self.scheduler.observe(model_name, part)
+        finally:
+            # Closing the stream closes the connection and aborts the generation
+            await stream.aclose()
+        return analysis.text, analysis.verdict, final, ttft
+
+    async def _run(self, cells, on_result):
+        clients = {}
+        model_limits = {}
+        host_limits = {}
+        pending = iter(cells)
+        analyses = set()
+        self.request_stats = StageStats("request", self.concurrency)
+
+        async def finish_analysis(result, future):
+            try:
+                result["analysis"] = (await asyncio.wrap_future(future))[0]
+            except Exception as e:
+                print(f"  [ANALYSIS] Worker failed, analyzing inline: {e}")
+            on_result(result)
+
+        async def deliver(result):
+            result["analysis"] = None
+            if self.analysis_pool is None or not result["response"]:
+                on_result(result)
+                return
+            # Waits here while the analysis queue is full (backpressure on requests)
+            future = await self.analysis_pool.submit_async(
+                result["response"], result["prompt_data"].get('category', 'generic')
+            )
+            task = asyncio.create_task(finish_analysis(result, future))
+            analyses.add(task)
+            task.add_done_callback(analyses.discard)
+
+        async def worker():
+            # Workers pull from a shared iterator, so at most `concurrency`
+            # requests exist at any time regardless of the matrix size
+            for model_name, idx, prompt_data in pending:
+                if model_name in self.stopped_models:
+                    continue
+                prompt_text = prompt_data.get('prompt', '')
+                cache_key = None
+                # No single known build behind the tag -> no cache (a response could come from another build)
+                digest = None
+                if self.cache is not None and self.cache.enabled:
+                    digest = self.pool.model_digest(model_name)
+                if digest is not None:
+                    cache_key = self.cache.key(digest, prompt_text, self.options)
+                    cached = self.cache.get(cache_key)
+                    if cached is not None:
+                        await deliver({
+                            "model": model_name,
+                            "index": idx,
+                            "prompt_data": prompt_data,
+                            "response": cached,
+                            "error": None,
+                            "elapsed": 0.0,
+                            "host": "cache",
+                            "early_exit": None,
+                            "timing": None
+                        })
+                        continue
+
+                if model_name not in model_limits:
+                    model_limits[model_name] = asyncio.Semaphore(self.max_per_model)
+
+                async with model_limits[model_name]:
+                    # Same prefix group -> same host, so the server can reuse its prompt cache
+                    host = await self._acquire_host(model_name, prompt_data.get('prefix_group'))
+                    start = time.perf_counter()
+                    early_exit = None
+                    timing = None
+                    if host is None:
+                        response, error = None, ConnectionError("No healthy Ollama host available")
+                    else:
+                        if host.url not in clients:
+                            clients[host.url] = ollama.AsyncClient(host=host.url)
+                            host_limits[host.url] = asyncio.Semaphore(self.max_per_host)
+
+                        async with host_limits[host.url]:
+                            # Adaptive per-host rate / window on top of the hard limits
+                            await self.pool.rate.acquire_async(host.url)
+                            start = time.perf_counter()
+                            self.request_stats.enter()
+                            final, ttft = None, None
+                            try:
+                                if self.stream_analyzer is not None:
+                                    response, early_exit, final, ttft = await self._generate_stream(
+                                        clients[host.url], model_name, prompt_data
+                                    )
+                                else:
+                                    result = await clients[host.url].generate(
+                                        model=model_name,
+                                        prompt=prompt_text,
+                                        options=self.options,
+                                        keep_alive=self.keep_alive
+                                    )
+                                    response = result['response']
+                                    final = result
+                                    if self.scheduler is not None:
+                                        self.scheduler.observe(model_name, result)
+                                error = None
+                            except Exception as e:
+                                response, error = None, e
+                            wall = time.perf_counter() - start
+                            self.request_stats.leave(wall)
+                            self.pool.finish(host, None if early_exit else wall, error, final)
+                            if error is None:
+                                timing = self.pool.record_timing(host.url, model_name, final, wall, ttft)
+                    elapsed = time.perf_counter() - start
+
+                # Aborted (partial) responses are never cached; the serving host must run the keyed build
+                if cache_key is not None and response and not early_exit \
+                        and self.pool.model_digest(model_name, host) == digest:
+                    self.cache.put(cache_key, response, model=model_name)
+
+                await deliver({
+                    "model": model_name,
+                    "index": idx,
+                    "prompt_data": prompt_data,
+                    "response": response,
+                    "error": error,
+                    "elapsed": elapsed,
+                    "host": host.url if host else None,
+                    "early_exit": early_exit,
+                    "timing": timing
+                })
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(cells)) or 1)]
+        await asyncio.gather(*workers)
+        if analyses:
+            await asyncio.gather(*list(analyses))
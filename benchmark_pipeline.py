@@ -0,0 +1,420 @@
+"""
+Pipeline Benchmark - end-to-end sweep throughput against mock Ollama backends
+Runs FrameworkOrchestrator.run_full_test() (prompt load, send, ResponseAnalyzer,
+ScoringEngine, journal, ComparisonReporter) for every point of a matrix of
+prompt counts, concurrency levels and response sizes. Each point runs in a
+fresh process (clean peak RSS) inside a scratch directory, against freshly
+started mock_ollama.py servers. Results are written as JSON tagged with the
+git commit so two commits can be compared with --compare.
+
+Usage:
+    python benchmark_pipeline.py
+    python benchmark_pipeline.py --prompts 602 100000 1000000 --concurrency 1 16 --response-chars 500 5000
+    python benchmark_pipeline.py --compare outputs/benchmarks/<previous>.json
+"""
+import argparse
+import contextlib
+import functools
+import itertools
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:     # Windows
+    RESOURCE_AVAILABLE = False
+
+
+REPO_DIR = Path(__file__).resolve().parent
+MOCK_SCRIPT = REPO_DIR / "mock_ollama.py"
+STAGES = ("load", "send", "analyze", "score", "journal", "report")
+
+
+# ----------------------------------------------------------------------
+# Child process: one matrix point
+# ----------------------------------------------------------------------
+class StageTimer:
+    """Cumulative seconds and call counts per pipeline stage"""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.calls = dict.fromkeys(STAGES, 0)
+        self.latencies = []
+        self.errors = 0
+
+    def add(self, stage, seconds):
+        self.seconds[stage] += seconds
+        self.calls[stage] += 1
+
+    def wrap(self, stage, obj, name):
+        """Replace obj.name with a timed wrapper"""
+        original = getattr(obj, name)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        setattr(obj, name, timed)
+
+
+def synthetic_prompts(count):
+    """The real prompts first, then numbered variants of them up to count"""
+    with open(REPO_DIR / 'jailbreak_prompts.json', 'r', encoding='utf-8') as f:
+        base = json.load(f)['jailbreak_prompts']
+    if count <= len(base):
+        return base[:count]
+    return base + [f"{base[i % len(base)]} (variant {i // len(base)})" for i in range(len(base), count)]
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def peak_rss_mb(who=None):
+    """Peak resident set size in MB (None where the resource module is missing)"""
+    if not RESOURCE_AVAILABLE:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_point(config):
+    """
+    Run one sweep in the current directory and return its measurements
+
+    Args:
+        config (dict): prompts, concurrency, models, hosts, stream, analysis_workers,
+            response_chars, rate_limit
+    """
+    from async_engine import AsyncAttackEngine
+    from main_orchestrator_FINAL import FrameworkOrchestrator
+    from rate_limiter import AdaptiveRateController
+    from run_journal import RunJournal
+
+    with open('jailbreak_prompts.json', 'w', encoding='utf-8') as f:
+        json.dump({"jailbreak_prompts": synthetic_prompts(config["prompts"])}, f)
+
+    orchestrator = FrameworkOrchestrator(
+        hosts=config["hosts"],
+        concurrency=config["concurrency"],
+        stream=config["stream"],
+        analysis_workers=config["analysis_workers"]
+    )
+    if config["response_chars"]:
+        orchestrator.options["num_predict"] = -1    # let the mock return the full padded response
+    if not config["rate_limit"]:
+        # Measure the pipeline, not the AIMD ramp-up from 4 req/s
+        window = config["concurrency"] * 2
+        orchestrator.pool.rate = AdaptiveRateController(
+            initial_rate=1e6, max_rate=1e6, initial_concurrency=window, max_concurrency=window
+        )
+
+    timer = StageTimer()
+    timer.wrap("load", orchestrator, "load_prompts")
+    timer.wrap("analyze", orchestrator.analyzer, "analyze")
+    timer.wrap("score", orchestrator.scoring, "add_result")
+    timer.wrap("score", orchestrator.scoring, "get_ranking")
+    for name in ("create_comparison", "create_html_report", "create_csv_report"):
+        timer.wrap("report", orchestrator.reporter, name)
+    timer.wrap("journal", RunJournal, "append")
+
+    # Request latency: sequential sends are timed directly; concurrent ones
+    # report their own elapsed time (streamed requests up to the early exit)
+    send = orchestrator.send_prompt_to_model
+
+    def send_timed(*args, **kwargs):
+        start = time.perf_counter()
+        response = send(*args, **kwargs)
+        if response is None:
+            timer.errors += 1
+        else:
+            timer.latencies.append(time.perf_counter() - start)
+        return response
+
+    orchestrator.send_prompt_to_model = send_timed
+    engine_run = AsyncAttackEngine.run
+
+    def run_observed(engine, cells, on_result):
+        def observe(result):
+            if result["response"] is None:
+                timer.errors += 1
+            else:
+                timer.latencies.append(result["elapsed"])
+            on_result(result)
+        return engine_run(engine, cells, observe)
+
+    AsyncAttackEngine.run = run_observed
+
+    pipeline = []
+    print_stage_stats = orchestrator.print_stage_stats
+
+    def capture_stages(stages):
+        pipeline.extend(stages)
+        print_stage_stats(stages)
+
+    orchestrator.print_stage_stats = capture_stages
+
+    start = time.perf_counter()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        orchestrator.run_full_test(config["models"], config["prompts"])
+    wall = time.perf_counter() - start
+    orchestrator.pool.stop()
+
+    timer.seconds["send"] = sum(timer.latencies)
+    timer.calls["send"] = len(timer.latencies)
+    # Analyses done in worker processes never pass through orchestrator.analyzer
+    timer.seconds["analyze"] += sum(stage.get("busy", 0.0) for stage in pipeline if stage["stage"] == "analysis")
+
+    requests = len(config["models"]) * config["prompts"]
+    scored = sum(len(scores["results"]) for scores in orchestrator.scoring.model_scores.values())
+    latencies = sorted(timer.latencies)
+    ms = lambda seconds: None if seconds is None else round(seconds * 1000, 2)
+    return {
+        "requests": requests,
+        "scored": scored,
+        "errors": timer.errors,
+        "wall_s": round(wall, 3),
+        "prompts_per_sec": round(requests / wall, 1) if wall else None,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(latencies[-1] if latencies else None)
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_workers_mb": peak_rss_mb(resource.RUSAGE_CHILDREN) if RESOURCE_AVAILABLE and config["analysis_workers"] else None,
+        "stages_s": {stage: round(seconds, 3) for stage, seconds in timer.seconds.items()},
+        "stage_calls": timer.calls,
+        "pipeline": pipeline
+    }
+
+
+# ----------------------------------------------------------------------
+# Parent process: mock backends, matrix, output
+# ----------------------------------------------------------------------
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def mock_backends(count, models, args, response_chars, parallel):
+    """Start `count` mock_ollama.py processes; yields their comma-separated URLs"""
+    processes = []
+    urls = []
+    try:
+        for _ in range(count):
+            port = free_port()
+            processes.append(subprocess.Popen(
+                [sys.executable, str(MOCK_SCRIPT), "--port", str(port), "--models", ",".join(models),
+                 "--latency", args.latency, "--tokens-per-sec", str(args.tokens_per_sec),
+                 "--refusal-rate", str(args.refusal_rate), "--error-rate", str(args.error_rate),
+                 "--response-chars", str(response_chars), "--parallel", str(parallel)],
+                stdout=subprocess.DEVNULL
+            ))
+            urls.append(f"http://127.0.0.1:{port}")
+        for url in urls:
+            deadline = time.monotonic() + 10
+            while True:
+                try:
+                    urllib.request.urlopen(url, timeout=1).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f"Mock backend at {url} did not start")
+                    time.sleep(0.05)
+        yield ",".join(urls)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def run_isolated(config):
+    """Run one matrix point in a child process inside a scratch directory"""
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        completed = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--run-point", json.dumps(config)],
+            cwd=workdir
+        )
+        result_file = Path(workdir) / "result.json"
+        if completed.returncode != 0 or not result_file.exists():
+            return {"failed": True, "returncode": completed.returncode}
+        with open(result_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def git_info():
+    """Commit hash and dirty flag of the working tree (None outside git)"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def point_key(config):
+    return (config["prompts"], config["concurrency"], config["response_chars"])
+
+
+def compare(results, baseline_path, threshold):
+    """
+    Print throughput / p95 deltas against a previous results file
+
+    Returns:
+        int: Number of matrix points that regressed by more than threshold
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {point_key(r["config"]): r for r in baseline["results"] if not r.get("failed")}
+    print(f"\n[COMPARE] vs {baseline.get('git', {}).get('commit', '?')[:10]} ({baseline_path})")
+    regressions = 0
+    for result in results:
+        before = previous.get(point_key(result["config"]))
+        if before is None or result.get("failed"):
+            continue
+        speed = result["prompts_per_sec"] / before["prompts_per_sec"] - 1
+        p95_now, p95_before = result["latency_ms"]["p95"], before["latency_ms"]["p95"]
+        p95 = (p95_now / p95_before - 1) if p95_now and p95_before else 0.0
+        regressed = speed < -threshold or p95 > threshold
+        regressions += regressed
+        prompts, concurrency, chars = point_key(result["config"])
+        print(f"  {prompts:>8} x c{concurrency:<3} {chars:>7} chars: prompts/s {speed*100:+6.1f}%, "
+              f"p95 {p95*100:+6.1f}%" + ("  <-- REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="End-to-end pipeline benchmark against mock Ollama backends",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Default matrix: 602 prompts, concurrency 1 and 8, 500 and 5000-char responses
+  python benchmark_pipeline.py
+
+  # Scale test up to 1M synthetic prompts over 4 mock backends
+  python benchmark_pipeline.py --prompts 100000 1000000 --concurrency 32 --backends 4
+
+  # Check a change against the previous commit's results
+  python benchmark_pipeline.py --compare outputs/benchmarks/20251120-101500-1a2b3c4d.json
+        """
+    )
+    parser.add_argument("--prompts", nargs="+", type=int, default=[602], help="Prompt counts (>602 = synthetic)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8], help="Concurrency levels")
+    parser.add_argument("--response-chars", nargs="+", type=int, default=[500, 5000], help="Response sizes")
+    parser.add_argument("--models", default="bench", help="Comma-separated model names served by the mock")
+    parser.add_argument("--backends", type=int, default=1, help="Mock servers to spread requests over")
+    parser.add_argument("--host", default=None, help="Use an existing backend instead of starting mocks")
+    parser.add_argument("--latency", default="0.01", help="Mock time to first token (see mock_ollama.py)")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Mock generation speed (0 = instant)")
+    parser.add_argument("--refusal-rate", type=float, default=0.5, help="Mock refusal rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock injected error rate")
+    parser.add_argument("--stream", action="store_true", help="Run the sweep in streaming mode")
+    parser.add_argument("--analysis-workers", type=int, default=0, help="Analyzer processes (concurrent runs)")
+    parser.add_argument("--rate-limit", action="store_true", help="Keep the adaptive rate controller defaults")
+    parser.add_argument("--output", default=None, help="Results file (default: outputs/benchmarks/<time>-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Previous results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="Relative slowdown tolerated by --compare (default: 0.10)")
+    parser.add_argument("--run-point", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_point:
+        sys.path.insert(0, str(REPO_DIR))
+        result = run_point(json.loads(args.run_point))
+        with open("result.json", 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    results = []
+    print(f"{'prompts':>8} {'conc':>5} {'chars':>7} {'prompts/s':>10} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'RSS MB':>7}  stages (s)")
+    for prompts, concurrency, chars in itertools.product(args.prompts, args.concurrency, args.response_chars):
+        config = {
+            "prompts": prompts,
+            "concurrency": concurrency,
+            "response_chars": chars,
+            "models": models,
+            "stream": args.stream,
+            "analysis_workers": args.analysis_workers,
+            "rate_limit": args.rate_limit
+        }
+        if args.host:
+            result = run_isolated(dict(config, hosts=args.host))
+        else:
+            with mock_backends(args.backends, models, args, chars, parallel=max(4, concurrency)) as hosts:
+                result = run_isolated(dict(config, hosts=hosts))
+        result["config"] = config
+        results.append(result)
+
+        if result.get("failed"):
+            print(f"{prompts:>8} {concurrency:>5} {chars:>7}  FAILED (exit code {result['returncode']})")
+            continue
+        latency = result["latency_ms"]
+        stages = " ".join(f"{stage}={seconds:.2f}" for stage, seconds in result["stages_s"].items())
+        print(f"{prompts:>8} {concurrency:>5} {chars:>7} {result['prompts_per_sec']:>10.1f} "
+              f"{latency['p50'] or 0:>8.1f} {latency['p95'] or 0:>8.1f} {latency['p99'] or 0:>8.1f} "
+              f"{result['peak_rss_mb'] or 0:>7.0f}  {stages}"
+              + (f"  [{result['errors']} errors]" if result['errors'] else ""))
+
+    info = git_info()
+    output = Path(args.output) if args.output else (
+        REPO_DIR / "outputs" / "benchmarks"
+        / f"{datetime.now():%Y%m%d-%H%M%S}-{(info['commit'] or 'nogit')[:8]}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            "benchmark": "pipeline",
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": info,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {
+                "backends": 0 if args.host else args.backends,
+                "host": args.host,
+                "latency": args.latency,
+                "tokens_per_sec": args.tokens_per_sec,
+                "refusal_rate": args.refusal_rate,
+                "error_rate": args.error_rate
+            },
+            "results": results
+        }, f, indent=2)
+    print(f"\n[SAVED] {output}")
+
+    if any(r.get("failed") for r in results):
+        return 1
+    if args.compare and compare(results, args.compare, args.max_regression):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,244 @@
+"""
+Compare Runs - regressions between two stored sweeps (results_store.py)
+Cells are paired on (model, prompt hash), so only prompts run in both sweeps
+are compared and every prompt acts as its own control:
+  - flips: prompts newly jailbroken / newly refused
+  - ASR per model and per category with McNemar's exact test on the flips
+    (Holm-adjusted across the categories of a model)
+  - top regressions: categories whose ASR rose, most significant first,
+    and the newly jailbroken prompts that hit the most models
+
+Usage:
+  python compare_runs.py                                   # two most recent runs
+  python compare_runs.py 20251117-213045 20251124-090112 --model llama3 --top 20
+  python compare_runs.py BASE NEW --json outputs/compare.json
+"""
+import argparse
+import json
+import sys
+import time
+
+from early_stopping import beta_cdf
+from response_analyzer import SEVERITY_LEVELS
+from results_store import ResultsStore, STORE_PATH
+from run_journal import RunJournal
+
+
+ALPHA = 0.05
+
+
+def mcnemar_p(newly_jailbroken, newly_refused):
+    """
+    Two-sided exact McNemar test: are flips in one direction more likely than the other?
+
+    Returns:
+        float: p-value (1.0 without flips)
+    """
+    n = newly_jailbroken + newly_refused
+    k = min(newly_jailbroken, newly_refused)
+    if n == 0 or 2 * k == n:
+        return 1.0
+    # P(X <= k) for X ~ Binomial(n, 1/2), via the regularized incomplete beta function
+    return min(1.0, 2 * beta_cdf(0.5, n - k, k + 1))
+
+
+def holm(p_values):
+    """Holm-Bonferroni adjusted p-values (same order as the input)"""
+    order = sorted(range(len(p_values)), key=lambda idx: p_values[idx])
+    adjusted = [1.0] * len(p_values)
+    running = 0.0
+    for rank, idx in enumerate(order):
+        running = max(running, min(1.0, (len(p_values) - rank) * p_values[idx]))
+        adjusted[idx] = running
+    return adjusted
+
+
+def _cell(cells, base_jailbroken, new_jailbroken, newly_jailbroken, newly_refused):
+    base_asr = base_jailbroken / cells * 100 if cells else 0.0
+    new_asr = new_jailbroken / cells * 100 if cells else 0.0
+    return {
+        "cells": cells,
+        "base_jailbroken": base_jailbroken,
+        "new_jailbroken": new_jailbroken,
+        "base_asr": round(base_asr, 2),
+        "new_asr": round(new_asr, 2),
+        "delta": round(new_asr - base_asr, 2),
+        "newly_jailbroken": newly_jailbroken,
+        "newly_refused": newly_refused,
+        "p": mcnemar_p(newly_jailbroken, newly_refused)
+    }
+
+
+def compare(store, base_run, new_run, model=None, top=10, alpha=ALPHA):
+    """
+    Diff two runs of the results store
+
+    Args:
+        store (ResultsStore): Store holding both runs
+        base_run (str): Earlier run ID
+        new_run (str): Later run ID
+        model (str, optional): Only this model
+        top (int): Regressions / prompts listed
+        alpha (float): Significance level (after Holm adjustment)
+
+    Returns:
+        dict: models (per-model and per-category deltas), regressions, new_jailbreaks
+    """
+    models = {}
+    for row in store.paired(base_run, new_run, model):
+        entry = models.setdefault(row["model"], {"categories": {}})
+        entry["categories"][row["category"]] = _cell(
+            row["cells"], row["base_jailbroken"], row["new_jailbroken"],
+            row["newly_jailbroken"], row["newly_refused"]
+        )
+
+    base_totals, new_totals = store.model_counts(base_run), store.model_counts(new_run)
+    regressions = []
+    for model_name, entry in models.items():
+        categories = entry["categories"]
+        entry.update(_cell(*(sum(c[key] for c in categories.values()) for key in (
+            "cells", "base_jailbroken", "new_jailbroken", "newly_jailbroken", "newly_refused"))))
+        # Cells run in only one of the sweeps (new prompts, dropped prompts) are not compared
+        entry["only_base"] = base_totals.get(model_name, 0) - entry["cells"]
+        entry["only_new"] = new_totals.get(model_name, 0) - entry["cells"]
+
+        names = list(categories)
+        for name, adjusted in zip(names, holm([categories[name]["p"] for name in names])):
+            categories[name]["p_adjusted"] = adjusted
+            categories[name]["significant"] = adjusted < alpha
+            if categories[name]["delta"] > 0:
+                regressions.append(dict(categories[name], model=model_name, category=name))
+
+    regressions.sort(key=lambda r: (r["p_adjusted"], -r["delta"]))
+
+    # Newly jailbroken prompts, worst first: most models affected, then severity, then confidence
+    severity_rank = {level: rank for rank, level in enumerate(SEVERITY_LEVELS)}
+    prompts = {}
+    for flip in store.flips(base_run, new_run, model):
+        if not flip["new_success"]:
+            continue
+        entry = prompts.setdefault(flip["prompt_hash"], {
+            "prompt_hash": flip["prompt_hash"], "attack": flip["attack"], "category": flip["category"],
+            "models": [], "severity": flip["new_severity"], "confidence": 0.0
+        })
+        entry["models"].append(flip["model"])
+        if severity_rank.get(flip["new_severity"], -1) > severity_rank.get(entry["severity"], -1):
+            entry["severity"] = flip["new_severity"]
+        entry["confidence"] = max(entry["confidence"], round(flip["new_confidence"], 4))
+    new_jailbreaks = sorted(prompts.values(), key=lambda p: (
+        -len(p["models"]), -severity_rank.get(p["severity"], -1), -p["confidence"]))
+
+    return {
+        "base": base_run,
+        "new": new_run,
+        "alpha": alpha,
+        "models": models,
+        "regressions": regressions[:top],
+        "new_jailbreaks": new_jailbreaks[:top],
+        "new_jailbreak_prompts": len(new_jailbreaks)
+    }
+
+
+def _p(value):
+    return "p<0.001" if value < 0.001 else f"p={value:.3f}"
+
+
+def print_comparison(result):
+    print("\n" + "="*70)
+    print(f"🔁 RUN COMPARISON  {result['base']} → {result['new']}")
+    print("="*70)
+    if not result["models"]:
+        print("\n  No (model, prompt) cells in common")
+        return
+
+    for model_name, entry in sorted(result["models"].items()):
+        arrow = "🔴" if entry["delta"] > 0 and entry["p"] < result["alpha"] else \
+                "🟢" if entry["delta"] < 0 and entry["p"] < result["alpha"] else "⚪"
+        print(f"\n  {arrow} {model_name}: ASR {entry['base_asr']:.1f}% → {entry['new_asr']:.1f}% "
+              f"({entry['delta']:+.1f} pts, {_p(entry['p'])}) on {entry['cells']} shared prompts")
+        print(f"       +{entry['newly_jailbroken']} newly jailbroken, -{entry['newly_refused']} newly refused"
+              + (f" | {entry['only_new']} new / {entry['only_base']} dropped prompts not compared"
+                 if entry["only_new"] or entry["only_base"] else ""))
+        categories = entry["categories"]
+        if len(categories) > 1:
+            for name, cell in sorted(categories.items(), key=lambda item: -item[1]["delta"]):
+                if cell["newly_jailbroken"] or cell["newly_refused"]:
+                    mark = " *" if cell["significant"] else ""
+                    print(f"         {name:<20} {cell['base_asr']:5.1f}% → {cell['new_asr']:5.1f}% "
+                          f"({cell['delta']:+.1f}, +{cell['newly_jailbroken']}/-{cell['newly_refused']}, "
+                          f"{_p(cell['p_adjusted'])}){mark}")
+
+    if result["regressions"]:
+        print(f"\n  Top regressions (Holm-adjusted, * = significant at α={result['alpha']}):")
+        for idx, reg in enumerate(result["regressions"], 1):
+            mark = " *" if reg["significant"] else ""
+            print(f"    {idx}. {reg['model']} / {reg['category']}: {reg['base_asr']:.1f}% → {reg['new_asr']:.1f}% "
+                  f"({reg['delta']:+.1f} pts, {reg['newly_jailbroken']} flips, {_p(reg['p_adjusted'])}){mark}")
+
+    if result["new_jailbreaks"]:
+        print(f"\n  Newly jailbroken prompts (top {len(result['new_jailbreaks'])} "
+              f"of {result['new_jailbreak_prompts']}):")
+        for jailbreak in result["new_jailbreaks"]:
+            print(f"    {jailbreak['prompt_hash']}  {jailbreak['severity']:<8} "
+                  f"{(jailbreak['attack'] or '')[:36]:<36} {', '.join(jailbreak['models'])}")
+    print(f"\n  Details: python results_store.py query --run {result['new']} --prompt-hash <hash> --text")
+
+
+def _ensure_run(store, run_id):
+    """Import a journaled run the store has not seen; False when neither has it"""
+    if store.has_run(run_id):
+        return True
+    journal = RunJournal(run_id)
+    if not journal.exists():
+        return False
+    print(f"[IMPORT] {run_id}: {store.import_journal(journal)} results from {journal.path}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="LLM Security Framework - compare two stored runs",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Usage:", 1)[1]
+    )
+    parser.add_argument("base", nargs="?", help="Baseline run ID (default: second most recent)")
+    parser.add_argument("new", nargs="?", help="Run ID to check (default: most recent)")
+    parser.add_argument("--store", type=str, default=str(STORE_PATH), help=f"Results store (default: {STORE_PATH})")
+    parser.add_argument("--model", type=str, default=None, help="Only this model")
+    parser.add_argument("--top", type=int, default=10, help="Regressions / prompts listed (default: 10)")
+    parser.add_argument("--alpha", type=float, default=ALPHA, help=f"Significance level (default: {ALPHA})")
+    parser.add_argument("--json", type=str, default=None, help="Also write the comparison to this file")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.store)
+    try:
+        if args.base and not args.new:
+            latest = store.latest_runs(1)
+            args.new = latest[0] if latest else None
+        elif not args.base:
+            latest = store.latest_runs(2)
+            if len(latest) < 2:
+                parser.error("need two runs in the store (or pass run IDs)")
+            args.new, args.base = latest
+        for run_id in (args.base, args.new):
+            if not run_id or not _ensure_run(store, run_id):
+                parser.error(f"run {run_id} is neither in {args.store} nor journaled")
+        if args.base == args.new:
+            parser.error("base and new run are the same")
+
+        start = time.perf_counter()
+        result = compare(store, args.base, args.new, model=args.model, top=args.top, alpha=args.alpha)
+        elapsed = time.perf_counter() - start
+        print_comparison(result)
+        print(f"  Compared in {elapsed:.2f}s")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            print(f"  📄 JSON: {args.json}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
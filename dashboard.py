@@ -8,17 +8,24 @@ try:
     sys.path.insert(0, str(Path(__file__).parent))
     from response_analyzer import analyzer
     from scoring_engine import engine as scoring
+    from prompt_sampling import sample_prompts, SAMPLING_MODES
 except:
     print("[ERROR] Missing modules")
     sys.exit(1)
 
 try:
     import ollama
+    from ollama_pool import OllamaHostPool
+    from model_scheduler import ModelScheduler
     OLLAMA_OK = True
 except:
     OLLAMA_OK = False
 
-test_state = {"running": False, "total": 0, "completed": 0, "jailbroken": 0, "results": [], "models": {}, "started": None}
+pool = None
+scheduler = None
+sampling = {"mode": "stratified", "seed": 0}     # same defaults as main_orchestrator_FINAL.py
+
+test_state = {"running": False, "total": 0, "completed": 0, "jailbroken": 0, "results": [], "models": {}, "started": None, "rate_limit": {}}
 
 app = Flask(__name__)
 
@@ -55,7 +62,8 @@ let p=d.total>0?d.completed/d.total*100:0;
 document.getElementById('prog').style.width=p+'%';
 let mh='';for(let[n,s]of Object.entries(d.models)){
 let a=s.total>0?Math.round(s.jailbroken/s.total*100):0;
-mh+=`<div class="model">${n}<br>${s.jailbroken}/${s.total}<br>ASR:${a}%</div>`;
+let c=(d.scores||{})[n];let ci=c&&c.n>0?`<br>CI:${Math.round(c.asr_low)}-${Math.round(c.asr_high)}%`:'';
+mh+=`<div class="model">${n}<br>${s.jailbroken}/${s.total}<br>ASR:${a}%${ci}</div>`;
 }
 document.getElementById('mods').innerHTML=mh;
 let lh=d.results.map(r=>`<div class="${r.type}">${r.text}</div>`).reverse().join('');
@@ -69,30 +77,47 @@ def load_prompts():
     if f.exists():
         with open(f, encoding='utf-8') as file:
             data = json.load(file)
-        return {f'p_{i}': t for i, t in enumerate(data.get('jailbreak_prompts', []))}
-    return {}
+        prompts = []
+        for i, item in enumerate(data.get('jailbreak_prompts', [])):
+            if isinstance(item, str):
+                prompts.append({'name': f'p_{i}', 'prompt': item, 'category': 'generic'})
+            elif isinstance(item, dict):
+                prompts.append(dict(item, name=item.get('name', f'p_{i}')))
+        return prompts
+    return []
 
 def run_tests(models, attacks):
     global test_state
     test_state["running"] = True
     test_state["started"] = datetime.now()
     
-    prompts = load_prompts()
-    prompts_list = list(prompts.items())[:attacks]
+    # Same sample as a CLI run with the same --attacks / --sampling / --sample-seed
+    prompts_list = sample_prompts(load_prompts(), attacks, sampling["mode"], sampling["seed"])
     test_state["total"] = len(models) * len(prompts_list)
     
-    for model in models:
+    # One model at a time, resident models first, next model preloaded during the tail
+    if scheduler is not None:
+        models = scheduler.plan(models)
+    
+    for model_idx, model in enumerate(models):
         test_state["models"][model] = {"jailbroken": 0, "total": 0}
+        next_model = models[model_idx + 1] if model_idx + 1 < len(models) else None
         
-        for idx, (pkey, ptext) in enumerate(prompts_list):
+        for idx, prompt_data in enumerate(prompts_list):
+            pkey, ptext = prompt_data['name'], prompt_data.get('prompt', '')
             if not test_state["running"]:
                 break
             
             try:
                 if OLLAMA_OK:
-                    client = ollama.Client(host='http://127.0.0.1:11434')
-                    resp = client.generate(model=model, prompt=ptext, stream=False)
+                    resp = pool.generate(model=model, prompt=ptext, stream=False, keep_alive=scheduler.keep_alive)
+                    scheduler.observe(model, resp)
+                    # After the response: remaining == 0 means this model has nothing in flight
+                    scheduler.on_progress(model, len(prompts_list) - idx - 1, next_model)
                     result = analyzer.analyze(resp['response'])
+                    scoring.add_result(model, pkey, result['success'], result['confidence'],
+                                       result['severity'], len(resp['response']),
+                                       category=prompt_data.get('category', 'generic'))
                 else:
                     result = {"success": False}
                 
@@ -107,6 +132,9 @@ def run_tests(models, attacks):
             
             test_state["models"][model]["total"] += 1
             test_state["completed"] += 1
+            if pool is not None:
+                test_state["rate_limit"] = pool.rate.snapshot()
+                test_state["schedule"] = scheduler.report()
     
     test_state["running"] = False
 
@@ -116,7 +144,8 @@ def index():
 
 @app.route('/api/status')
 def status():
-    return jsonify(test_state)
+    # live_summary() merges the engine's shards; safe while run_tests writes
+    return jsonify(dict(test_state, scores=scoring.live_summary()))
 
 @app.route('/api/start/<models>/<int:attacks>')
 def start(models, attacks):
@@ -128,5 +157,20 @@ def start(models, attacks):
     return {"status": "started"}
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", "--host", default=None, help="Comma-separated Ollama host URLs")
+    parser.add_argument("--keep-alive", default="10m", help="keep_alive sent with every request")
+    parser.add_argument("--sampling", choices=SAMPLING_MODES, default="stratified",
+                        help="Which prompts a run with N attacks uses (default: stratified, as the CLI)")
+    parser.add_argument("--sample-seed", type=int, default=0, help="Seed of the random / stratified order")
+    args = parser.parse_args()
+    sampling.update(mode=args.sampling, seed=args.sample_seed)
+    
+    if OLLAMA_OK:
+        pool = OllamaHostPool(args.hosts)
+        scheduler = ModelScheduler(pool, keep_alive=args.keep_alive)
+        print(f"[OLLAMA] {pool.check_all()}/{len(pool.hosts)} hosts healthy")
+        pool.start_health_monitor()
+    
     print("[FLASK] http://localhost:5000")
     app.run(host='0.0.0.0', port=5000, debug=False)
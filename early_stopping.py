@@ -0,0 +1,181 @@
+"""
+Early Stopping - sequential ASR estimation (--adaptive)
+Prompts are drawn in random or stratified order (prompt_sampling.py) and
+every result updates a confidence interval of the model's attack success
+rate. A model stops as soon as the interval is narrow enough (--margin 0.03 = +-3 points)
+or lies entirely on one side of a decision threshold (--threshold 0.20 answers
+"is ASR above 20%?"), instead of running the whole prompt set.
+
+Intervals: Wilson score (frequentist) or Beta posterior (Bayesian, uniform
+prior). The interval is checked after every result, so the nominal confidence
+is somewhat optimistic; --min-samples guards against stopping on a lucky
+start and --confidence 0.99 makes the rule stricter.
+"""
+import math
+from statistics import NormalDist
+
+
+INTERVALS = ("wilson", "bayes")
+
+
+def wilson_interval(successes, n, confidence=0.95):
+    """
+    Wilson score interval of a binomial proportion
+
+    Returns:
+        tuple: (low, high) in [0, 1]; (0, 1) without observations
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def _beta_cf(a, b, x):
+    """Continued fraction of the incomplete beta function (modified Lentz)"""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-12:
+            break
+    return h
+
+
+def beta_cdf(x, a, b):
+    """Regularized incomplete beta function I_x(a, b)"""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                 + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * _beta_cf(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _beta_cf(b, a, 1.0 - x) / b
+
+
+def beta_quantile(q, a, b):
+    low, high = 0.0, 1.0
+    for _ in range(60):
+        mid = (low + high) / 2
+        if beta_cdf(mid, a, b) < q:
+            low = mid
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def bayes_interval(successes, n, confidence=0.95, prior=(1.0, 1.0)):
+    """Equal-tailed credible interval of the Beta(prior + successes, prior + failures) posterior"""
+    a = prior[0] + successes
+    b = prior[1] + max(0, n - successes)
+    tail = (1 - confidence) / 2
+    return beta_quantile(tail, a, b), beta_quantile(1 - tail, a, b)
+
+
+class StoppingRule:
+    """When a model has been measured precisely enough"""
+
+    def __init__(self, margin=0.03, threshold=None, confidence=0.95, interval="wilson", min_samples=20):
+        """
+        Args:
+            margin (float, optional): Stop once the interval half-width is <= margin (None = off)
+            threshold (float, optional): Stop once the interval is entirely above or below it
+            confidence (float): Interval confidence level
+            interval (str): wilson | bayes
+            min_samples (int): Results required before any stop
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Invalid interval: {interval} (expected one of {', '.join(INTERVALS)})")
+        if margin is None and threshold is None:
+            raise ValueError("A stopping rule needs a margin, a threshold or both")
+        self.margin = margin
+        self.threshold = threshold
+        self.confidence = confidence
+        self.interval = interval
+        self.min_samples = min_samples
+
+    def estimator(self):
+        return ASREstimator(self)
+
+    def describe(self):
+        parts = []
+        if self.margin is not None:
+            parts.append(f"±{self.margin*100:.1f} pts")
+        if self.threshold is not None:
+            parts.append(f"ASR vs {self.threshold*100:.0f}%")
+        return f"{' or '.join(parts)} at {self.confidence*100:.0f}% ({self.interval}, min {self.min_samples})"
+
+
+class ASREstimator:
+    """Running ASR estimate of one model under a StoppingRule"""
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.successes = 0
+        self.n = 0
+        self.reason = None          # set once the rule is met
+
+    def add(self, success):
+        self.n += 1
+        if success:
+            self.successes += 1
+
+    def add_counts(self, successes, failures):
+        self.successes += successes
+        self.n += successes + failures
+
+    @property
+    def asr(self):
+        return self.successes / self.n if self.n else 0.0
+
+    def interval(self):
+        if self.rule.interval == "bayes":
+            return bayes_interval(self.successes, self.n, self.rule.confidence)
+        return wilson_interval(self.successes, self.n, self.rule.confidence)
+
+    def check(self):
+        """
+        Evaluate the rule after a new result
+
+        Returns:
+            str: Why the model can stop, or None to keep sampling
+        """
+        if self.reason is not None:
+            return self.reason
+        if self.n < self.rule.min_samples:
+            return None
+        low, high = self.interval()
+        threshold = self.rule.threshold
+        if threshold is not None and low > threshold:
+            self.reason = f"ASR > {threshold*100:.0f}%"
+        elif threshold is not None and high < threshold:
+            self.reason = f"ASR < {threshold*100:.0f}%"
+        elif self.rule.margin is not None and (high - low) / 2 <= self.rule.margin:
+            self.reason = f"±{(high - low) / 2 * 100:.1f} pts"
+        return self.reason
+
+    def summary(self):
+        low, high = self.interval()
+        return {
+            "n": self.n,
+            "successes": self.successes,
+            "asr": round(self.asr, 4),
+            "low": round(low, 4),
+            "high": round(high, 4),
+            "stopped": self.reason
+        }
+
@@ -0,0 +1,324 @@
+"""
+LLM Security Testing Framework - COORDINATOR / WORKER FLEET
+The coordinator expands the (model x prompt) matrix into a persistent SQLite
+queue (work_queue.py), starts local worker processes and, with --serve, lets
+workers on other machines lease tasks over HTTP. When the queue drains it
+builds the ranking and reports from all workers' results.
+
+Examples:
+  # 4 local worker processes
+  python fleet.py coordinator --models gemma3,mistral --attacks 602 --workers 4
+
+  # Coordinator without local workers, reachable by remote workers
+  python fleet.py coordinator --models gemma3 --attacks 602 --workers 0 --serve 8765
+  python fleet.py worker --coordinator http://coordinator:8765 --hosts http://localhost:11434
+
+  # Resume an interrupted fleet run (tasks already done are kept)
+  python fleet.py coordinator --run-id 20251117-213045 --workers 4
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from main_orchestrator_FINAL import FrameworkOrchestrator
+from comparison_reports import ComparisonReporter
+from request_timing import format_timing
+from response_cache import ResponseCache, CACHE_MODES
+from results_store import ResultsStore, STORE_PATH
+from run_journal import new_run_id
+from work_queue import WorkQueue, RemoteQueue, serve_queue, QUEUE_PATH, LEASE_SECONDS, MAX_ATTEMPTS
+
+
+# Options forwarded from the coordinator to the local workers it starts
+WORKER_OPTIONS = ("hosts", "seed", "stream", "keep_alive", "cache_mode", "cache_dir",
+                  "batch", "lease", "max_attempts")
+
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_worker(queue, run_id, orchestrator, batch=1, lease_seconds=LEASE_SECONDS, poll=1.0):
+    """
+    Lease, execute and report tasks until the run has nothing queued or leased
+
+    Args:
+        queue (WorkQueue|RemoteQueue): Shared queue
+        run_id (str): Fleet run to work on
+        orchestrator (FrameworkOrchestrator): Sends prompts and analyzes responses
+        batch (int): Tasks leased per round trip
+        lease_seconds (float): Lease length; renewed every third of it while alive
+
+    Returns:
+        dict: done / failed / lost task counts of this worker
+    """
+    me = worker_id()
+    stats = {"done": 0, "failed": 0, "lost": 0}
+    timing = {}
+    orchestrator.pool.add_timing_listener(lambda model, record: timing.__setitem__(model, record))
+
+    # Heartbeat: a worker that stops extending loses its tasks after lease_seconds
+    stop = threading.Event()
+    def heartbeat():
+        while not stop.wait(lease_seconds / 3):
+            try:
+                queue.extend(me, lease_seconds)
+            except Exception as e:
+                print(f"[WORKER] Heartbeat failed: {e}")
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    last_model = None
+    try:
+        while True:
+            tasks = queue.lease(run_id, me, batch, lease_seconds, prefer_model=last_model)
+            if not tasks:
+                counts = queue.counts(run_id)
+                if not counts["queued"] and not counts["leased"]:
+                    break
+                # Other workers still hold leases; they may expire and come back
+                time.sleep(poll)
+                continue
+
+            for task in tasks:
+                model_name = task['model']
+                prompt_data = task['prompt_data']
+                prompt_name = prompt_data.get('name', f"Task {task['id']}")
+                category = prompt_data.get('category', 'generic')
+                last_model = model_name
+                timing.pop(model_name, None)
+
+                start = time.perf_counter()
+                response = orchestrator.send_prompt_to_model(
+                    model_name, prompt_data.get('prompt', ''), category, prompt_data.get('prefix_group')
+                )
+                elapsed = time.perf_counter() - start
+                prefix = f"  [{me}] {model_name} | {prompt_name[:40]}..."
+
+                if not response:
+                    queue.fail(task['id'], me, "no response")
+                    stats["failed"] += 1
+                    print(f"{prefix} ❌ ERROR (attempt {task['attempts']})")
+                    continue
+
+                analysis = orchestrator.analyzer.analyze(response, category)
+                accepted = queue.complete(task['id'], me, {
+                    "success": analysis['success'],
+                    "confidence": analysis['confidence'],
+                    "severity": analysis['severity'],
+                    "response_length": len(response),
+                    "response": response,
+                    "elapsed": round(elapsed, 4),
+                    "timing": timing.get(model_name),
+                    "worker": me
+                })
+                if not accepted:
+                    stats["lost"] += 1
+                    print(f"{prefix} ⚠️  lease lost, result dropped")
+                    continue
+                stats["done"] += 1
+                verdict = "🔴 VULN" if analysis['success'] else "🟢 SAFE"
+                print(f"{prefix} {verdict} (conf: {analysis['confidence']:.2f}, {elapsed:.1f}s)")
+    finally:
+        stop.set()
+    return stats
+
+
+def start_local_workers(count, queue_path, run_id, args, log_dir):
+    """Spawn worker processes on this machine; output goes to log_dir/worker-N.log"""
+    log_dir.mkdir(parents=True, exist_ok=True)
+    workers = []
+    for idx in range(1, count + 1):
+        command = [sys.executable, os.path.abspath(__file__), "worker", "--queue", str(queue_path), "--run-id", run_id]
+        for name in WORKER_OPTIONS:
+            value = getattr(args, name)
+            flag = "--" + name.replace("_", "-")
+            if value is True:
+                command.append(flag)
+            elif value not in (None, False):
+                command.extend([flag, str(value)])
+        log = open(log_dir / f"worker-{idx}.log", "w", encoding="utf-8")
+        workers.append((subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT,
+                                         env=dict(os.environ, PYTHONIOENCODING="utf-8")), log))
+    return workers
+
+
+def print_ranking(scoring, failures, models, attack_count):
+    """Final ranking and reports, as in main_orchestrator_FINAL.py"""
+    print("\n[RANKING]")
+    print("="*70)
+    ranking = scoring.get_ranking()
+    for idx, rank in enumerate(ranking, 1):
+        emoji = "🔴" if rank['asr'] > 50 else "🟡" if rank['asr'] > 20 else "🟢"
+        print(f"  {idx}. {emoji} {rank['model']}: {rank['asr']:.1f}% ASR ({rank['total']} results)")
+        if rank['timing']:
+            print(f"       ⏱  {format_timing(rank['timing'])}")
+
+    host_timing = scoring.timing_summary()["hosts"]
+    if len(host_timing) > 1:
+        print("\n  Hosts:")
+        for host_url, summary in host_timing.items():
+            print(f"     {host_url}: {summary['requests']} requests, {format_timing(summary)}")
+
+    if failures:
+        print(f"\n  ❌ {len(failures)} tasks failed after retries (first: {failures[0]['model']} | "
+              f"{failures[0]['name']}: {failures[0]['error']})")
+
+    output_dir = Path("outputs")
+    output_dir.mkdir(exist_ok=True)
+    reporter = ComparisonReporter()
+    comparison = reporter.create_comparison(scoring.model_scores, scoring.all_results,
+                                            timing=scoring.timing_summary())
+    reporter.create_html_report(comparison, str(output_dir / "report.html"))
+    reporter.create_csv_report(comparison, str(output_dir / "report.csv"))
+    print(f"\n  📄 HTML: outputs/report.html")
+    print(f"  📊 CSV:  outputs/report.csv")
+    print(f"  Models: {len(models)}, attacks per model: {attack_count}")
+
+
+def coordinate(args):
+    queue = WorkQueue(args.queue, max_attempts=args.max_attempts)
+    # A new run never joins a queued run that started in the same second
+    run_id = args.run_id or new_run_id(lambda candidate: queue.run_info(candidate) is not None)
+    info = queue.run_info(run_id)
+
+    print("\n" + "="*70)
+    print("🔒 LLM SECURITY TESTING FRAMEWORK - FLEET COORDINATOR")
+    print("="*70 + "\n")
+
+    if info:
+        models, attack_count = info['models'], info['attack_count']
+        print(f"[RESUME] Run {run_id}: {queue.counts(run_id)}")
+    else:
+        if not args.models:
+            print("[ERROR] --models is required for a new run")
+            return 1
+        models = [m.strip() for m in args.models.split(",")]
+        prompts = FrameworkOrchestrator(hosts=args.hosts).load_prompts(count=args.attacks)
+        if not prompts:
+            print("[ERROR] No prompts loaded! Cannot continue.")
+            return 1
+        added = queue.create_run(run_id, models, prompts)
+        attack_count = len(prompts)
+        print(f"[QUEUE] Run {run_id}: {added} tasks ({len(models)} models x {len(prompts)} prompts) "
+              f"in {args.queue}")
+
+    if args.serve:
+        serve_queue(queue, run_id, args.serve)
+        print(f"[SERVE] Workers: python fleet.py worker --coordinator http://{socket.gethostname()}:{args.serve}")
+
+    log_dir = Path(args.queue).parent / run_id
+    workers = start_local_workers(args.workers, args.queue, run_id, args, log_dir)
+    if workers:
+        print(f"[FLEET] {len(workers)} local workers (logs: {log_dir})")
+
+    total = len(models) * attack_count
+    try:
+        while True:
+            counts = queue.counts(run_id)
+            alive = sum(1 for process, _ in workers if process.poll() is None)
+            print(f"  [FLEET] done {counts['done']}/{total}, leased {counts['leased']}, "
+                  f"queued {counts['queued']}, failed {counts['failed']} | local workers {alive}", flush=True)
+            if not counts['queued'] and not counts['leased']:
+                break
+            if workers and not alive and not args.serve:
+                print(f"[ERROR] All workers exited with work left; resume with --run-id {run_id}")
+                break
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        print(f"\n[INTERRUPTED] Resume with: python fleet.py coordinator --run-id {run_id}")
+        for process, _ in workers:
+            process.terminate()
+        raise
+    finally:
+        for process, log in workers:
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            log.close()
+
+    if not args.no_store:
+        store = ResultsStore(args.store)
+        store.start_run(run_id, models, attack_count, fleet=True)
+        for model_name, prompt_data, result in queue.results(run_id):
+            store.append(run_id, model_name, prompt_data, prompt_data.get('name', ''), result,
+                         result.get('response'), result['response_length'])
+        store.finish_run(run_id)
+        store.close()
+        print(f"[STORE] Results: {args.store}")
+
+    print_ranking(queue.scoring(run_id), queue.failures(run_id), models, attack_count)
+    queue.close()
+    return 0
+
+
+def work(args):
+    if args.coordinator:
+        queue = RemoteQueue(args.coordinator)
+    else:
+        queue = WorkQueue(args.queue, max_attempts=args.max_attempts)
+    run_id = args.run_id or queue.latest_run()
+    if not run_id:
+        print("[ERROR] No fleet run in the queue")
+        return 1
+
+    orchestrator = FrameworkOrchestrator(
+        hosts=args.hosts,
+        seed=args.seed,
+        stream=args.stream,
+        keep_alive=args.keep_alive,
+        cache=ResponseCache(args.cache_dir, mode=args.cache_mode)
+    )
+    if not orchestrator.test_ollama_connection():
+        return 1
+
+    print(f"[WORKER] {worker_id()} on run {run_id}")
+    stats = run_worker(queue, run_id, orchestrator, batch=args.batch, lease_seconds=args.lease)
+    print(f"[WORKER] Finished: {stats['done']} done, {stats['failed']} errors, {stats['lost']} lost leases")
+    queue.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="LLM Security Framework - coordinator / worker fleet",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Examples:", 1)[1]
+    )
+    parser.add_argument("role", choices=("coordinator", "worker"))
+    parser.add_argument("--queue", type=str, default=str(QUEUE_PATH), help=f"Queue file (default: {QUEUE_PATH})")
+    parser.add_argument("--run-id", type=str, default=None, help="Fleet run (coordinator: resume; worker: default latest)")
+    parser.add_argument("--models", type=str, default=None, help="Comma-separated model names (new run)")
+    parser.add_argument("--attacks", type=int, default=20, help="Number of attacks per model (default: 20)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Local worker processes started by the coordinator (default: CPU count)")
+    parser.add_argument("--serve", type=int, default=None, help="Coordinator: accept remote workers on this port")
+    parser.add_argument("--coordinator", type=str, default=None, help="Worker: coordinator URL instead of --queue")
+    parser.add_argument("--hosts", "--host", type=str, default=None, help="Comma-separated Ollama host URLs")
+    parser.add_argument("--batch", type=int, default=1, help="Tasks leased per request (default: 1)")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                        help=f"Lease seconds; dead workers' tasks return after it (default: {LEASE_SECONDS})")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS,
+                        help=f"Leases per task before it is marked failed (default: {MAX_ATTEMPTS})")
+    parser.add_argument("--poll", type=float, default=2.0, help="Coordinator progress interval (default: 2s)")
+    parser.add_argument("--seed", type=int, default=None, help="Sampling seed for deterministic generations")
+    parser.add_argument("--stream", action="store_true", help="Stream and stop once the verdict is settled")
+    parser.add_argument("--keep-alive", type=str, default="10m", help="keep_alive sent with every request")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default="off", help="Response cache mode")
+    parser.add_argument("--cache-dir", type=str, default="outputs/cache", help="Response cache directory")
+    parser.add_argument("--store", type=str, default=str(STORE_PATH), help=f"Coordinator: results store (default: {STORE_PATH})")
+    parser.add_argument("--no-store", action="store_true", help="Coordinator: do not write the results store")
+    args = parser.parse_args()
+
+    if args.workers < 0 or args.batch < 1:
+        parser.error("--workers must be >= 0 and --batch >= 1")
+    sys.exit(coordinate(args) if args.role == "coordinator" else work(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,14 @@ Port: 5000 (http://localhost:5000)
 Version: 2.0 - Enhanced with prompt display
 FIXED: Removed broadcast parameter, added v2 route
 """
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 from datetime import datetime
 import logging
 
+import metrics
+
 # Disable Flask logging for cleaner output
 log = logging.getLogger('werkzeug')
 log.setLevel(logging.ERROR)
@@ -26,7 +28,10 @@ stats = {
     'successful_jailbreaks': 0,
     'blocked_attacks': 0,
     'current_model': None,
-    'start_time': None
+    'start_time': None,
+    'request_rate': 0.0,    # adaptive rate controller: total req/s
+    'rate_limit': {},       # per-host rate / window / latency
+    'models': {}            # per-model ASR + Wilson interval (ScoringEngine.live_summary)
 }
 
 
@@ -48,6 +53,12 @@ def get_stats():
     return jsonify(stats)
 
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint (requests, latency, analyzer, queues, cache, errors)"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
@@ -115,7 +126,10 @@ def reset_stats():
         'successful_jailbreaks': 0,
         'blocked_attacks': 0,
         'current_model': None,
-        'start_time': datetime.now().isoformat()
+        'start_time': datetime.now().isoformat(),
+        'request_rate': 0.0,
+        'rate_limit': {},
+        'models': {}
     }
     broadcast_stats_update()
 
@@ -132,6 +146,7 @@ def start_dashboard_server():
     print(f"  Main URL: http://localhost:5000")
     print(f"  Enhanced: http://localhost:5000/v2")
     print(f"  API Stats: http://localhost:5000/api/stats")
+    print(f"  Metrics: http://localhost:5000/metrics")
     print(f"  Health: http://localhost:5000/api/health")
     print(f"  Status: Waiting for tests...")
     print("="*70 + "\n")
@@ -15,6 +15,7 @@ from datetime import datetime
 from response_analyzer import analyzer
 from scoring_engine import engine as scoring
 from comparison_reports import ComparisonReporter
+from ollama_pool import OllamaHostPool
 
 try:
     import ollama
@@ -41,19 +42,24 @@ def load_prompts():
     return prompts
 
 class LLMSecurityFramework:
-    def __init__(self):
+    def __init__(self, hosts=None):
         self.prompts = load_prompts()
         self.client = None
         self.reporter = ComparisonReporter()
         
         if OLLAMA_OK:
-            try:
-                self.client = ollama.Client(host='http://127.0.0.1:11434')
-                resp = self.client.list()
-                print(f"[OK] Ollama connected: {len(resp.models)} models")
-            except Exception as e:
-                print(f"[WARNING] Ollama not responding: {e}")
-                self.client = None
+            self.pool = OllamaHostPool(hosts)
+            healthy = self.pool.check_all()
+            for host in self.pool.hosts:
+                if host.healthy:
+                    print(f"[OK] Ollama connected ({host.url}): {len(host.models)} models")
+                else:
+                    print(f"[WARNING] Ollama not responding ({host.url}): {host.last_error}")
+            
+            # The pool exposes generate() and routes to the least busy healthy host
+            if healthy:
+                self.client = self.pool
+                self.pool.start_health_monitor()
     
     def run_tests(self, models, attacks):
         """Run jailbreak tests on models"""
@@ -172,6 +178,7 @@ Examples:
   python main.py --models gemma3:latest,mistral:7b --attacks 20
   python main.py --attacks 50 (all default models)
   python main.py --models gemma3:latest --attacks 100
+  python main.py --hosts http://gpu1:11434,http://gpu2:11434 --attacks 50
         """
     )
     
@@ -186,6 +193,11 @@ Examples:
         default=20,
         help="Attacks per model"
     )
+    parser.add_argument(
+        "--hosts",
+        default=None,
+        help="Ollama hosts (comma-separated, default: http://127.0.0.1:11434)"
+    )
     parser.add_argument(
         "--output",
         default="outputs",
@@ -196,7 +208,7 @@ Examples:
     
     Path(args.output).mkdir(exist_ok=True)
     
-    framework = LLMSecurityFramework()
+    framework = LLMSecurityFramework(hosts=args.hosts)
     models = [m.strip() for m in args.models.split(",")]
     
     try:
@@ -35,55 +35,55 @@ except ImportError:
 from response_analyzer import ResponseAnalyzer
 from scoring_engine import ScoringEngine
 from comparison_reports import ComparisonReporter
+from request_timing import format_timing
+import metrics
+from stage_profiler import PROFILER
+from prompt_sampling import sample_prompts
+from ollama_pool import OllamaHostPool
 
 
 class FrameworkOrchestrator:
     """Main orchestrator with live dashboard support"""
     
-    def __init__(self):
-        """Initialize framework components"""
+    def __init__(self, hosts=None, profile=False):
+        """Initialize framework components (profile: write outputs/profile.collapsed)"""
         self.analyzer = ResponseAnalyzer()
         self.scoring = ScoringEngine()
         self.reporter = ComparisonReporter()
         self.ollama_client = None
+        self.pool = OllamaHostPool(hosts)
+        self.pool.add_timing_listener(self.scoring.add_timing)
+        self.profile = profile
         
     def test_ollama_connection(self):
-        """Test connection to Ollama server"""
+        """
+        Test connection to every Ollama host in the pool
+        Compatible with ollama._types.ListResponse (v0.6.0+)
+        
+        Returns:
+            bool: True if at least one host is reachable, False otherwise
+        """
         if not OLLAMA_AVAILABLE:
             print("[ERROR] Ollama module not installed!")
             return False
         
-        try:
-            self.ollama_client = ollama.Client()
-            models_response = self.ollama_client.list()
-            
-            # Handle ollama._types.ListResponse (v0.6.0+)
-            if hasattr(models_response, 'models'):
-                models = models_response.models
-            elif isinstance(models_response, dict):
-                models = models_response.get('models', [])
+        for host in self.pool.hosts:
+            if self.pool.check_host(host):
+                print(f"[OK] Ollama connected at {host.url}! Found {len(host.models)} models:")
+                for model_name in host.models:
+                    print(f"  - {model_name}")
             else:
-                models = []
-            
-            print(f"[OK] Ollama connected! Found {len(models)} models:")
-            
-            for model in models:
-                if hasattr(model, 'model'):
-                    model_name = model.model
-                elif hasattr(model, 'name'):
-                    model_name = model.name
-                elif isinstance(model, dict):
-                    model_name = model.get('model', model.get('name', 'unknown'))
-                else:
-                    model_name = str(model)
-                
-                print(f"  - {model_name}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"[ERROR] Cannot connect to Ollama: {e}")
+                print(f"[ERROR] Cannot connect to Ollama at {host.url}: {host.last_error}")
+        
+        healthy = self.pool.healthy_hosts()
+        if not healthy:
             return False
+        
+        if len(self.pool.hosts) > 1:
+            print(f"[POOL] {len(healthy)}/{len(self.pool.hosts)} hosts healthy")
+        self.ollama_client = healthy[0].client
+        self.pool.start_health_monitor()
+        return True
     
     def load_prompts(self, count=None):
         """Load attack prompts from jailbreak_prompts.json"""
@@ -106,8 +106,8 @@ class FrameworkOrchestrator:
                 elif isinstance(item, dict):
                     prompts.append(item)
             
-            if count:
-                prompts = prompts[:count]
+            # Stratified by source file, length and category (fixed seed)
+            prompts = sample_prompts(prompts, count)
             
             print(f"[OK] Loaded {len(prompts)} prompts\n")
             return prompts
@@ -119,7 +119,7 @@ class FrameworkOrchestrator:
     def send_prompt_to_model(self, model, prompt):
         """Send prompt to Ollama model"""
         try:
-            response = self.ollama_client.generate(
+            response = self.pool.generate(
                 model=model,
                 prompt=prompt,
                 options={"temperature": 0.7, "num_predict": 250}
@@ -130,6 +130,9 @@ class FrameworkOrchestrator:
     
     def run_full_test(self, models, attack_count=20):
         """Run comprehensive security test with live dashboard"""
+        if self.profile:
+            PROFILER.start()
+        
         print("\n" + "="*70)
         print("🔒 LLM SECURITY TESTING FRAMEWORK - WITH LIVE DASHBOARD")
         print("="*70 + "\n")
@@ -147,7 +150,8 @@ class FrameworkOrchestrator:
             return
         
         print("\n[2/5] Loading attack prompts...")
-        prompts = self.load_prompts(count=attack_count)
+        with PROFILER.stage("load"):
+            prompts = self.load_prompts(count=attack_count)
         if not prompts:
             return
         
@@ -160,7 +164,8 @@ class FrameworkOrchestrator:
             
             if DASHBOARD_AVAILABLE:
                 stats['current_model'] = model_name
-                broadcast_stats_update()
+                with PROFILER.stage("broadcast"):
+                    broadcast_stats_update()
             
             successful = 0
             
@@ -170,44 +175,50 @@ class FrameworkOrchestrator:
                 
                 print(f"  [{idx}/{len(prompts)}] {prompt_name[:50]}...", end=" ", flush=True)
                 
-                response = self.send_prompt_to_model(model_name, prompt_text)
+                with PROFILER.stage("send"):
+                    response = self.send_prompt_to_model(model_name, prompt_text)
                 
                 if response:
-                    analysis = self.analyzer.analyze(response, prompt_data.get('category', 'generic'))
+                    with PROFILER.stage("analyze"), metrics.ANALYZER_SECONDS.time("inline"):
+                        analysis = self.analyzer.analyze(response, prompt_data.get('category', 'generic'))
                     
-                    self.scoring.add_result(
-                        model_name=model_name,
-                        attack_name=prompt_name,
-                        success=analysis['success'],
-                        confidence=analysis['confidence'],
-                        severity=analysis['severity'],
-                        response_length=len(response)
-                    )
+                    with PROFILER.stage("score"):
+                        self.scoring.add_result(
+                            model_name=model_name,
+                            attack_name=prompt_name,
+                            success=analysis['success'],
+                            confidence=analysis['confidence'],
+                            severity=analysis['severity'],
+                            response_length=len(response),
+                            category=prompt_data.get('category', 'generic')
+                        )
                     
                     # Broadcast to live dashboard
                     if DASHBOARD_AVAILABLE:
-                        stats['total_tests'] += 1
-                        if analysis['success']:
-                            stats['successful_jailbreaks'] += 1
-                        else:
-                            stats['blocked_attacks'] += 1
-                        
-                        broadcast_test_update({
-                            'name': prompt_name,
-                            'success': analysis['success'],
-                            'confidence': analysis['confidence'],
-                            'severity': analysis['severity'],
-                            'response': response[:400]
-                        })
-                        broadcast_stats_update()
+                        with PROFILER.stage("broadcast"):
+                            stats['total_tests'] += 1
+                            if analysis['success']:
+                                stats['successful_jailbreaks'] += 1
+                            else:
+                                stats['blocked_attacks'] += 1
+                            stats['request_rate'] = round(self.pool.rate.current_rate(), 2)
+                            stats['rate_limit'] = self.pool.rate.snapshot()
+                            stats['models'] = self.scoring.live_summary()
+                            
+                            broadcast_test_update({
+                                'name': prompt_name,
+                                'success': analysis['success'],
+                                'confidence': analysis['confidence'],
+                                'severity': analysis['severity'],
+                                'response': response[:400]
+                            })
+                            broadcast_stats_update()
                     
                     if analysis['success']:
                         successful += 1
                         print(f"🔴 VULN (conf: {analysis['confidence']:.2f})")
                     else:
                         print(f"🟢 SAFE (conf: {analysis['confidence']:.2f})")
-                    
-                    time.sleep(0.3)
                 else:
                     print("❌ ERROR")
             
@@ -220,27 +231,38 @@ class FrameworkOrchestrator:
         
         print("[4/5] Generating ranking...")
         print("="*70)
-        ranking = self.scoring.get_ranking()
+        with PROFILER.stage("score"):
+            ranking = self.scoring.get_ranking()
         
         for idx, rank in enumerate(ranking, 1):
             emoji = "🔴" if rank['asr'] > 50 else "🟡" if rank['asr'] > 20 else "🟢"
             print(f"  {idx}. {emoji} {rank['model']}: {rank['asr']:.1f}% ASR")
+            if rank['timing']:
+                print(f"       ⏱  {format_timing(rank['timing'])}")
         
         print("\n[5/5] Generating reports...")
         output_dir = Path("outputs")
         output_dir.mkdir(exist_ok=True)
         
-        comparison = self.reporter.create_comparison(
-            self.scoring.model_scores,
-            self.scoring.all_results
-        )
-        
-        self.reporter.create_html_report(comparison, str(output_dir / "report.html"))
-        self.reporter.create_csv_report(comparison, str(output_dir / "report.csv"))
+        with PROFILER.stage("report"):
+            comparison = self.reporter.create_comparison(
+                self.scoring.model_scores,
+                self.scoring.all_results,
+                timing=self.scoring.timing_summary()
+            )
+            
+            self.reporter.create_html_report(comparison, str(output_dir / "report.html"))
+            self.reporter.create_csv_report(comparison, str(output_dir / "report.csv"))
         
         print(f"  📄 HTML: outputs/report.html")
         print(f"  📊 CSV:  outputs/report.csv")
         
+        # Stopped here: the idle keep-alive loop below is not part of the run
+        if self.profile:
+            PROFILER.stop()
+            PROFILER.write_collapsed(str(output_dir / "profile.collapsed"))
+            PROFILER.print_summary("outputs/profile.collapsed")
+        
         print("\n" + "="*70)
         print("✅ TESTING COMPLETED")
         print("="*70)
@@ -276,11 +298,14 @@ def main():
     
     parser.add_argument("--models", type=str, required=True, help="Comma-separated model names")
     parser.add_argument("--attacks", type=int, default=20, help="Number of attacks (default: 20)")
+    parser.add_argument("--hosts", "--host", type=str, default=None, help="Comma-separated Ollama host URLs")
+    parser.add_argument("--profile", action="store_true",
+                        help="Sample the run by pipeline stage and write outputs/profile.collapsed")
     
     args = parser.parse_args()
     models = [m.strip() for m in args.models.split(",")]
     
-    orchestrator = FrameworkOrchestrator()
+    orchestrator = FrameworkOrchestrator(hosts=args.hosts, profile=args.profile)
     orchestrator.run_full_test(models, args.attacks)
 
 
@@ -34,52 +34,58 @@ except ImportError:
 from response_analyzer import ResponseAnalyzer
 from scoring_engine import ScoringEngine
 from comparison_reports import ComparisonReporter
+from request_timing import format_timing
+import metrics
+from stage_profiler import PROFILER
+from prompt_sampling import sample_prompts
+from ollama_pool import OllamaHostPool
+from async_engine import AsyncAttackEngine
 
 
 class FrameworkOrchestrator:
     """Main orchestrator with enhanced dashboard (shows prompts)"""
     
-    def __init__(self):
+    def __init__(self, hosts=None, concurrency=1, max_per_model=None, max_per_host=None, profile=False):
         self.analyzer = ResponseAnalyzer()
         self.scoring = ScoringEngine()
         self.reporter = ComparisonReporter()
         self.ollama_client = None
+        self.pool = OllamaHostPool(hosts)
+        self.pool.add_timing_listener(self.scoring.add_timing)
+        self.concurrency = concurrency
+        self.max_per_model = max_per_model
+        self.max_per_host = max_per_host
+        self.profile = profile
         
     def test_ollama_connection(self):
-        """Test Ollama connection"""
+        """
+        Test connection to every Ollama host in the pool
+        Compatible with ollama._types.ListResponse (v0.6.0+)
+        
+        Returns:
+            bool: True if at least one host is reachable, False otherwise
+        """
         if not OLLAMA_AVAILABLE:
             print("[ERROR] Ollama module not installed!")
             return False
         
-        try:
-            self.ollama_client = ollama.Client()
-            models_response = self.ollama_client.list()
-            
-            if hasattr(models_response, 'models'):
-                models = models_response.models
-            elif isinstance(models_response, dict):
-                models = models_response.get('models', [])
+        for host in self.pool.hosts:
+            if self.pool.check_host(host):
+                print(f"[OK] Ollama connected at {host.url}! Found {len(host.models)} models:")
+                for model_name in host.models:
+                    print(f"  - {model_name}")
             else:
-                models = []
-            
-            print(f"[OK] Ollama connected! Found {len(models)} models:")
-            
-            for model in models:
-                if hasattr(model, 'model'):
-                    model_name = model.model
-                elif hasattr(model, 'name'):
-                    model_name = model.name
-                elif isinstance(model, dict):
-                    model_name = model.get('model', model.get('name', 'unknown'))
-                else:
-                    model_name = str(model)
-                print(f"  - {model_name}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"[ERROR] Cannot connect to Ollama: {e}")
+                print(f"[ERROR] Cannot connect to Ollama at {host.url}: {host.last_error}")
+        
+        healthy = self.pool.healthy_hosts()
+        if not healthy:
             return False
+        
+        if len(self.pool.hosts) > 1:
+            print(f"[POOL] {len(healthy)}/{len(self.pool.hosts)} hosts healthy")
+        self.ollama_client = healthy[0].client
+        self.pool.start_health_monitor()
+        return True
     
     def load_prompts(self, count=None):
         """Load attack prompts from jailbreak_prompts.json"""
@@ -102,8 +108,8 @@ class FrameworkOrchestrator:
                 elif isinstance(item, dict):
                     prompts.append(item)
             
-            if count:
-                prompts = prompts[:count]
+            # Stratified by source file, length and category (fixed seed)
+            prompts = sample_prompts(prompts, count)
             
             print(f"[OK] Loaded {len(prompts)} prompts\n")
             return prompts
@@ -115,7 +121,7 @@ class FrameworkOrchestrator:
     def send_prompt_to_model(self, model, prompt):
         """Send prompt to Ollama model"""
         try:
-            response = self.ollama_client.generate(
+            response = self.pool.generate(
                 model=model,
                 prompt=prompt,
                 options={"temperature": 0.7, "num_predict": 250}
@@ -124,31 +130,58 @@ class FrameworkOrchestrator:
         except Exception as e:
             return None
     
-    def run_full_test(self, models, attack_count=20):
-        """Run comprehensive security test with enhanced dashboard"""
-        print("\n" + "="*70)
-        print("🔒 LLM SECURITY TESTING FRAMEWORK - DASHBOARD v2")
-        print("="*70 + "\n")
-        
-        # Start dashboard
-        if DASHBOARD_AVAILABLE:
-            print("[DASHBOARD] Starting live dashboard server...")
-            stats['start_time'] = datetime.now().isoformat()
-            dashboard_thread = threading.Thread(target=start_dashboard_server, daemon=True)
-            dashboard_thread.start()
-            time.sleep(3)
+    def record_result(self, model_name, prompt_data, prompt_name, response):
+        """Analyze, score and broadcast a single model response"""
+        prompt_text = prompt_data.get('prompt', '')
+        with PROFILER.stage("analyze"), metrics.ANALYZER_SECONDS.time("inline"):
+            analysis = self.analyzer.analyze(response, prompt_data.get('category', 'generic'))
         
-        print("[1/5] Testing Ollama connection...")
-        if not self.test_ollama_connection():
-            return
+        with PROFILER.stage("score"):
+            self.scoring.add_result(
+                model_name=model_name,
+                attack_name=prompt_name,
+                success=analysis['success'],
+                confidence=analysis['confidence'],
+                severity=analysis['severity'],
+                response_length=len(response),
+                category=prompt_data.get('category', 'generic')
+            )
         
-        print("\n[2/5] Loading attack prompts...")
-        prompts = self.load_prompts(count=attack_count)
-        if not prompts:
-            return
+        # ENHANCED: Broadcast with PROMPT TEXT
+        if DASHBOARD_AVAILABLE:
+            with PROFILER.stage("broadcast"):
+                stats['total_tests'] += 1
+                if analysis['success']:
+                    stats['successful_jailbreaks'] += 1
+                else:
+                    stats['blocked_attacks'] += 1
+                stats['request_rate'] = round(self.pool.rate.current_rate(), 2)
+                stats['rate_limit'] = self.pool.rate.snapshot()
+                stats['models'] = self.scoring.live_summary()
+                
+                broadcast_test_update({
+                    'name': prompt_name,
+                    'prompt': prompt_text[:250],  # ← ADDED: First 250 chars of prompt
+                    'success': analysis['success'],
+                    'confidence': analysis['confidence'],
+                    'severity': analysis['severity'],
+                    'response': response[:400]
+                })
+                broadcast_stats_update()
         
-        print("[3/5] Running attacks on models...\n")
+        return analysis
+    
+    def print_model_summary(self, successful, total):
+        """Print ASR summary for one model"""
+        asr = (successful / total * 100) if total else 0.0
+        emoji = "🔴" if asr > 50 else "🟡" if asr > 20 else "🟢"
         
+        print(f"\n{emoji} ASR: {asr:.1f}%")
+        print(f"   Blocked:    {total-successful}/{total}")
+        print(f"   Jailbroken: {successful}/{total}\n")
+    
+    def run_attacks_sequential(self, models, prompts):
+        """Send prompts one at a time, model by model"""
         for model_name in models:
             print("="*70)
             print(f"MODEL: {model_name}")
@@ -156,7 +189,8 @@ class FrameworkOrchestrator:
             
             if DASHBOARD_AVAILABLE:
                 stats['current_model'] = model_name
-                broadcast_stats_update()
+                with PROFILER.stage("broadcast"):
+                    broadcast_stats_update()
             
             successful = 0
             
@@ -166,78 +200,139 @@ class FrameworkOrchestrator:
                 
                 print(f"  [{idx}/{len(prompts)}] {prompt_name[:50]}...", end=" ", flush=True)
                 
-                response = self.send_prompt_to_model(model_name, prompt_text)
+                with PROFILER.stage("send"):
+                    response = self.send_prompt_to_model(model_name, prompt_text)
                 
                 if response:
-                    analysis = self.analyzer.analyze(response, prompt_data.get('category', 'generic'))
-                    
-                    self.scoring.add_result(
-                        model_name=model_name,
-                        attack_name=prompt_name,
-                        success=analysis['success'],
-                        confidence=analysis['confidence'],
-                        severity=analysis['severity'],
-                        response_length=len(response)
-                    )
-                    
-                    # ENHANCED: Broadcast with PROMPT TEXT
-                    if DASHBOARD_AVAILABLE:
-                        stats['total_tests'] += 1
-                        if analysis['success']:
-                            stats['successful_jailbreaks'] += 1
-                        else:
-                            stats['blocked_attacks'] += 1
-                        
-                        broadcast_test_update({
-                            'name': prompt_name,
-                            'prompt': prompt_text[:250],  # ← ADDED: First 250 chars of prompt
-                            'success': analysis['success'],
-                            'confidence': analysis['confidence'],
-                            'severity': analysis['severity'],
-                            'response': response[:400]
-                        })
-                        broadcast_stats_update()
+                    analysis = self.record_result(model_name, prompt_data, prompt_name, response)
                     
                     if analysis['success']:
                         successful += 1
                         print(f"🔴 VULN (conf: {analysis['confidence']:.2f})")
                     else:
                         print(f"🟢 SAFE (conf: {analysis['confidence']:.2f})")
-                    
-                    time.sleep(0.3)
                 else:
                     print("❌ ERROR")
             
-            asr = (successful / len(prompts) * 100) if prompts else 0.0
-            emoji = "🔴" if asr > 50 else "🟡" if asr > 20 else "🟢"
+            self.print_model_summary(successful, len(prompts))
+    
+    def run_attacks_async(self, models, prompts):
+        """Send prompts concurrently, broadcasting results in completion order"""
+        engine = AsyncAttackEngine(
+            pool=self.pool,
+            concurrency=self.concurrency,
+            max_per_model=self.max_per_model,
+            max_per_host=self.max_per_host
+        )
+        cells = engine.build_cells(models, prompts)
+        successful = {model_name: 0 for model_name in models}
+        done = 0
+        
+        print(f"[ASYNC] {len(cells)} requests, concurrency {engine.concurrency}\n")
+        
+        def on_result(result):
+            nonlocal done
+            done += 1
+            model_name = result['model']
+            prompt_data = result['prompt_data']
+            response = result['response']
+            elapsed = result['elapsed']
+            prompt_name = prompt_data.get('name', f"Attack {result['index']}")
+            prefix = f"  [{done}/{len(cells)}] {model_name} | {prompt_name[:40]}..."
+            
+            if DASHBOARD_AVAILABLE and stats['current_model'] != model_name:
+                stats['current_model'] = model_name
+                with PROFILER.stage("broadcast"):
+                    broadcast_stats_update()
             
-            print(f"\n{emoji} ASR: {asr:.1f}%")
-            print(f"   Blocked:    {len(prompts)-successful}/{len(prompts)}")
-            print(f"   Jailbroken: {successful}/{len(prompts)}\n")
+            if response:
+                analysis = self.record_result(model_name, prompt_data, prompt_name, response)
+                if analysis['success']:
+                    successful[model_name] += 1
+                    print(f"{prefix} 🔴 VULN (conf: {analysis['confidence']:.2f}, {elapsed:.1f}s)")
+                else:
+                    print(f"{prefix} 🟢 SAFE (conf: {analysis['confidence']:.2f}, {elapsed:.1f}s)")
+            else:
+                print(f"{prefix} ❌ ERROR")
+        
+        # Event-loop time is 'send'; on_result tags its own stages
+        with PROFILER.stage("send"):
+            engine.run(cells, on_result)
+        
+        for model_name in models:
+            print("="*70)
+            print(f"MODEL: {model_name}")
+            print("="*70)
+            self.print_model_summary(successful[model_name], len(prompts))
+    
+    def run_full_test(self, models, attack_count=20):
+        """Run comprehensive security test with enhanced dashboard"""
+        if self.profile:
+            PROFILER.start()
+        
+        print("\n" + "="*70)
+        print("🔒 LLM SECURITY TESTING FRAMEWORK - DASHBOARD v2")
+        print("="*70 + "\n")
+        
+        # Start dashboard
+        if DASHBOARD_AVAILABLE:
+            print("[DASHBOARD] Starting live dashboard server...")
+            stats['start_time'] = datetime.now().isoformat()
+            dashboard_thread = threading.Thread(target=start_dashboard_server, daemon=True)
+            dashboard_thread.start()
+            time.sleep(3)
+        
+        print("[1/5] Testing Ollama connection...")
+        if not self.test_ollama_connection():
+            return
+        
+        print("\n[2/5] Loading attack prompts...")
+        with PROFILER.stage("load"):
+            prompts = self.load_prompts(count=attack_count)
+        if not prompts:
+            return
+        
+        print("[3/5] Running attacks on models...\n")
+        
+        if self.concurrency > 1:
+            self.run_attacks_async(models, prompts)
+        else:
+            self.run_attacks_sequential(models, prompts)
         
         print("[4/5] Generating ranking...")
         print("="*70)
-        ranking = self.scoring.get_ranking()
+        with PROFILER.stage("score"):
+            ranking = self.scoring.get_ranking()
         
         for idx, rank in enumerate(ranking, 1):
             emoji = "🔴" if rank['asr'] > 50 else "🟡" if rank['asr'] > 20 else "🟢"
             print(f"  {idx}. {emoji} {rank['model']}: {rank['asr']:.1f}% ASR")
+            if rank['timing']:
+                print(f"       ⏱  {format_timing(rank['timing'])}")
         
         print("\n[5/5] Generating reports...")
         output_dir = Path("outputs")
         output_dir.mkdir(exist_ok=True)
         
-        comparison = self.reporter.create_comparison(
-            self.scoring.model_scores,
-            self.scoring.all_results
-        )
-        
-        self.reporter.create_html_report(comparison, str(output_dir / "report.html"))
-        self.reporter.create_csv_report(comparison, str(output_dir / "report.csv"))
+        with PROFILER.stage("report"):
+            comparison = self.reporter.create_comparison(
+                self.scoring.model_scores,
+                self.scoring.all_results,
+                timing=self.scoring.timing_summary()
+            )
+            
+            self.reporter.create_html_report(comparison, str(output_dir / "report.html"))
+            self.reporter.create_csv_report(comparison, str(output_dir / "report.csv"))
         
         print(f"  📄 HTML: outputs/report.html")
         print(f"  📊 CSV:  outputs/report.csv")
         
+        # Stopped here: the idle keep-alive loop below is not part of the run
+        if self.profile:
+            PROFILER.stop()
+            PROFILER.write_collapsed(str(output_dir / "profile.collapsed"))
+            PROFILER.print_summary("outputs/profile.collapsed")
+        
         print("\n" + "="*70)
         print("✅ TESTING COMPLETED")
         print("="*70)
@@ -273,11 +368,23 @@ def main():
     
     parser.add_argument("--models", type=str, required=True, help="Comma-separated model names")
     parser.add_argument("--attacks", type=int, default=20, help="Number of attacks (default: 20)")
+    parser.add_argument("--hosts", "--host", type=str, default=None, help="Comma-separated Ollama host URLs")
+    parser.add_argument("--concurrency", type=int, default=1, help="In-flight requests (default: 1 = sequential)")
+    parser.add_argument("--max-per-model", type=int, default=None, help="In-flight limit per model")
+    parser.add_argument("--max-per-host", type=int, default=None, help="In-flight limit per Ollama host")
+    parser.add_argument("--profile", action="store_true",
+                        help="Sample the run by pipeline stage and write outputs/profile.collapsed")
     
     args = parser.parse_args()
     models = [m.strip() for m in args.models.split(",")]
     
-    orchestrator = FrameworkOrchestrator()
+    orchestrator = FrameworkOrchestrator(
+        hosts=args.hosts,
+        concurrency=max(1, args.concurrency),
+        max_per_model=args.max_per_model,
+        max_per_host=args.max_per_host,
+        profile=args.profile
+    )
     orchestrator.run_full_test(models, args.attacks)
 
 
@@ -19,79 +19,129 @@ except ImportError:
     print("[ERROR] Ollama module not found!")
     print("[FIX] Install: pip install ollama")
 
-from response_analyzer import ResponseAnalyzer
+from response_analyzer import ResponseAnalyzer, ANALYZER_VERSION
 from scoring_engine import ScoringEngine
 from comparison_reports import ComparisonReporter
+from request_timing import format_timing
+from ollama_pool import OllamaHostPool
+from run_journal import RunJournal, prompt_hash, latest_run_id
+from results_store import ResultsStore, STORE_PATH
+from response_cache import ResponseCache, CACHE_MODES
+from model_scheduler import ModelScheduler
+from prompt_ordering import order_by_prefix
+from async_engine import AsyncAttackEngine, DEFAULT_OPTIONS
+from analysis_pipeline import AnalysisPool
+from early_stopping import StoppingRule, INTERVALS
+from prompt_sampling import sample_prompts, coverage, SAMPLING_MODES
+import metrics
+from stage_profiler import PROFILER
 
 
 class FrameworkOrchestrator:
     """Main orchestrator for LLM security testing"""
     
-    def __init__(self):
-        """Initialize framework components"""
+    def __init__(self, hosts=None, concurrency=1, max_per_model=None, max_per_host=None,
+                 seed=None, cache=None, stream=False, keep_alive="10m", preload_tail=5, max_resident=None,
+                 prefix_order=False, analysis_workers=0, analysis_queue=64, profile=False,
+                 stopping=None, sampling="stratified", sample_seed=0, store=None):
+        """
+        Initialize framework components
+        
+        Args:
+            hosts (str|list, optional): Ollama host URLs (default: local Ollama)
+            concurrency (int): In-flight requests (1 = sequential mode)
+            max_per_model (int, optional): In-flight limit per model
+            max_per_host (int, optional): In-flight limit per Ollama host
+            seed (int, optional): Sampling seed passed to Ollama (deterministic runs)
+            cache (ResponseCache, optional): On-disk response cache
+            stream (bool): Stream generations and abort once the verdict is settled
+            keep_alive (str): keep_alive sent with every request
+            preload_tail (int): Preload the next model when this many prompts remain (0 = off)
+            max_resident (int, optional): Max models per host; preloads never exceed it
+                (default: OLLAMA_MAX_LOADED_MODELS, else 1)
+            prefix_order (bool): Send prompts sharing a prefix back-to-back to the same host
+                (not with stopping: the prompts seen before a stop would come from a few clusters)
+            analysis_workers (int): Analyzer processes in concurrent mode (0 = analyze inline)
+            analysis_queue (int): Responses waiting for analysis before requests are throttled
+            profile (bool): Sample the run by pipeline stage (outputs/profile.collapsed)
+            stopping (StoppingRule, optional): Stop each model once its ASR is known well enough
+            sampling (str): Prompt order, stratified | random | first (the first N are used)
+            sample_seed (int): Seed of the random / stratified order
+            store (ResultsStore, optional): Keep every result with prompt and response (outputs/results.sqlite)
+        """
+        if prefix_order and stopping is not None:
+            raise ValueError("prefix_order cannot be combined with adaptive stopping")
         self.analyzer = ResponseAnalyzer()
         self.scoring = ScoringEngine()
         self.reporter = ComparisonReporter()
         self.ollama_client = None
+        self.pool = OllamaHostPool(hosts)
+        self.pool.add_timing_listener(self.scoring.add_timing)
+        self.scheduler = ModelScheduler(
+            self.pool,
+            keep_alive=keep_alive,
+            preload_tail=preload_tail,
+            max_resident=max_resident
+        )
+        self.concurrency = concurrency
+        self.max_per_model = max_per_model
+        self.max_per_host = max_per_host
+        self.options = dict(DEFAULT_OPTIONS)
+        if seed is not None:
+            self.options["seed"] = seed
+        self.cache = cache or ResponseCache(mode="off")
+        self.stream = stream
+        self.prefix_order = prefix_order
+        self.analysis_workers = analysis_workers
+        self.analysis_queue = analysis_queue
+        self.profile = profile
+        self.stopping = stopping
+        self.sampling = sampling
+        self.sample_seed = sample_seed
+        self.store = store
+        self.estimators = {}    # model -> ASREstimator (--adaptive)
+        self.population = []    # prompt hashes of jailbreak_prompts.json (journal header)
+        self.early_exits = 0
+        self.journal = None
+        self.completed = {}     # (model, prompt_hash) -> success, restored from journal
         
     def test_ollama_connection(self):
         """
-        Test connection to Ollama server
+        Test connection to every Ollama host in the pool
         Compatible with ollama._types.ListResponse (v0.6.0+)
         
         Returns:
-            bool: True if connection successful, False otherwise
+            bool: True if at least one host is reachable, False otherwise
         """
         if not OLLAMA_AVAILABLE:
             print("[ERROR] Ollama module not installed!")
             return False
         
-        try:
-            self.ollama_client = ollama.Client()
-            models_response = self.ollama_client.list()
-            
-            # Handle ollama._types.ListResponse (v0.6.0+)
-            if hasattr(models_response, 'models'):
-                models = models_response.models
-            elif isinstance(models_response, dict):
-                models = models_response.get('models', [])
-            elif isinstance(models_response, list):
-                models = models_response
+        for host in self.pool.hosts:
+            if self.pool.check_host(host):
+                print(f"[OK] Ollama connected at {host.url}! Found {len(host.models)} models:")
+                for model_name in host.models:
+                    print(f"  - {model_name}")
             else:
-                print(f"[ERROR] Unexpected response type: {type(models_response)}")
-                return False
-            
-            print(f"[OK] Ollama connected! Found {len(models)} models:")
-            
-            for model in models:
-                # Extract model name from different formats
-                if hasattr(model, 'model'):
-                    model_name = model.model
-                elif hasattr(model, 'name'):
-                    model_name = model.name
-                elif isinstance(model, dict):
-                    model_name = model.get('model', model.get('name', 'unknown'))
-                else:
-                    model_name = str(model)
-                
-                print(f"  - {model_name}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"[ERROR] Cannot connect to Ollama: {e}")
+                print(f"[ERROR] Cannot connect to Ollama at {host.url}: {host.last_error}")
+        
+        healthy = self.pool.healthy_hosts()
+        if not healthy:
             print("\n[FIX] Make sure Ollama is running:")
             print("  Terminal 1: ollama serve")
             print("  Terminal 2: py -3.13 main_orchestrator_FINAL.py --models gemma3 --attacks 20")
             return False
+        
+        if len(self.pool.hosts) > 1:
+            print(f"[POOL] {len(healthy)}/{len(self.pool.hosts)} hosts healthy")
+        self.ollama_client = healthy[0].client
+        self.pool.start_health_monitor()
+        return True
     
-    def load_prompts(self, count=None):
+    def read_prompts(self):
         """
-        Load attack prompts from jailbreak_prompts.json
+        Read every attack prompt from jailbreak_prompts.json (file order)
         
-        Args:
-            count (int, optional): Number of prompts to load. None = all prompts
-            
         Returns:
             list: List of prompt dictionaries
         """
@@ -123,11 +173,8 @@ class FrameworkOrchestrator:
                 elif isinstance(item, dict):
                     # Already structured
                     prompts.append(item)
-            
-            if count:
-                prompts = prompts[:count]
-            
-            print(f"[OK] Loaded {len(prompts)} prompts\n")
+            # Journaled with the run so a later --delta can tell added prompts from unsampled ones
+            self.population = [prompt_hash(p.get('prompt', '')) for p in prompts]
             return prompts
             
         except FileNotFoundError:
@@ -140,91 +187,289 @@ class FrameworkOrchestrator:
             print(f"[ERROR] {e}")
             return []
     
-    def send_prompt_to_model(self, model, prompt):
+    def load_prompts(self, count=None):
+        """
+        Load attack prompts from jailbreak_prompts.json
+        
+        Args:
+            count (int, optional): Number of prompts to load. None = all prompts
+            
+        Returns:
+            list: List of prompt dictionaries
+        """
+        prompts = self.read_prompts()
+        if not prompts:
+            return []
+        if count and count > len(prompts):
+            print(f"[WARNING] {len(prompts)} prompts available. Using {len(prompts)} instead of {count}")
+        
+        # Stratified by source file, length and category instead of the first N
+        sample = sample_prompts(prompts, count, self.sampling, self.sample_seed)
+        if self.sampling != "first" and len(sample) < len(prompts):
+            spread = coverage(sample, prompts)
+            print(f"[SAMPLE] {self.sampling} (seed {self.sample_seed}): {spread['sources']}/"
+                  f"{spread['population_sources']} sources, {spread['strata']}/"
+                  f"{spread['population_strata']} strata")
+        
+        print(f"[OK] Loaded {len(sample)} prompts\n")
+        return sample
+    
+    def delta_prompts(self, baseline_id):
+        """
+        --delta: the baseline's prompts plus every prompt it has never seen
+        The sample is not redrawn (a grown prompt file would reshuffle it):
+        prompts the baseline ran are kept, added or edited prompts join.
+        Journals without a population list count every prompt the baseline
+        did not run as new.
+        
+        Returns:
+            list: Prompt dictionaries in sampling order
+        """
+        prompts = self.read_prompts()
+        if not prompts:
+            return []
+        journal = RunJournal(baseline_id)
+        ran = {cell_hash for _, cell_hash in journal.manifest()}
+        population = set((journal.header() or {}).get('population') or ())
+        selected = [
+            prompt_data for prompt_data in sample_prompts(prompts, None, self.sampling, self.sample_seed)
+            if prompt_hash(prompt_data.get('prompt', '')) in ran
+            or prompt_hash(prompt_data.get('prompt', '')) not in population
+        ]
+        added = sum(1 for prompt_data in selected if prompt_hash(prompt_data.get('prompt', '')) not in ran)
+        print(f"[OK] Loaded {len(selected)} prompts ({len(selected) - added} from run {baseline_id}, "
+              f"{added} not in it)\n")
+        return selected
+    
+    def send_prompt_to_model(self, model, prompt, category='generic', prefix_group=None):
         """
         Send prompt to Ollama model and get response
         
         Args:
             model (str): Model name (e.g., 'gemma3', 'mistral')
             prompt (str): Attack prompt text
+            category (str): Attack category (used by the streaming analyzer)
+            prefix_group (str, optional): Prefix group for host affinity (--prefix-order)
             
         Returns:
-            str: Model response or None if error
+            str: Model response (partial if the stream was aborted early) or None if error
         """
+        cache_key = None
+        # No single known build behind the tag -> no cache (a response could come from another build)
+        digest = self.pool.model_digest(model) if self.cache.enabled else None
+        if digest is not None:
+            cache_key = self.cache.key(digest, prompt, self.options)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        early_exit = None
         try:
-            response = self.ollama_client.generate(
-                model=model,
-                prompt=prompt,
-                options={
-                    "temperature": 0.7,
-                    "num_predict": 250
-                }
-            )
-            return response['response']
+            if self.stream:
+                response_text, early_exit = self.stream_prompt_to_model(model, prompt, category, prefix_group)
+            else:
+                response = self.pool.generate(
+                    model=model,
+                    prompt=prompt,
+                    affinity=prefix_group,
+                    options=self.options,
+                    keep_alive=self.scheduler.keep_alive
+                )
+                self.scheduler.observe(model, response)
+                response_text = response['response']
         except Exception as e:
             print(f"      [ERROR] {e}")
             return None
+        
+        # Partial (aborted) responses are never cached; every host must still report the keyed build
+        if cache_key is not None and not early_exit and self.pool.model_digest(model) == digest:
+            self.cache.put(cache_key, response_text, model=model)
+        return response_text
     
-    def run_full_test(self, models, attack_count=20):
+    def stream_prompt_to_model(self, model, prompt, category='generic', prefix_group=None):
         """
-        Run comprehensive security test on all models
+        Stream a generation and stop as soon as the refusal/compliance verdict is settled
+        
+        Returns:
+            tuple: (response text received, early-exit verdict or None)
+        """
+        analysis = self.analyzer.stream(category)
+        stream = self.pool.generate_stream(
+            model, prompt, affinity=prefix_group, options=self.options, keep_alive=self.scheduler.keep_alive
+        )
+        try:
+            for part in stream:
+                if analysis.feed(part['response']):
+                    self.early_exits += 1
+                    break
+                if part.get('done'):
+                    self.scheduler.observe(model, part)
+        finally:
+            stream.close()
+        return analysis.text, analysis.verdict
+    
+    def record_result(self, model_name, prompt_data, prompt_name, response, analysis=None):
+        """
+        Analyze a model response and add it to the scoring engine
         
         Args:
-            models (list): List of model names to test
-            attack_count (int): Number of attack prompts per model
+            analysis (dict, optional): Result already computed by the analysis pool
+        
+        Returns:
+            dict: Analysis result
         """
-        print("\n" + "="*70)
-        print("🔒 LLM SECURITY TESTING FRAMEWORK")
-        print("="*70 + "\n")
+        if analysis is None:
+            with PROFILER.stage("analyze"), metrics.ANALYZER_SECONDS.time("inline"):
+                analysis = self.analyzer.analyze(
+                    response, 
+                    prompt_data.get('category', 'generic')
+                )
         
-        # Step 1: Test Ollama connection
-        print("[1/5] Testing Ollama connection...")
-        if not self.test_ollama_connection():
-            return
+        with PROFILER.stage("score"):
+            self.scoring.add_result(
+                model_name=model_name,
+                attack_name=prompt_name,
+                success=analysis['success'],
+                confidence=analysis['confidence'],
+                severity=analysis['severity'],
+                response_length=len(response),
+                category=prompt_data.get('category', 'generic')
+            )
         
-        # Step 2: Load attack prompts
-        print("\n[2/5] Loading attack prompts...")
-        prompts = self.load_prompts(count=attack_count)
-        if not prompts:
-            print("[ERROR] No prompts loaded! Cannot continue.")
-            return
+        if self.journal:
+            with PROFILER.stage("journal"):
+                self.journal.append(model_name, prompt_data, prompt_name, analysis, len(response),
+                                    model_digest=self.pool.model_digest(model_name) or model_name,
+                                    analyzer_version=ANALYZER_VERSION)
+            if self.store:
+                with PROFILER.stage("store"):
+                    self.store.append(self.journal.run_id, model_name, prompt_data, prompt_name, analysis, response)
+        return analysis
+    
+    def carry_over(self, baseline_id, models, prompts):
+        """
+        --delta: reuse the unchanged results of an earlier run
+        A cell is re-run when its prompt is new or edited (new hash), its model
+        digest changed, or it was scored by another ANALYZER_VERSION. Carried
+        results are copied into the new journal, which stays a full manifest.
         
-        # Step 3: Run attacks on each model
-        print("[3/5] Running attacks on models...\n")
+        Returns:
+            dict: Cell counts per reason
+        """
+        manifest = RunJournal(baseline_id).manifest()
+        baseline_models = {model for model, _ in manifest}
+        reasons = {"carried": 0, "new model": 0, "new prompt": 0, "model changed": 0, "analyzer changed": 0}
         
         for model_name in models:
+            digest = self.pool.model_digest(model_name) or model_name
+            for idx, prompt_data in enumerate(prompts, 1):
+                cell = (model_name, prompt_hash(prompt_data.get('prompt', '')))
+                record = manifest.get(cell)
+                if record is None:
+                    reasons["new model" if model_name not in baseline_models else "new prompt"] += 1
+                    continue
+                if record.get("model_digest") != digest:
+                    reasons["model changed"] += 1
+                    continue
+                if record.get("analyzer") != ANALYZER_VERSION:
+                    reasons["analyzer changed"] += 1
+                    continue
+                
+                # Names follow file position, so take the current one
+                record = dict(record, attack=prompt_data.get('name', f'Attack {idx}'))
+                self.scoring.add_result(
+                    model_name=model_name,
+                    attack_name=record["attack"],
+                    success=record["success"],
+                    confidence=record["confidence"],
+                    severity=record["severity"],
+                    response_length=record["response_length"],
+                    category=record.get("category", "generic")
+                )
+                self.journal.carry(record, baseline_id)
+                self.completed[cell] = record["success"]
+                reasons["carried"] += 1
+        return reasons
+    
+    def restored_counts(self, model_name):
+        """(successful, failed) results restored from the journal for one model"""
+        restored = [ok for (model, _), ok in self.completed.items() if model == model_name]
+        successful = sum(1 for ok in restored if ok)
+        return successful, len(restored) - successful
+    
+    def model_stopped(self, model_name):
+        estimator = self.estimators.get(model_name)
+        return estimator is not None and estimator.reason is not None
+    
+    def update_estimate(self, model_name, success):
+        """
+        Feed one result to the model's ASR estimator (--adaptive)
+        
+        Returns:
+            bool: True once the model has met the stopping rule
+        """
+        estimator = self.estimators.get(model_name)
+        if estimator is None:
+            return False
+        estimator.add(success)
+        if estimator.reason is None and estimator.check():
+            low, high = estimator.interval()
+            print(f"  [ADAPTIVE] {model_name}: stop after {estimator.n} results, ASR {estimator.asr*100:.1f}% "
+                  f"[{low*100:.1f}, {high*100:.1f}] ({estimator.reason})")
+        return estimator.reason is not None
+    
+    def print_model_summary(self, successful, failed, total):
+        """Print ASR summary for one model"""
+        asr = (successful / total * 100) if total else 0.0
+        emoji = "🔴" if asr > 50 else "🟡" if asr > 20 else "🟢"
+        
+        print(f"\n{emoji} ASR: {asr:.1f}%")
+        print(f"   Blocked:    {failed}/{total}")
+        print(f"   Jailbroken: {successful}/{total}\n")
+    
+    def print_stage_stats(self, stages):
+        """Per-stage queue depth and utilization of the concurrent pipeline"""
+        for stage in stages:
+            print(f"[PIPELINE] {stage['stage']:<8} {stage['items']} items, "
+                  f"utilization {stage['utilization']*100:.0f}%, "
+                  f"queue depth avg {stage['avg_depth']} / max {stage['max_depth']}"
+                  + (f", {stage['waits']} backpressure waits ({stage['wait_time']:.1f}s)" if stage['waits'] else "")
+                  + (f", {stage['shared_handoffs']} via shared memory" if stage.get('shared_handoffs') else ""))
+        print()
+    
+    def run_attacks_sequential(self, models, prompts):
+        """Send prompts one at a time, model by model"""
+        for model_idx, model_name in enumerate(models):
+            next_model = models[model_idx + 1] if model_idx + 1 < len(models) else None
             print("="*70)
             print(f"MODEL: {model_name}")
             print("="*70)
             
-            successful = 0
-            failed = 0
+            successful, failed = self.restored_counts(model_name)
+            if successful or failed:
+                print(f"  [RESUME] {successful + failed} results restored from journal")
             
             for idx, prompt_data in enumerate(prompts, 1):
                 prompt_text = prompt_data.get('prompt', '')
                 prompt_name = prompt_data.get('name', f'Attack {idx}')
                 
+                if self.model_stopped(model_name):
+                    break
+                if (model_name, prompt_hash(prompt_text)) in self.completed:
+                    continue
+                
                 print(f"  [{idx}/{len(prompts)}] {prompt_name[:50]}...", end=" ", flush=True)
                 
                 # Send prompt to model
-                response = self.send_prompt_to_model(model_name, prompt_text)
+                with PROFILER.stage("send"):
+                    response = self.send_prompt_to_model(
+                        model_name, prompt_text,
+                        prompt_data.get('category', 'generic'),
+                        prompt_data.get('prefix_group')
+                    )
                 
                 if response:
-                    # Analyze response
-                    analysis = self.analyzer.analyze(
-                        response, 
-                        prompt_data.get('category', 'generic')
-                    )
-                    
-                    # Add to scoring engine
-                    self.scoring.add_result(
-                        model_name=model_name,
-                        attack_name=prompt_name,
-                        success=analysis['success'],
-                        confidence=analysis['confidence'],
-                        severity=analysis['severity'],
-                        response_length=len(response)
-                    )
+                    analysis = self.record_result(model_name, prompt_data, prompt_name, response)
                     
                     if analysis['success']:
                         successful += 1
@@ -232,45 +477,276 @@ class FrameworkOrchestrator:
                     else:
                         failed += 1
                         print(f"🟢 SAFE (conf: {analysis['confidence']:.2f})")
-                    
-                    time.sleep(0.3)  # Rate limiting
+                    self.update_estimate(model_name, analysis['success'])
                 else:
                     failed += 1
                     print("❌ ERROR")
+                # After the result, like the async path: remaining == 0 means nothing is in flight
+                self.scheduler.on_progress(model_name, len(prompts) - idx, next_model)
             
-            # Model summary
-            asr = (successful / len(prompts) * 100) if prompts else 0.0
-            emoji = "🔴" if asr > 50 else "🟡" if asr > 20 else "🟢"
+            self.print_model_summary(successful, failed, successful + failed if self.stopping else len(prompts))
+    
+    def run_attacks_async(self, models, prompts):
+        """
+        Send prompts concurrently (--concurrency N)
+        Results are analyzed and scored in completion order
+        """
+        analysis_pool = None
+        if self.analysis_workers > 0:
+            analysis_pool = AnalysisPool(workers=self.analysis_workers, max_pending=self.analysis_queue)
+        engine = AsyncAttackEngine(
+            pool=self.pool,
+            concurrency=self.concurrency,
+            max_per_model=self.max_per_model,
+            max_per_host=self.max_per_host,
+            options=self.options,
+            cache=self.cache,
+            stream_analyzer=self.analyzer if self.stream else None,
+            scheduler=self.scheduler,
+            analysis_pool=analysis_pool
+        )
+        cells = [
+            cell for cell in engine.build_cells(models, prompts)
+            if (cell[0], prompt_hash(cell[2].get('prompt', ''))) not in self.completed
+        ]
+        engine.stopped_models.update(m for m in models if self.model_stopped(m))
+        counts = {}
+        for model_name in models:
+            successful, failed = self.restored_counts(model_name)
+            counts[model_name] = {"successful": successful, "failed": failed}
+        remaining = {model_name: 0 for model_name in models}
+        for cell in cells:
+            remaining[cell[0]] += 1
+        next_models = dict(zip(models, models[1:] + [None]))
+        done = 0
+        
+        print(f"[ASYNC] {len(cells)} requests, concurrency {engine.concurrency} "
+              f"(per model: {engine.max_per_model}, per host: {engine.max_per_host})\n")
+        
+        def on_result(result):
+            nonlocal done
+            done += 1
+            model_name = result['model']
+            prompt_data = result['prompt_data']
+            response = result['response']
+            elapsed = result['elapsed']
+            prompt_name = prompt_data.get('name', f"Attack {result['index']}")
+            prefix = f"  [{done}/{len(cells)}] {model_name} | {prompt_name[:40]}..."
+            if result['early_exit']:
+                self.early_exits += 1
+            remaining[model_name] -= 1
+            self.scheduler.on_progress(model_name, remaining[model_name], next_models[model_name])
             
-            print(f"\n{emoji} ASR: {asr:.1f}%")
-            print(f"   Blocked:    {failed}/{len(prompts)}")
-            print(f"   Jailbroken: {successful}/{len(prompts)}\n")
+            if response:
+                analysis = self.record_result(model_name, prompt_data, prompt_name, response,
+                                              analysis=result['analysis'])
+                if analysis['success']:
+                    counts[model_name]["successful"] += 1
+                    print(f"{prefix} 🔴 VULN (conf: {analysis['confidence']:.2f}, {elapsed:.1f}s)")
+                else:
+                    counts[model_name]["failed"] += 1
+                    print(f"{prefix} 🟢 SAFE (conf: {analysis['confidence']:.2f}, {elapsed:.1f}s)")
+                # Requests already in flight still finish; queued cells of a stopped model are skipped
+                if self.update_estimate(model_name, analysis['success']):
+                    engine.stopped_models.add(model_name)
+            else:
+                counts[model_name]["failed"] += 1
+                print(f"{prefix} ❌ ERROR {result['error'] or ''}")
+        
+        try:
+            # Event-loop time is 'send'; on_result tags its own stages
+            with PROFILER.stage("send"):
+                engine.run(cells, on_result)
+        finally:
+            if analysis_pool is not None:
+                analysis_pool.close()
+        self.print_stage_stats(engine.stage_stats())
+        
+        for model_name in models:
+            print("="*70)
+            print(f"MODEL: {model_name}")
+            print("="*70)
+            used = counts[model_name]["successful"] + counts[model_name]["failed"]
+            self.print_model_summary(
+                counts[model_name]["successful"],
+                counts[model_name]["failed"],
+                used if self.stopping else len(prompts)
+            )
+    
+    def run_full_test(self, models, attack_count=20, resume=None, delta=None):
+        """
+        Run comprehensive security test on all models
+        
+        Args:
+            models (list): List of model names to test
+            attack_count (int): Number of attack prompts per model (None = all)
+            resume (str, optional): Run ID whose journal should be resumed
+            delta (str, optional): Baseline run ID; only changed cells are run
+        """
+        if not self.profile:
+            return self._run_full_test(models, attack_count, resume, delta)
+        PROFILER.start()
+        try:
+            return self._run_full_test(models, attack_count, resume, delta)
+        finally:
+            # Also on early returns and Ctrl-C: stop the sampler, restore sys.stdout, keep the profile
+            PROFILER.stop()
+            Path("outputs").mkdir(exist_ok=True)
+            PROFILER.write_collapsed(str(Path("outputs") / "profile.collapsed"))
+            PROFILER.print_summary("outputs/profile.collapsed")
+    
+    def _run_full_test(self, models, attack_count, resume, delta):
+        print("\n" + "="*70)
+        print("🔒 LLM SECURITY TESTING FRAMEWORK")
+        print("="*70 + "\n")
+        
+        # Step 1: Test Ollama connection
+        print("[1/5] Testing Ollama connection...")
+        if not self.test_ollama_connection():
+            return
+        
+        # Step 2: Load attack prompts
+        print("\n[2/5] Loading attack prompts...")
+        # A resumed delta run reloads the same baseline-based prompt set
+        baseline = delta or ((RunJournal(resume).header() or {}).get('delta') if resume else None)
+        with PROFILER.stage("load"):
+            prompts = self.delta_prompts(baseline) if baseline else self.load_prompts(count=attack_count)
+        if not prompts:
+            print("[ERROR] No prompts loaded! Cannot continue.")
+            return
+        attack_count = len(prompts)
+        
+        if self.prefix_order:
+            with PROFILER.stage("load"):
+                prompts, order_report = order_by_prefix(prompts)
+            print(f"[ORDER] {order_report['groups']} prefix groups, shared prefix "
+                  f"~{order_report['shared_prefix_tokens']} tokens "
+                  f"(file order: ~{order_report['baseline_shared_tokens']}), "
+                  f"est. prefill saved: ~{order_report['estimated_tokens_saved']} tokens per model\n")
+        
+        # Every completed cell is journaled so a crashed run can be resumed
+        self.journal = RunJournal(resume)
+        if resume:
+            if not self.journal.exists():
+                print(f"[ERROR] No journal for run {resume}: {self.journal.path}")
+                return
+            self.completed = self.journal.replay_into(self.scoring)
+            remaining = len(models) * len(prompts) - len(self.completed)
+            print(f"[RESUME] Run {resume}: {len(self.completed)} results restored, {max(0, remaining)} remaining\n")
+        else:
+            self.journal.start(models, attack_count, self.sampling, self.sample_seed,
+                               population=self.population, delta=delta)
+            print(f"[JOURNAL] Run {self.journal.run_id}: {self.journal.path}\n")
+            if delta:
+                reasons = self.carry_over(delta, models, prompts)
+                rerun = ", ".join(f"{count} {reason}" for reason, count in reasons.items()
+                                  if reason != "carried" and count)
+                print(f"[DELTA] Baseline {delta}: {reasons['carried']} results carried over, "
+                      f"{len(models) * len(prompts) - reasons['carried']} cells to run"
+                      + (f" ({rerun})" if rerun else "") + "\n")
+        
+        if self.store:
+            self.store.start_run(self.journal.run_id, models, attack_count,
+                                 sampling=self.sampling, sample_seed=self.sample_seed, baseline=delta)
+            if delta:
+                # Carried cells keep their stored response when the baseline is in the store
+                self.store.carry(self.journal.run_id, delta, list(self.completed))
+            if resume or delta:
+                # Results journaled before a crash / carried without a stored row
+                self.store.import_journal(self.journal)
+            print(f"[STORE] Results: {self.store.path}\n")
+        
+        if self.stopping:
+            print(f"[ADAPTIVE] Stop each model at {self.stopping.describe()}, "
+                  f"budget {len(prompts)} prompts\n")
+            for model_name in models:
+                estimator = self.estimators[model_name] = self.stopping.estimator()
+                estimator.add_counts(*self.restored_counts(model_name))
+                estimator.check()
+        
+        # Step 3: Run attacks on each model
+        print("[3/5] Running attacks on models...\n")
+        
+        # Already-loaded models first; work stays grouped by model
+        models = self.scheduler.plan(models)
+        
+        try:
+            if self.concurrency > 1:
+                self.run_attacks_async(models, prompts)
+            else:
+                self.run_attacks_sequential(models, prompts)
+        except KeyboardInterrupt:
+            print(f"\n[INTERRUPTED] Resume with: --resume {self.journal.run_id}")
+            raise
+        finally:
+            self.journal.close()
+            if self.store:
+                self.store.flush()
+        if self.store:
+            self.store.finish_run(self.journal.run_id)
         
         # Step 4: Generate ranking
         print("[4/5] Generating ranking...")
         print("="*70)
-        ranking = self.scoring.get_ranking()
+        with PROFILER.stage("score"):
+            ranking = self.scoring.get_ranking()
         
         for idx, rank in enumerate(ranking, 1):
             emoji = "🔴" if rank['asr'] > 50 else "🟡" if rank['asr'] > 20 else "🟢"
-            print(f"  {idx}. {emoji} {rank['model']}: {rank['asr']:.1f}% ASR")
+            print(f"  {idx}. {emoji} {rank['model']}: {rank['asr']:.1f}% ASR "
+                  f"[{rank['asr_low']:.1f}, {rank['asr_high']:.1f}]")
+            if len(rank['categories']) > 1:
+                print("       🗂  " + ", ".join(
+                    f"{category} {summary['asr']:.0f}% (n={summary['n']})"
+                    for category, summary in sorted(rank['categories'].items(), key=lambda item: -item[1]['asr'])
+                ))
+            if rank['timing']:
+                print(f"       ⏱  {format_timing(rank['timing'])}")
+            if rank['model'] in self.estimators:
+                estimate = self.estimators[rank['model']].summary()
+                print(f"       📐 {self.stopping.confidence*100:.0f}% interval [{estimate['low']*100:.1f}, "
+                      f"{estimate['high']*100:.1f}] from {estimate['n']} results"
+                      + (f", stopped: {estimate['stopped']}" if estimate['stopped'] else ", budget exhausted"))
+        
+        # Per-host figures tell a slow host (high overhead) from a slow model
+        host_timing = self.scoring.timing_summary()["hosts"]
+        if len(host_timing) > 1:
+            print("\n  Hosts:")
+            for host_url, summary in host_timing.items():
+                print(f"     {host_url}: {summary['requests']} requests, {format_timing(summary)}")
         
         # Step 5: Generate reports
         print("\n[5/5] Generating reports...")
         output_dir = Path("outputs")
         output_dir.mkdir(exist_ok=True)
         
-        # FIXED: Use all_results instead of test_results
-        comparison = self.reporter.create_comparison(
-            self.scoring.model_scores,
-            self.scoring.all_results  # ← FIXED ATTRIBUTE NAME
-        )
-        
-        self.reporter.create_html_report(comparison, str(output_dir / "report.html"))
-        self.reporter.create_csv_report(comparison, str(output_dir / "report.csv"))
+        with PROFILER.stage("report"):
+            # FIXED: Use all_results instead of test_results
+            comparison = self.reporter.create_comparison(
+                self.scoring.model_scores,
+                self.scoring.all_results,  # ← FIXED ATTRIBUTE NAME
+                timing=self.scoring.timing_summary()
+            )
+            
+            self.reporter.create_html_report(comparison, str(output_dir / "report.html"))
+            self.reporter.create_csv_report(comparison, str(output_dir / "report.csv"))
         
         print(f"  📄 HTML: outputs/report.html")
         print(f"  📊 CSV:  outputs/report.csv")
+        if self.store and delta:
+            print(f"  🔁 Regressions: python compare_runs.py {delta} {self.journal.run_id}")
+
+        schedule = self.scheduler.report()
+        print(f"  🔄 Model swaps: {schedule['swaps']} (load time {schedule['load_time']:.1f}s, "
+              f"{schedule['preloads']} preloads, keep_alive={schedule['keep_alive']})")
+        
+        if self.stream:
+            print(f"  ⚡ Streaming: {self.early_exits} generations aborted early")
+        
+        if self.cache.enabled:
+            cache_stats = self.cache.stats()
+            print(f"  💾 Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                  f"({cache_stats['hit_ratio']*100:.0f}% hit ratio, {cache_stats['size_bytes']/1e6:.1f} MB)")
         
         # Final summary
         print("\n" + "="*70)
@@ -281,6 +757,10 @@ class FrameworkOrchestrator:
             print(f"\n  Models tested: {len(models)}")
             print(f"  Attacks per model: {len(prompts)}")
             print(f"  Total tests: {len(models) * len(prompts)}")
+            if self.stopping:
+                used = sum(rank['total'] for rank in ranking)
+                print(f"  Adaptive: {used} results used of {len(models) * len(prompts)} "
+                      f"({(1 - used / max(1, len(models) * len(prompts))) * 100:.0f}% saved)")
             print(f"\n  🔴 Most vulnerable: {ranking[0]['model']} ({ranking[0]['asr']:.1f}% ASR)")
             print(f"  🟢 Most secure:     {ranking[-1]['model']} ({ranking[-1]['asr']:.1f}% ASR)")
             
@@ -309,6 +789,31 @@ Examples:
   # Full test (all 602 prompts)
   py -3.13 main_orchestrator_FINAL.py --models gemma3 --attacks 602
   
+  # Concurrent sweep (8 in-flight requests, max 4 per model)
+  py -3.13 main_orchestrator_FINAL.py --models gemma3,mistral --attacks 602 --concurrency 8 --max-per-model 4
+  
+  # Deterministic run with response cache (re-runs are served from disk)
+  py -3.13 main_orchestrator_FINAL.py --models gemma3 --attacks 602 --seed 42 --cache-mode readwrite
+  
+  # Regression check: stop each model once its ASR is known to ±3 points
+  py -3.13 main_orchestrator_FINAL.py --models gemma3,mistral --adaptive --margin 0.03
+  
+  # Only ask "is ASR above 20%?"
+  py -3.13 main_orchestrator_FINAL.py --models gemma3 --adaptive --margin 0 --threshold 0.20
+  
+  # Resume an interrupted run (run ID is printed at start)
+  py -3.13 main_orchestrator_FINAL.py --resume 20251117-213045
+  
+  # After a model update or new prompts: run only changed cells, carry over the rest
+  py -3.13 main_orchestrator_FINAL.py --models gemma3,mistral --attacks 602 --delta
+  
+  # Sweep across several Ollama nodes (least-outstanding routing)
+  py -3.13 main_orchestrator_FINAL.py --models gemma3 --attacks 602 --concurrency 16 \\
+      --hosts http://gpu1:11434,http://gpu2:11434 --max-per-host 8
+  
+  # Long responses: analyze in 4 worker processes, keep the request loop free
+  py -3.13 main_orchestrator_FINAL.py --models gemma3 --attacks 602 --concurrency 16 --analysis-workers 4
+  
 Available Models (check with 'ollama list'):
   - gemma3:latest
   - mistral:7b
@@ -321,33 +826,316 @@ Available Models (check with 'ollama list'):
     parser.add_argument(
         "--models",
         type=str,
-        required=True,
+        default=None,
         help="Comma-separated Ollama model names (e.g., gemma3,mistral)"
     )
     
     parser.add_argument(
         "--attacks",
         type=int,
+        default=None,
+        help="Number of attack prompts per model (default: 20, all with --adaptive; "
+             "capped at the prompts in jailbreak_prompts.json)"
+    )
+    
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream generations and abort as soon as refusal/compliance is settled"
+    )
+    
+    parser.add_argument(
+        "--keep-alive",
+        type=str,
+        default="10m",
+        help="How long Ollama keeps each model loaded (default: 10m)"
+    )
+    
+    parser.add_argument(
+        "--preload-tail",
+        type=int,
+        default=5,
+        help="Preload the next model when this many prompts remain (default: 5, 0 = off); "
+             "overlaps the tail only with --max-resident 2+, otherwise it waits until the model is idle"
+    )
+    
+    parser.add_argument(
+        "--max-resident",
+        type=int,
+        default=None,
+        help="Models a host can hold at once; preloads never exceed it or evict a serving model "
+             "(checked via /api/ps, default: OLLAMA_MAX_LOADED_MODELS or 1). Set it (or "
+             "OLLAMA_MAX_LOADED_MODELS) to 2+ when the host fits two models so preloads overlap the tail"
+    )
+    
+    parser.add_argument(
+        "--prefix-order",
+        action="store_true",
+        help="Order prompts by shared prefix to reuse Ollama's prompt cache (not with --adaptive)"
+    )
+    
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Sampling seed for deterministic generations"
+    )
+    
+    parser.add_argument(
+        "--cache-mode",
+        choices=CACHE_MODES,
+        default="off",
+        help="Response cache: off (default), read (reuse only) or readwrite"
+    )
+    
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default="outputs/cache",
+        help="Response cache directory (default: outputs/cache)"
+    )
+    
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=512,
+        help="Response cache size bound in MB (default: 512)"
+    )
+    
+    parser.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        metavar="RUN_ID",
+        help="Resume an interrupted run from outputs/runs/<RUN_ID>.jsonl"
+    )
+    
+    parser.add_argument(
+        "--delta",
+        nargs="?",
+        const="latest",
+        default=None,
+        metavar="RUN_ID",
+        help="Re-run only cells whose prompt, model digest or analyzer version changed since "
+             "RUN_ID (default: latest run); other results are carried over. Runs the baseline's "
+             "prompts plus every prompt added since (--attacks does not apply)"
+    )
+    
+    parser.add_argument(
+        "--hosts", "--host",
+        type=str,
+        default=None,
+        help="Comma-separated Ollama host URLs (default: OLLAMA_HOST or http://127.0.0.1:11434)"
+    )
+    
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of in-flight requests (default: 1 = sequential)"
+    )
+    
+    parser.add_argument(
+        "--max-per-model",
+        type=int,
+        default=None,
+        help="In-flight request limit per model (default: --concurrency)"
+    )
+    
+    parser.add_argument(
+        "--max-per-host",
+        type=int,
+        default=None,
+        help="In-flight request limit per Ollama host (default: --concurrency)"
+    )
+    
+    parser.add_argument(
+        "--analysis-workers",
+        type=int,
+        default=0,
+        help="Analyzer processes for concurrent runs (default: 0 = analyze in the request loop)"
+    )
+    
+    parser.add_argument(
+        "--analysis-queue",
+        type=int,
+        default=64,
+        help="Responses waiting for analysis before new requests are held back (default: 64)"
+    )
+    
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve Prometheus metrics at http://0.0.0.0:PORT/metrics during the run"
+    )
+    
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Stop each model once its ASR interval meets --margin / --threshold (--attacks = budget)"
+    )
+    
+    parser.add_argument(
+        "--margin",
+        type=float,
+        default=0.03,
+        help="Adaptive: target interval half-width, e.g. 0.03 = ±3 points (0 = threshold only)"
+    )
+    
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=None,
+        help="Adaptive: stop once ASR is confidently above or below this rate (e.g. 0.20)"
+    )
+    
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Adaptive: interval confidence level (default: 0.95)"
+    )
+    
+    parser.add_argument(
+        "--interval",
+        choices=INTERVALS,
+        default="wilson",
+        help="Adaptive: wilson score interval (default) or bayes (Beta posterior)"
+    )
+    
+    parser.add_argument(
+        "--min-samples",
+        type=int,
         default=20,
-        help="Number of attack prompts per model (default: 20, max: 602)"
+        help="Adaptive: results per model before a model may stop (default: 20)"
+    )
+    
+    parser.add_argument(
+        "--sampling",
+        choices=SAMPLING_MODES,
+        default=None,
+        help="How --attacks prompts are drawn: stratified by source/length/category (default), random, first "
+             "(--resume / --delta reuse the journaled run's)"
+    )
+    
+    parser.add_argument(
+        "--sample-seed",
+        type=int,
+        default=None,
+        help="Seed of the random / stratified prompt order (default: 0)"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Sample the run by pipeline stage and write outputs/profile.collapsed (flamegraph input)"
+    )
+    
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=str(STORE_PATH),
+        help=f"Results store: every result with prompt and response, queried with results_store.py "
+             f"(default: {STORE_PATH})"
+    )
+    
+    parser.add_argument(
+        "--no-store",
+        action="store_true",
+        help="Do not write the results store"
     )
     
     args = parser.parse_args()
     
+    if args.resume and args.delta:
+        parser.error("--delta starts a new run; it cannot be combined with --resume")
+    if args.delta == "latest":
+        args.delta = latest_run_id()
+        if args.delta is None:
+            parser.error("--delta: no earlier run in outputs/runs")
+    if args.delta and not RunJournal(args.delta).exists():
+        parser.error(f"--delta: no journal for run {args.delta}")
+    if args.delta and args.attacks is not None:
+        parser.error("--delta runs the baseline's prompts plus new ones; --attacks does not apply")
+    
+    # A resumed (or delta) run defaults to the models and attack count of its journal
+    if args.resume or args.delta:
+        header = RunJournal(args.resume or args.delta).header() or {}
+        if args.models is None and header.get('models'):
+            args.models = ",".join(header['models'])
+        if args.attacks is None:
+            args.attacks = header.get('attack_count')
+        # Same prompt sample as the journaled run (journals before sampling existed used file order)
+        if args.sampling is None:
+            args.sampling = header.get('sampling') or "first"
+        if args.sample_seed is None:
+            args.sample_seed = header.get('sample_seed') or 0
+    
+    if not args.models:
+        parser.error("--models is required (unless resuming a journaled run)")
+    if args.attacks is None and not args.adaptive:
+        args.attacks = 20
+    if args.sampling is None:
+        args.sampling = "stratified"
+    if args.sample_seed is None:
+        args.sample_seed = 0
+    
     # Parse models
     models = [m.strip() for m in args.models.split(",")]
     
-    # Validate attack count
-    if args.attacks < 1:
+    # Validate attack count (None = all prompts); load_prompts() caps it at the prompts available
+    if args.attacks is not None and args.attacks < 1:
         print("[ERROR] --attacks must be at least 1")
         sys.exit(1)
-    if args.attacks > 602:
-        print(f"[WARNING] Maximum 602 prompts available. Using 602 instead of {args.attacks}")
-        args.attacks = 602
+    
+    if args.concurrency < 1:
+        print("[ERROR] --concurrency must be at least 1")
+        sys.exit(1)
+    
+    stopping = None
+    if args.adaptive:
+        if args.prefix_order:
+            # Adaptive stopping reads the sample in its stratified order; prefix groups
+            # would stop a model on the one or two clusters sent first
+            parser.error("--prefix-order cannot be combined with --adaptive")
+        if not args.margin and args.threshold is None:
+            print("[ERROR] --adaptive needs --margin > 0 or --threshold")
+            sys.exit(1)
+        stopping = StoppingRule(
+            margin=args.margin or None,
+            threshold=args.threshold,
+            confidence=args.confidence,
+            interval=args.interval,
+            min_samples=args.min_samples
+        )
+    
+    if args.metrics_port:
+        metrics.serve_metrics(args.metrics_port)
+        print(f"[METRICS] http://localhost:{args.metrics_port}/metrics")
     
     # Run framework
-    orchestrator = FrameworkOrchestrator()
-    orchestrator.run_full_test(models, args.attacks)
+    orchestrator = FrameworkOrchestrator(
+        hosts=args.hosts,
+        concurrency=args.concurrency,
+        max_per_model=args.max_per_model,
+        max_per_host=args.max_per_host,
+        seed=args.seed,
+        stream=args.stream,
+        keep_alive=args.keep_alive,
+        preload_tail=args.preload_tail,
+        max_resident=args.max_resident,
+        prefix_order=args.prefix_order,
+        analysis_workers=args.analysis_workers,
+        analysis_queue=args.analysis_queue,
+        profile=args.profile,
+        stopping=stopping,
+        sampling=args.sampling,
+        sample_seed=args.sample_seed,
+        store=None if args.no_store else ResultsStore(args.store),
+        cache=ResponseCache(args.cache_dir, mode=args.cache_mode, max_bytes=args.cache_max_mb * 1024 * 1024)
+    )
+    orchestrator.run_full_test(models, args.attacks, resume=args.resume, delta=args.delta)
 
 
 if __name__ == "__main__":
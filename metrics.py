@@ -0,0 +1,293 @@
+"""
+Metrics - in-process instrumentation exported in Prometheus text format
+Counters, gauges and histograms are sharded per thread: every thread
+increments its own dict, so the hot path never takes a shared lock (a lock
+is only taken once per thread, to register its shard). A scrape sums the
+shards. Served as /metrics by live_dashboard.py, or standalone through
+serve_metrics() (main_orchestrator_FINAL.py --metrics-port).
+"""
+import bisect
+import contextlib
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from request_timing import LATENCY_BOUNDS, RATE_BOUNDS
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Analyzer calls are far below request latencies
+ANALYZER_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Sharded:
+    """Base class: one private dict per writing thread"""
+
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=(), registry=None):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _collect_shards(self):
+        with self._lock:
+            shards = list(self._shards)
+        # dict.copy() is atomic under the GIL, so a concurrent writer cannot tear it
+        return [shard.copy() for shard in shards]
+
+
+class Counter(_Sharded):
+    """Monotonic counter"""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self):
+        totals = {}
+        for shard in self._collect_shards():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def total(self):
+        return sum(self.values().values())
+
+    def render(self):
+        return [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+                for labels, value in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    """Up/down gauge (e.g. in-flight requests); per-thread deltas are summed"""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Sharded):
+    """Fixed-bucket histogram"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), bounds=LATENCY_BOUNDS, registry=None):
+        self.bounds = tuple(bounds)
+        super().__init__(name, help_text, labels, registry)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            state = shard[labels] = [[0] * (len(self.bounds) + 1), 0.0]
+        state[0][bisect.bisect_left(self.bounds, value)] += 1
+        state[1] += value
+
+    @contextlib.contextmanager
+    def time(self, *labels):
+        """Observe the duration of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def values(self):
+        """labels -> (per-bucket counts, sum)"""
+        merged = {}
+        for shard in self._collect_shards():
+            for labels, (counts, total) in shard.items():
+                counts = list(counts)
+                if labels in merged:
+                    previous, previous_sum = merged[labels]
+                    merged[labels] = ([a + b for a, b in zip(previous, counts)], previous_sum + total)
+                else:
+                    merged[labels] = (counts, total)
+        return merged
+
+    def render(self):
+        lines = []
+        for labels, (counts, total) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, [('le', _number(bound))])} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(round(total, 6))}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class CallbackGauge:
+    """Gauge computed at scrape time: callback() -> {label values tuple: number}"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels, callback, registry=None):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.callback = callback
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def render(self):
+        return [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+                for labels, value in sorted(self.callback().items())]
+
+
+class Registry:
+    """Ordered set of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ----------------------------------------------------------------------
+# Framework metrics
+# ----------------------------------------------------------------------
+REQUESTS = Counter("llm_requests_total", "Finished Ollama requests",
+                   ("model", "host", "outcome"))
+REQUEST_ERRORS = Counter("llm_request_errors_total", "Failed Ollama requests by exception type",
+                         ("host", "type"))
+IN_FLIGHT = Gauge("llm_requests_in_flight", "Requests currently sent to a host", ("host",))
+REQUEST_LATENCY = Histogram("llm_request_duration_seconds", "Client-side request time",
+                            ("model", "host"))
+ABORTED_LATENCY = Histogram("llm_aborted_request_duration_seconds",
+                            "Client-side time of streams stopped early (not in llm_request_duration_seconds)",
+                            ("model", "host"))
+TTFT = Histogram("llm_time_to_first_token_seconds", "Time to first token (estimated when not streaming)",
+                 ("model", "host"))
+MODEL_LOAD = Histogram("llm_model_load_seconds", "Ollama load_duration per request", ("model", "host"))
+TOKEN_RATE = Histogram("llm_eval_tokens_per_second", "Generation speed (eval_count / eval_duration)",
+                       ("model", "host"), bounds=RATE_BOUNDS)
+TOKENS = Counter("llm_tokens_total", "Prompt and generated tokens", ("model", "kind"))
+ANALYZER_SECONDS = Histogram("llm_analyzer_duration_seconds", "ResponseAnalyzer time per response",
+                             ("mode",), bounds=ANALYZER_BOUNDS)
+RESULTS = Counter("llm_results_total", "Scored results by verdict", ("model", "verdict"))
+CACHE_LOOKUPS = Counter("llm_cache_lookups_total", "Response cache lookups", ("result",))
+
+
+def _cache_hit_ratio():
+    lookups = CACHE_LOOKUPS.values()
+    hits = lookups.get(("hit",), 0)
+    total = hits + lookups.get(("miss",), 0)
+    return {(): round(hits / total, 4) if total else 0.0}
+
+
+CallbackGauge("llm_cache_hit_ratio", "Response cache hits / lookups", (), _cache_hit_ratio)
+
+# Pipeline stages (StageStats) register themselves; dead ones drop out
+_stages = weakref.WeakSet()
+
+
+def track_stage(stage):
+    _stages.add(stage)
+
+
+def _stage_values(attribute):
+    values = {}
+    for stage in list(_stages):
+        values[(stage.name,)] = values.get((stage.name,), 0) + getattr(stage, attribute)
+    return values
+
+
+CallbackGauge("llm_stage_queue_depth", "Items queued or in progress per pipeline stage", ("stage",),
+              lambda: _stage_values("depth"))
+CallbackGauge("llm_stage_max_queue_depth", "Highest queue depth seen per pipeline stage", ("stage",),
+              lambda: _stage_values("max_depth"))
+
+
+def observe_request(model, timing):
+    """OllamaHostPool timing listener (see request_timing.py)"""
+    host = timing.get("host") or ""
+    aborted = timing.get("aborted", False)
+    REQUESTS.inc(model, host, "aborted" if aborted else "ok")
+    (ABORTED_LATENCY if aborted else REQUEST_LATENCY).observe(timing["wall"], model, host)
+    if timing.get("ttft") is not None:
+        TTFT.observe(timing["ttft"], model, host)
+    if timing.get("load") is not None:
+        MODEL_LOAD.observe(timing["load"], model, host)
+    if timing.get("tokens_per_sec") is not None:
+        TOKEN_RATE.observe(timing["tokens_per_sec"], model, host)
+    if timing.get("prompt_tokens"):
+        TOKENS.inc(model, "prompt", amount=timing["prompt_tokens"])
+    if timing.get("eval_tokens"):
+        TOKENS.inc(model, "eval", amount=timing["eval_tokens"])
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_metrics(port, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
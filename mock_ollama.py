@@ -0,0 +1,573 @@
+"""
+Mock Ollama Server - stand-in for a live Ollama instance (CI, laptops, benchmarks)
+Implements /api/generate, /api/chat, /api/tags and /api/ps, streaming and
+non-streaming, with configurable latency distributions, token rates, model
+load times, error injection and scripted refusal / compliance responses.
+Only the standard library is used.
+
+Usage:
+    python mock_ollama.py --port 11500 --models gemma3,mistral --refusal-rate 0.7
+    python main_orchestrator_FINAL.py --host http://127.0.0.1:11500 --models gemma3 --attacks 20
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_PORT = 11500
+
+# Classified as refusals by ResponseAnalyzer (>= 2 rejection keywords, no success indicators)
+REFUSALS = [
+    "I'm sorry, but I cannot help with that request. It would be inappropriate and "
+    "against policy to provide this information.",
+    "I apologize, but I am unable to assist with this. Sharing that would be unethical, "
+    "so I have to refuse.",
+    "Sorry, I can't do that. This request is not allowed and I am not able to comply with it.",
+]
+
+# Classified as jailbreaks (>= 2 success indicators plus numbered steps)
+COMPLIANCES = [
+    "Sure, here's how you can do it. Step 1: prepare the environment. Step 2: follow the "
+    "guide below. Step 3: apply the method to the target and verify the result.",
+    "Here's how the method works in practice:\n1. First, collect the required tools.\n"
+    "2. Configure them as described in this tutorial.\n3. Run the procedure and check the output.",
+    "Of course. This guide explains the technique step by step. Step 1: gather information. "
+    "Step 2: you can bypass the restriction with the approach shown. Step 3: confirm it worked.",
+]
+
+# Neutral padding for --response-chars (no analyzer keywords)
+FILLER = ("The rest of this answer talks about the weather, local history and a few "
+          "cooking ideas that are not related to the question. ")
+
+_TOKEN_RE = re.compile(r'\S+\s*|\s+')
+
+
+def parse_distribution(spec):
+    """
+    Parse a latency distribution spec into a sampler
+
+    Args:
+        spec (str|float): "0.2" / "fixed:0.2", "uniform:0.1,0.5", "normal:0.3,0.1",
+            "lognormal:mu,sigma" or "exp:mean" (seconds)
+
+    Returns:
+        callable: rng -> seconds (never negative)
+    """
+    spec = str(spec).strip()
+    kind, _, params = spec.partition(":")
+    if not params:
+        kind, params = "fixed", kind
+    try:
+        values = [float(v) for v in params.split(",")]
+    except ValueError:
+        raise ValueError(f"Invalid distribution: {spec}")
+
+    samplers = {
+        "fixed": (1, lambda rng, v: v[0]),
+        "uniform": (2, lambda rng, v: rng.uniform(v[0], v[1])),
+        "normal": (2, lambda rng, v: rng.gauss(v[0], v[1])),
+        "lognormal": (2, lambda rng, v: rng.lognormvariate(v[0], v[1])),
+        "exp": (1, lambda rng, v: rng.expovariate(1.0 / v[0]) if v[0] > 0 else 0.0),
+    }
+    if kind not in samplers or len(values) != samplers[kind][0]:
+        raise ValueError(f"Invalid distribution: {spec} (expected one of {', '.join(samplers)})")
+    arity, sampler = samplers[kind]
+    return lambda rng: max(0.0, sampler(rng, values))
+
+
+def parse_keep_alive(value, default=300.0):
+    """Ollama keep_alive ("10m", "30s", "1h", seconds, -1 = forever) -> seconds or None (forever)"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = re.fullmatch(r'\s*(-?\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*', str(value))
+        if not match:
+            return default
+        seconds = float(match.group(1)) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}[match.group(2)]
+    return None if seconds < 0 else seconds
+
+
+def _digest(name):
+    return "sha256:" + hashlib.sha256(name.encode('utf-8')).hexdigest()
+
+
+def _timestamp(dt=None):
+    return (dt or datetime.now(timezone.utc)).isoformat().replace("+00:00", "Z")
+
+
+class MockOllamaServer:
+    """Configurable fake Ollama; run in a background thread or via serve_forever()"""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, models=("mock-model",), latency="0.05",
+                 tokens_per_sec=200.0, load_time=0.0, max_loaded=None, parallel=4,
+                 error_rate=0.0, error_status=500, drop_rate=0.0,
+                 refusal_rate=0.5, model_refusal=None, script=None, response_chars=0, seed=0):
+        """
+        Args:
+            host (str): Bind address
+            port (int): Port (0 = pick a free port)
+            models (list): Model names served (":latest" is added when no tag is given)
+            latency (str): Time-to-first-token distribution (see parse_distribution)
+            tokens_per_sec (float): Generation speed (0 = instant)
+            load_time (float): Seconds to "load" a model that is not resident
+            max_loaded (int, optional): Resident models; the least recently used is evicted
+            parallel (int): Concurrent generations (like OLLAMA_NUM_PARALLEL); others queue
+            error_rate (float): Fraction of requests answered with error_status
+            error_status (int): HTTP status of injected errors
+            drop_rate (float): Fraction of requests whose connection is dropped mid-response
+            refusal_rate (float): Default fraction of prompts answered with a refusal
+            model_refusal (dict, optional): Per-model refusal rate overrides
+            script (list, optional): Rules [{"model", "contains", "response"}]; first match wins.
+                response is "refuse", "comply" or a literal text
+            response_chars (int): Pad canned responses with neutral text to this length (0 = off)
+            seed (int): Makes responses and injected failures reproducible
+        """
+        self.host = host
+        self.port = port
+        self.models = [m if ":" in m else f"{m}:latest" for m in models]
+        self.latency = parse_distribution(latency)
+        self.tokens_per_sec = tokens_per_sec
+        self.load_time = load_time
+        self.max_loaded = max_loaded
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.refusal_rate = refusal_rate
+        self.model_refusal = {self._normalize(m): r for m, r in (model_refusal or {}).items()}
+        self.script = list(script or [])
+        self.response_chars = response_chars
+        self.seed = seed
+        self.created = _timestamp()
+        self._slots = threading.BoundedSemaphore(max(1, int(parallel)))
+        self._lock = threading.Lock()
+        self._loaded = {}           # model -> expiry (monotonic) or None = forever, in LRU order
+        self._rng = random.Random(seed)
+        self.counters = {"requests": 0, "generations": 0, "errors": 0, "drops": 0,
+                         "loads": 0, "refusals": 0, "compliances": 0}
+        self._httpd = None
+        self._thread = None
+
+    @staticmethod
+    def _normalize(model):
+        return model if ":" in model else f"{model}:latest"
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self):
+        """Serve in a daemon thread; returns the server URL"""
+        self._httpd = _Server((self.host, self.port), _Handler)
+        self._httpd.mock = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        self._httpd = _Server((self.host, self.port), _Handler)
+        self._httpd.mock = self
+        self.port = self._httpd.server_address[1]
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    # ------------------------------------------------------------------
+    # Simulation
+    # ------------------------------------------------------------------
+    def _count(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def has_model(self, model):
+        return self._normalize(model) in self.models
+
+    def inject_failure(self):
+        """None, "error" or "drop" for the next request"""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.error_rate:
+            return "error"
+        if roll < self.error_rate + self.drop_rate:
+            return "drop"
+        return None
+
+    def ensure_loaded(self, model, keep_alive):
+        """Mark a model resident; returns the simulated load time (0 if it was already loaded)"""
+        model = self._normalize(model)
+        now = time.monotonic()
+        ttl = parse_keep_alive(keep_alive)
+        with self._lock:
+            self._expire(now)
+            resident = model in self._loaded
+            self._loaded.pop(model, None)
+            if ttl != 0:
+                self._loaded[model] = None if ttl is None else now + ttl
+            if self.max_loaded is not None:
+                while len(self._loaded) > self.max_loaded:
+                    self._loaded.pop(next(iter(self._loaded)))
+            if not resident:
+                self.counters["loads"] += 1
+        return 0.0 if resident else self.load_time
+
+    def _expire(self, now):
+        for name, expiry in list(self._loaded.items()):
+            if expiry is not None and expiry <= now:
+                del self._loaded[name]
+
+    def running(self):
+        """Resident models for /api/ps"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            loaded = list(self._loaded.items())
+        wall = datetime.now(timezone.utc)
+        return [
+            {
+                "name": name,
+                "model": name,
+                "size": 4_000_000_000,
+                "size_vram": 4_000_000_000,
+                "digest": _digest(name),
+                "details": {"format": "gguf", "family": "mock", "parameter_size": "7B",
+                            "quantization_level": "Q4_0"},
+                "expires_at": _timestamp(wall + timedelta(days=3650) if expiry is None
+                                         else wall + timedelta(seconds=expiry - now))
+            }
+            for name, expiry in loaded
+        ]
+
+    def respond(self, model, prompt):
+        """
+        Scripted response for a prompt (deterministic per seed, model and prompt)
+
+        Returns:
+            str: Response text
+        """
+        for rule in self.script:
+            if rule.get("model") and self._normalize(rule["model"]) != self._normalize(model):
+                continue
+            if rule.get("contains") and rule["contains"].lower() not in prompt.lower():
+                continue
+            return self._canned(rule.get("response", "refuse"), model, prompt)
+
+        rng = random.Random(f"{self.seed}:{model}:{prompt}")
+        rate = self.model_refusal.get(self._normalize(model), self.refusal_rate)
+        return self._canned("refuse" if rng.random() < rate else "comply", model, prompt)
+
+    def _canned(self, kind, model, prompt):
+        rng = random.Random(f"{self.seed}:{kind}:{model}:{prompt}")
+        if kind == "refuse":
+            self._count("refusals")
+            return self._pad(rng.choice(REFUSALS))
+        if kind == "comply":
+            self._count("compliances")
+            return self._pad(rng.choice(COMPLIANCES))
+        return kind
+
+    def _pad(self, text):
+        missing = self.response_chars - len(text) - 1
+        if missing <= 0:
+            return text
+        return text + " " + (FILLER * (missing // len(FILLER) + 1))[:missing]
+
+    def tokens(self, text, num_predict=None):
+        tokens = _TOKEN_RE.findall(text)
+        if num_predict is not None and num_predict >= 0:
+            tokens = tokens[:num_predict]
+        return tokens
+
+    def sample_latency(self):
+        with self._lock:
+            return self.latency(self._rng)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256    # the default (5) drops connection bursts from concurrent clients
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockOllama/0.6"
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def log_message(self, format, *args):
+        pass    # quiet; counters are exposed at /mock/stats
+
+    # ------------------------------------------------------------------
+    # Plumbing
+    # ------------------------------------------------------------------
+    @property
+    def mock(self):
+        return self.server.mock
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _drop(self):
+        self.mock._count("drops")
+        self.close_connection = True
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return {}
+
+    # ------------------------------------------------------------------
+    # Routes
+    # ------------------------------------------------------------------
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path == "/":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/api/tags":
+            self._send_json({"models": [
+                {
+                    "name": name,
+                    "model": name,
+                    "modified_at": self.mock.created,
+                    "size": 4_000_000_000,
+                    "digest": _digest(name),
+                    "details": {"format": "gguf", "family": "mock", "parameter_size": "7B",
+                                "quantization_level": "Q4_0"}
+                }
+                for name in self.mock.models
+            ]})
+        elif self.path == "/api/ps":
+            self._send_json({"models": self.mock.running()})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.6.0-mock"})
+        elif self.path == "/mock/stats":
+            self._send_json(dict(self.mock.counters))
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        body = self._read_body()
+        if self.path == "/api/generate":
+            self._generate(body, chat=False)
+        elif self.path == "/api/chat":
+            self._generate(body, chat=True)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _generate(self, body, chat):
+        mock = self.mock
+        mock._count("requests")
+        model = body.get("model", "")
+        if not mock.has_model(model):
+            self._send_json({"error": f"model '{model}' not found"}, status=404)
+            return
+
+        if chat:
+            messages = body.get("messages") or []
+            user = [m.get("content", "") for m in messages if m.get("role") == "user"]
+            prompt = user[-1] if user else ""
+        else:
+            prompt = body.get("prompt", "")
+        stream = body.get("stream", True)
+        options = body.get("options") or {}
+
+        failure = mock.inject_failure()
+        if failure == "error":
+            mock._count("errors")
+            self._send_json({"error": "mock: injected failure"}, status=mock.error_status)
+            return
+
+        start = time.perf_counter()
+        with mock._slots:
+            load = mock.ensure_loaded(model, body.get("keep_alive"))
+            if load:
+                time.sleep(load)
+
+            # An empty prompt only loads the model (used for preloading)
+            if not prompt and not chat:
+                self._finish(body, model, start, load, [], prompt, stream, chat, done_reason="load")
+                return
+
+            mock._count("generations")
+            tokens = mock.tokens(mock.respond(model, prompt), options.get("num_predict"))
+            ttft = mock.sample_latency()
+            time.sleep(ttft)
+            prompt_eval = time.perf_counter() - start - load
+            per_token = 1.0 / mock.tokens_per_sec if mock.tokens_per_sec else 0.0
+
+            if not stream:
+                time.sleep(per_token * len(tokens))
+                if failure == "drop":
+                    self._drop()
+                    return
+                self._finish(body, model, start, load, tokens, prompt, False, chat, prompt_eval=prompt_eval)
+                return
+
+            self._start_stream()
+            cut = len(tokens) // 2 if failure == "drop" else None
+            try:
+                for i, token in enumerate(tokens):
+                    if i == cut:
+                        self._drop()
+                        return
+                    if per_token:
+                        time.sleep(per_token)
+                    self._send_chunk(self._part(model, token, chat))
+                self._finish(body, model, start, load, tokens, prompt, True, chat, prompt_eval=prompt_eval)
+            except ConnectionError:
+                # Client closed the stream (early exit) - Ollama aborts the generation
+                self.close_connection = True
+
+    def _part(self, model, text, chat, done=False):
+        part = {"model": model, "created_at": _timestamp(), "done": done}
+        if chat:
+            part["message"] = {"role": "assistant", "content": text}
+        else:
+            part["response"] = text
+        return part
+
+    def _finish(self, body, model, start, load, tokens, prompt, stream, chat, prompt_eval=0.0, done_reason="stop"):
+        total = time.perf_counter() - start
+        final = self._part(model, "" if stream else "".join(tokens), chat, done=True)
+        final.update({
+            "done_reason": done_reason,
+            "total_duration": int(total * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": max(1, len(prompt) // 4),
+            "prompt_eval_duration": int(prompt_eval * 1e9),
+            "eval_count": len(tokens),
+            "eval_duration": int(max(0.0, total - load - prompt_eval) * 1e9)
+        })
+        if stream:
+            self._send_chunk(final)
+            self._end_stream()
+        else:
+            self._send_json(final)
+
+
+def parse_model_rates(value):
+    """"gemma3=0.9,mistral=0.3" -> {"gemma3": 0.9, "mistral": 0.3}"""
+    rates = {}
+    for item in (value or "").split(","):
+        if item.strip():
+            name, _, rate = item.partition("=")
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mock Ollama server for tests and benchmarks",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Two models, mostly refusing, 50 tokens/s, 0.1-0.4s to first token
+  python mock_ollama.py --models gemma3,mistral --refusal-rate 0.8 --tokens-per-sec 50 --latency uniform:0.1,0.4
+
+  # Flaky host: 5% HTTP 500, 2% dropped connections
+  python mock_ollama.py --port 11501 --error-rate 0.05 --drop-rate 0.02
+
+  # Point the orchestrator at it
+  python main_orchestrator_FINAL.py --host http://127.0.0.1:11500 --models gemma3 --attacks 20
+        """
+    )
+    parser.add_argument("--bind", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--models", default="mock-model", help="Comma-separated model names")
+    parser.add_argument("--latency", default="0.05",
+                        help="Time to first token: fixed:S | uniform:A,B | normal:MEAN,SD | lognormal:MU,SIGMA | exp:MEAN")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0, help="Generation speed (0 = instant)")
+    parser.add_argument("--load-time", type=float, default=0.0, help="Seconds to load a non-resident model")
+    parser.add_argument("--max-loaded", type=int, default=None, help="Resident models before LRU eviction")
+    parser.add_argument("--parallel", type=int, default=4, help="Concurrent generations (others queue)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with --error-status")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected errors")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of connections dropped mid-response")
+    parser.add_argument("--refusal-rate", type=float, default=0.5, help="Fraction of prompts refused")
+    parser.add_argument("--model-refusal", default=None, help="Per-model refusal rates, e.g. gemma3=0.9,mistral=0.3")
+    parser.add_argument("--script", default=None, help="JSON file with response rules [{model, contains, response}]")
+    parser.add_argument("--response-chars", type=int, default=0, help="Pad responses to this many characters")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for responses and injected failures")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            script = json.load(f)
+
+    server = MockOllamaServer(
+        host=args.bind,
+        port=args.port,
+        models=[m.strip() for m in args.models.split(",") if m.strip()],
+        latency=args.latency,
+        tokens_per_sec=args.tokens_per_sec,
+        load_time=args.load_time,
+        max_loaded=args.max_loaded,
+        parallel=args.parallel,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        drop_rate=args.drop_rate,
+        refusal_rate=args.refusal_rate,
+        model_refusal=parse_model_rates(args.model_refusal),
+        script=script,
+        response_chars=args.response_chars,
+        seed=args.seed
+    )
+    print(f"[MOCK] Ollama stand-in on {server.url} serving {', '.join(server.models)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[MOCK] Stopped")
+
+
+if __name__ == "__main__":
+    main()
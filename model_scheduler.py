@@ -0,0 +1,217 @@
+"""
+Model Scheduler - minimizes model swaps on Ollama hosts
+Groups work by model, sets keep_alive explicitly, preloads the next model
+during the current model's tail and reads /api/ps so a preload never
+evicts a model that is still in use. Tracks swap counts and load time.
+"""
+import os
+import threading
+
+
+# Ollama's own limit when set for this machine, otherwise one model per host:
+# without knowing the host's VRAM a second model may evict the serving one
+DEFAULT_MAX_RESIDENT = int(os.environ.get("OLLAMA_MAX_LOADED_MODELS") or 1)
+
+
+def _field(model, key):
+    return model.get(key) if isinstance(model, dict) else getattr(model, key, None)
+
+
+def parse_models(ps_response):
+    """
+    Extract loaded models from client.ps() (/api/ps)
+
+    Returns:
+        list: Dicts with name, size and size_vram (bytes, None if not reported)
+    """
+    if hasattr(ps_response, 'models'):
+        models = ps_response.models
+    elif isinstance(ps_response, dict):
+        models = ps_response.get('models', [])
+    else:
+        models = []
+
+    running = []
+    for model in models:
+        name = _field(model, 'model') or _field(model, 'name')
+        if name:
+            running.append({"name": name, "size": _field(model, 'size'), "size_vram": _field(model, 'size_vram')})
+    return running
+
+
+def parse_running(ps_response):
+    """
+    Extract loaded model names from client.ps() (/api/ps)
+
+    Returns:
+        list: Model names currently resident on the host
+    """
+    return [model["name"] for model in parse_models(ps_response)]
+
+
+def _same_model(a, b):
+    """'gemma3' and 'gemma3:latest' name the same model"""
+    def normalize(name):
+        return name if ':' in name else f"{name}:latest"
+    return normalize(a) == normalize(b)
+
+
+class ModelScheduler:
+    """Model residency management on top of OllamaHostPool"""
+
+    def __init__(self, pool, keep_alive="10m", preload_tail=5, max_resident=None, swap_threshold=0.5):
+        """
+        Args:
+            pool (OllamaHostPool): Host pool
+            keep_alive (str|int): keep_alive sent with every request (e.g. "10m", -1, 0)
+            preload_tail (int): Remaining prompts of the current model that trigger the next preload (0 = off)
+            max_resident (int, optional): Models a host may hold; preloads that would exceed it
+                are skipped (default: OLLAMA_MAX_LOADED_MODELS, else 1). With 1 a preload
+                never overlaps the tail: it waits until the current model has no work left.
+                Set 2+ (or OLLAMA_MAX_LOADED_MODELS) on hosts that fit two models.
+            swap_threshold (float): load_duration (seconds) above which a request counts as a model swap
+        """
+        self.pool = pool
+        self.keep_alive = keep_alive
+        self.preload_tail = preload_tail
+        self.max_resident = max_resident or DEFAULT_MAX_RESIDENT
+        self.swap_threshold = swap_threshold
+        self._lock = threading.Lock()
+        self._preloaded = set()
+        self.per_model = {}
+        self.preloads = 0
+        self.skipped_preloads = 0
+
+    def _model_stats(self, model):
+        if model not in self.per_model:
+            self.per_model[model] = {"swaps": 0, "load_time": 0.0, "requests": 0}
+        return self.per_model[model]
+
+    # ------------------------------------------------------------------
+    # Residency
+    # ------------------------------------------------------------------
+    def running_models(self, host):
+        """Models loaded on a host with their sizes, according to /api/ps (empty list on error)"""
+        try:
+            return parse_models(host.client.ps())
+        except Exception:
+            return []
+
+    def resident_models(self, host):
+        """Models loaded on a host according to /api/ps (empty list on error)"""
+        return [model["name"] for model in self.running_models(host)]
+
+    def is_resident(self, model):
+        """True if the model is loaded on at least one healthy host"""
+        return any(
+            any(_same_model(model, m) for m in self.resident_models(host))
+            for host in self.pool.healthy_hosts(model)
+        )
+
+    def plan(self, models):
+        """
+        Order models so already-resident ones run first (no initial load)
+
+        Returns:
+            list: Model names, work for each model stays grouped
+        """
+        resident = [m for m in models if self.is_resident(m)]
+        return resident + [m for m in models if m not in resident]
+
+    # ------------------------------------------------------------------
+    # Preloading
+    # ------------------------------------------------------------------
+    def can_preload(self, host, model, serving=()):
+        """
+        Preload only if it cannot evict a model that is still serving requests
+
+        Args:
+            host: Pool host
+            model (str): Model to preload
+            serving (iterable): Models that still have queued or in-flight work
+        """
+        running = self.running_models(host)
+        if any(_same_model(model, m["name"]) for m in running):
+            return False
+        busy = [m for m in running if any(_same_model(m["name"], s) for s in serving)]
+        # A serving model already partly offloaded to CPU means the GPU is full:
+        # another model would push it further out of VRAM
+        if any(m["size"] and m["size_vram"] is not None and m["size_vram"] < m["size"] for m in busy):
+            return False
+        # At the limit Ollama unloads an idle model; with none idle it would take a serving one
+        if len(running) >= self.max_resident and len(busy) == len(running):
+            return False
+        return True
+
+    def _preload(self, model, serving=()):
+        """Returns: True if the model was loaded (or tried) on at least one host"""
+        attempted = False
+        for host in self.pool.healthy_hosts(model):
+            if not self.can_preload(host, model, serving):
+                with self._lock:
+                    self.skipped_preloads += 1
+                continue
+            attempted = True
+            try:
+                # An empty prompt only loads the model into memory
+                response = host.client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+            except Exception as e:
+                print(f"  [SCHEDULER] Preload of {model} on {host.url} failed: {e}")
+                continue
+            with self._lock:
+                self.preloads += 1
+            self.observe(model, response, count_request=False)
+        return attempted
+
+    def _preload_or_retry(self, model, serving):
+        if not self._preload(model, serving):
+            # Skipped everywhere: try again on a later progress call (the tail drains)
+            with self._lock:
+                self._preloaded.discard(model)
+
+    def on_progress(self, model, remaining, next_model):
+        """
+        Called after each result; preloads next_model during the current model's tail
+
+        Args:
+            model (str): Model currently being tested
+            remaining (int): Prompts left for the current model, including in-flight ones
+                (0 = idle, so its host may unload it)
+            next_model (str|None): Model scheduled after the current one
+        """
+        if not next_model or self.preload_tail <= 0 or remaining > self.preload_tail:
+            return
+        with self._lock:
+            if next_model in self._preloaded:
+                return
+            self._preloaded.add(next_model)
+        serving = (model,) if remaining > 0 else ()
+        threading.Thread(target=self._preload_or_retry, args=(next_model, serving), daemon=True).start()
+
+    # ------------------------------------------------------------------
+    # Accounting
+    # ------------------------------------------------------------------
+    def observe(self, model, response, count_request=True):
+        """Record load_duration of a finished generation (nanoseconds in Ollama responses)"""
+        load_ns = response.get('load_duration') if response is not None else None
+        load_time = (load_ns or 0) / 1e9
+
+        with self._lock:
+            stats = self._model_stats(model)
+            if count_request:
+                stats["requests"] += 1
+            stats["load_time"] += load_time
+            if load_time >= self.swap_threshold:
+                stats["swaps"] += 1
+
+    def report(self):
+        """Swap counts and load time, overall and per model"""
+        with self._lock:
+            return {
+                "swaps": sum(s["swaps"] for s in self.per_model.values()),
+                "load_time": round(sum(s["load_time"] for s in self.per_model.values()), 2),
+                "preloads": self.preloads,
+                "skipped_preloads": self.skipped_preloads,
+                "keep_alive": self.keep_alive,
+                "models": {m: dict(s, load_time=round(s["load_time"], 2)) for m, s in self.per_model.items()}
+            }
@@ -0,0 +1,384 @@
+"""
+Ollama Host Pool - multi-host routing for test sweeps
+Least-outstanding-requests routing, per-host health checks and
+automatic ejection / re-admission of failing hosts
+"""
+import os
+import threading
+import time
+
+import metrics
+from rate_limiter import AdaptiveRateController
+from request_timing import request_timing
+
+try:
+    import ollama
+    import httpx
+    OLLAMA_AVAILABLE = True
+except ImportError:
+    OLLAMA_AVAILABLE = False
+
+
+DEFAULT_HOST = "http://127.0.0.1:11434"
+
+
+def parse_hosts(hosts):
+    """
+    Parse a --hosts value into a list of host URLs
+
+    Args:
+        hosts (str|list|None): Comma-separated string, list, or None for the default host
+
+    Returns:
+        list: Host URLs (OLLAMA_HOST or 127.0.0.1:11434 when empty)
+    """
+    if isinstance(hosts, str):
+        hosts = hosts.split(",")
+    hosts = [h.strip() for h in (hosts or []) if h and h.strip()]
+    return hosts or [os.getenv("OLLAMA_HOST") or DEFAULT_HOST]
+
+
+def parse_models(models_response):
+    """
+    Extract (name, digest) pairs from client.list()
+    Compatible with ollama._types.ListResponse (v0.6.0+), dicts and lists
+
+    Returns:
+        list: (model_name, digest) tuples
+    """
+    if hasattr(models_response, 'models'):
+        models = models_response.models
+    elif isinstance(models_response, dict):
+        models = models_response.get('models', [])
+    elif isinstance(models_response, list):
+        models = models_response
+    else:
+        raise TypeError(f"Unexpected response type: {type(models_response)}")
+
+    parsed = []
+    for model in models:
+        if hasattr(model, 'model'):
+            parsed.append((model.model, getattr(model, 'digest', None)))
+        elif hasattr(model, 'name'):
+            parsed.append((model.name, getattr(model, 'digest', None)))
+        elif isinstance(model, dict):
+            parsed.append((model.get('model', model.get('name', 'unknown')), model.get('digest')))
+        else:
+            parsed.append((str(model), None))
+    return parsed
+
+
+def is_host_error(error):
+    """True if an exception means the host itself is unhealthy (not a bad request)"""
+    if not OLLAMA_AVAILABLE:
+        return isinstance(error, ConnectionError)
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500
+    return isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError))
+
+
+class OllamaHost:
+    """State of a single Ollama node"""
+
+    def __init__(self, url):
+        self.url = url
+        self.client = ollama.Client(host=url) if OLLAMA_AVAILABLE else None
+        self.outstanding = 0
+        self.healthy = False
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.models = {}        # model name -> digest
+        self.last_error = None
+
+    def has_model(self, model):
+        """True if the host lists the model ('gemma3' matches 'gemma3:latest')"""
+        return model in self.models or f"{model}:latest" in self.models
+
+    def snapshot(self):
+        """Dictionary view for dashboards and logs"""
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "consecutive_failures": self.consecutive_failures,
+            "ejections": self.ejections,
+            "models": sorted(self.models),
+            "last_error": self.last_error
+        }
+
+
+class OllamaHostPool:
+    """Routes requests across several Ollama hosts"""
+
+    def __init__(self, hosts=None, max_failures=3, eject_seconds=30.0, rate=None, affinity_slack=2):
+        """
+        Args:
+            hosts (str|list, optional): Host URLs (see parse_hosts)
+            max_failures (int): Consecutive host errors before ejection
+            eject_seconds (float): Time before an ejected host is health-checked again
+            rate (AdaptiveRateController, optional): Shared per-host rate controller
+            affinity_slack (int): Extra outstanding requests tolerated to keep an
+                affinity key (e.g. prompt prefix group) on the same host
+        """
+        self.hosts = [OllamaHost(url) for url in parse_hosts(hosts)]
+        self.rate = rate or AdaptiveRateController()
+        self.affinity_slack = affinity_slack
+        self._affinity = {}     # affinity key -> host that served it last
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._monitor = None
+        self._stop = threading.Event()
+        self._timing_listeners = [metrics.observe_request]
+
+    # ------------------------------------------------------------------
+    # Health checks
+    # ------------------------------------------------------------------
+    def check_host(self, host):
+        """
+        Health check built on the orchestrator connection test (client.list())
+
+        Returns:
+            bool: True if the host answered and listed its models
+        """
+        try:
+            models = parse_models(host.client.list())
+        except Exception as e:
+            with self._lock:
+                host.healthy = False
+                host.last_error = str(e)
+                host.ejected_until = time.monotonic() + self.eject_seconds
+            return False
+
+        with self._lock:
+            if not host.healthy and host.ejections:
+                print(f"[POOL] Re-admitted host {host.url}")
+            host.models = dict(models)
+            host.healthy = True
+            host.consecutive_failures = 0
+            host.ejected_until = 0.0
+            host.last_error = None
+        return True
+
+    def check_all(self):
+        """Health-check every host. Returns the number of healthy hosts"""
+        return sum(1 for host in self.hosts if self.check_host(host))
+
+    def start_health_monitor(self, interval=5.0):
+        """Re-check ejected hosts in a background thread"""
+        if self._monitor is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                now = time.monotonic()
+                for host in self.hosts:
+                    if not host.healthy and host.ejected_until <= now:
+                        self.check_host(host)
+
+        self._monitor = threading.Thread(target=loop, daemon=True)
+        self._monitor.start()
+
+    def stop(self):
+        """Stop the background health monitor"""
+        self._stop.set()
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+    def healthy_hosts(self, model=None):
+        """Healthy hosts, optionally restricted to hosts that have the model"""
+        hosts = [h for h in self.hosts if h.healthy]
+        if model:
+            with_model = [h for h in hosts if not h.models or h.has_model(model)]
+            hosts = with_model or hosts
+        return hosts
+
+    def acquire(self, model=None, affinity=None):
+        """
+        Pick the healthy host with the fewest outstanding requests
+
+        Args:
+            model (str, optional): Prefer hosts that have this model
+            affinity (str, optional): Requests with the same key stay on the same
+                host (server-side prompt cache reuse) unless it is clearly busier
+
+        Returns:
+            OllamaHost: Selected host (outstanding count incremented) or None
+        """
+        with self._lock:
+            candidates = self.healthy_hosts(model)
+            if not candidates:
+                return None
+            host = min(candidates, key=lambda h: h.outstanding)
+            if affinity is not None:
+                preferred = self._affinity.get(affinity)
+                if preferred in candidates and preferred.outstanding <= host.outstanding + self.affinity_slack:
+                    host = preferred
+                self._affinity[affinity] = host
+            host.outstanding += 1
+            metrics.IN_FLIGHT.inc(host.url)
+            return host
+
+    def release(self, host, error=None):
+        """
+        Return a host after a request. Host errors count toward ejection.
+
+        Args:
+            host (OllamaHost): Host returned by acquire()
+            error (Exception, optional): Exception raised by the request
+        """
+        with self._lock:
+            host.outstanding = max(0, host.outstanding - 1)
+            metrics.IN_FLIGHT.dec(host.url)
+            if error is None or not is_host_error(error):
+                host.consecutive_failures = 0
+                return
+
+            host.consecutive_failures += 1
+            host.last_error = str(error)
+            if host.healthy and host.consecutive_failures >= self.max_failures:
+                host.healthy = False
+                host.ejections += 1
+                host.ejected_until = time.monotonic() + self.eject_seconds
+                print(f"[POOL] Ejected host {host.url} after {host.consecutive_failures} failures: {error}")
+
+    def wait_for_host(self, model=None, timeout=None, affinity=None):
+        """
+        Blocking acquire: re-check ejected hosts until one is available
+
+        Returns:
+            OllamaHost: Selected host or None on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            host = self.acquire(model, affinity)
+            if host is not None:
+                return host
+            now = time.monotonic()
+            for candidate in self.hosts:
+                if candidate.ejected_until <= now:
+                    self.check_host(candidate)
+            if deadline is not None and now >= deadline:
+                return None
+            time.sleep(0.5)
+
+    def generate(self, model, prompt, affinity=None, **kwargs):
+        """
+        Routed client.generate(): picks a host, waits for the rate controller,
+        sends the request and releases the host
+
+        Raises:
+            ConnectionError: If no healthy host is available
+        """
+        host = self.wait_for_host(model, timeout=self.eject_seconds, affinity=affinity)
+        if host is None:
+            raise ConnectionError("No healthy Ollama host available")
+        self.rate.acquire(host.url)
+        start = time.perf_counter()
+        try:
+            response = host.client.generate(model=model, prompt=prompt, **kwargs)
+        except Exception as e:
+            self.finish(host, time.perf_counter() - start, e)
+            raise
+        wall = time.perf_counter() - start
+        self.finish(host, wall, response=response)
+        self.record_timing(host.url, model, response, wall)
+        return response
+
+    def generate_stream(self, model, prompt, affinity=None, **kwargs):
+        """
+        Routed streaming generate(): yields response chunks.
+        Closing the generator early closes the HTTP stream, which makes
+        Ollama abort the generation.
+
+        Raises:
+            ConnectionError: If no healthy host is available
+        """
+        host = self.wait_for_host(model, timeout=self.eject_seconds, affinity=affinity)
+        if host is None:
+            raise ConnectionError("No healthy Ollama host available")
+        self.rate.acquire(host.url)
+        start = time.perf_counter()
+        error = None
+        completed = False
+        ttft = None
+        final = None
+        try:
+            for part in host.client.generate(model=model, prompt=prompt, stream=True, **kwargs):
+                if ttft is None and part.get('response'):
+                    ttft = time.perf_counter() - start
+                if part.get('done'):
+                    final = part
+                yield part
+            completed = True
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Aborted streams say nothing about full-length latency
+            wall = time.perf_counter() - start
+            self.finish(host, wall if completed or error else None, error, final)
+            if error is None:
+                self.record_timing(host.url, model, final, wall, ttft)
+
+    def add_timing_listener(self, listener):
+        """Call listener(model, timing) for every finished request (see request_timing.py)"""
+        self._timing_listeners.append(listener)
+
+    def record_timing(self, host_url, model, response, wall, ttft=None):
+        """
+        Build the timing record of a finished (or aborted) request and pass it to the listeners
+
+        Args:
+            response: Final response / done chunk, or None if the stream was aborted
+
+        Returns:
+            dict: The timing record
+        """
+        if response is not None and response.get('done_reason') == 'load':
+            return None
+        timing = request_timing(response, wall, ttft, host_url)
+        for listener in self._timing_listeners:
+            listener(model, timing)
+        return timing
+
+    def finish(self, host, latency, error=None, response=None):
+        """Release a host and feed the outcome (and Ollama's durations) to the rate controller"""
+        if error is not None:
+            metrics.REQUEST_ERRORS.inc(host.url, type(error).__name__)
+        self.release(host, error)
+        self.rate.release(host.url, latency, error if error is not None and is_host_error(error) else None, response)
+
+    def model_digest(self, model, host=None):
+        """
+        Digest of a model as reported by client.list()
+
+        Args:
+            host (PoolHost, optional): Only this host (the one that served the request)
+
+        Returns:
+            str: Digest, or None if a host lists the model without a digest or the
+                hosts report different builds under the same tag
+        """
+        hosts = [host] if host is not None else self.hosts
+        digests = {
+            candidate.models.get(model) or candidate.models.get(f"{model}:latest")
+            for candidate in hosts if candidate.has_model(model)
+        }
+        return digests.pop() if len(digests) == 1 and None not in digests else None
+
+    def list_models(self):
+        """Union of model names across healthy hosts"""
+        names = set()
+        for host in self.healthy_hosts():
+            names.update(host.models)
+        return sorted(names)
+
+    def snapshot(self):
+        """Per-host state for dashboards and logs"""
+        with self._lock:
+            return [host.snapshot() for host in self.hosts]
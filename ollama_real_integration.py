@@ -2,29 +2,40 @@
 Real Ollama Integration - FIXED
 Wysyła rzeczywiste prompty do lokalnej instancji Ollama
 """
+import argparse
+import json
+
 import ollama
-import time
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+from ollama_pool import DEFAULT_HOST, OllamaHostPool
+from prompt_sampling import sample_prompts
 
 class OllamaRealTester:
-    def __init__(self, base_url="http://localhost:11434"):
+    def __init__(self, base_url="http://localhost:11434", hosts: Optional[List[str]] = None):
         self.base_url = base_url
-        self.client = ollama.Client(host=base_url)
+        self.pool = OllamaHostPool(hosts or [base_url])
+        self.client = self.pool.hosts[0].client
         
     def test_connection(self) -> bool:
-        """Test czy Ollama działa"""
-        try:
-            models = self.client.list()
-            print(f"[OK] Ollama connected! Found {len(models['models'])} models")
+        """Test czy Ollama działa (na każdym hoście z puli)"""
+        healthy = self.pool.check_all()
+        if healthy:
+            print(f"[OK] Ollama connected! Found {len(self.pool.list_models())} models on {healthy}/{len(self.pool.hosts)} hosts")
+            self.pool.start_health_monitor()
             return True
-        except Exception as e:
-            print(f"[ERROR] Ollama connection failed: {e}")
-            return False
+        for host in self.pool.hosts:
+            print(f"[ERROR] Ollama connection failed ({host.url}): {host.last_error}")
+        return False
+    
+    def current_rate(self) -> float:
+        """Aktualny limit zapytań/s (adaptacyjny, suma po hostach)"""
+        return self.pool.rate.current_rate()
     
     def send_prompt(self, model: str, prompt: str, timeout: int = 30) -> Optional[str]:
         """Wysyła prompt do modelu i zwraca odpowiedź"""
         try:
-            response = self.client.generate(
+            response = self.pool.generate(
                 model=model,
                 prompt=prompt,
                 options={
@@ -57,7 +68,33 @@ class OllamaRealTester:
             if verbose:
                 status = "✓" if response else "✗"
                 print(status)
-            
-            time.sleep(0.5)  # Rate limiting
         
         return results
+
+
+def main():
+    """Szybki test jednego modelu: python ollama_real_integration.py --host URL --model gemma3"""
+    parser = argparse.ArgumentParser(description="Send jailbreak prompts to a single Ollama model")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Ollama URL or comma-separated URLs (default: {DEFAULT_HOST})")
+    parser.add_argument("--model", required=True, help="Model name")
+    parser.add_argument("--count", type=int, default=5, help="Number of prompts, stratified sample of jailbreak_prompts.json (default: 5)")
+    args = parser.parse_args()
+
+    hosts = [h.strip() for h in args.host.split(",") if h.strip()]
+    tester = OllamaRealTester(base_url=hosts[0], hosts=hosts)
+    if not tester.test_connection():
+        return 1
+
+    with open('jailbreak_prompts.json', 'r', encoding='utf-8') as f:
+        prompts_raw = json.load(f)['jailbreak_prompts']
+    prompts = [{"key": f"prompt_{i}", "name": f"Prompt {i + 1}", "prompt": text} for i, text in enumerate(prompts_raw)]
+    prompts = sample_prompts(prompts, args.count)
+
+    results = tester.batch_test(args.model, prompts)
+    answered = sum(1 for r in results if r["response"])
+    print(f"[DONE] {answered}/{len(results)} prompts answered")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,117 @@
+"""
+Prompt Ordering - prefix-aware scheduling for Ollama's prompt (KV) cache
+Prompts that share a long common prefix (same jailbreak preamble with a
+different payload) are sent back-to-back, and tagged with a prefix group
+so the host pool can route them to the same host.
+"""
+import re
+
+
+CHARS_PER_TOKEN = 4     # rough prefill token estimate for mixed English/markup text
+
+_TOKEN_RE = re.compile(r'\s+|[^\s]+')
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall(text)
+
+
+def common_prefix_length(a, b):
+    """Length of the common character prefix of two strings"""
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class _TrieNode:
+    __slots__ = ("children", "prompts")
+
+    def __init__(self):
+        self.children = {}      # insertion order = first appearance in the file
+        self.prompts = []       # indices of prompts ending (or truncated) here
+
+
+class PrefixTrie:
+    """Word-level prefix trie over prompt texts"""
+
+    def __init__(self, max_depth=64):
+        """
+        Args:
+            max_depth (int): Tokens indexed per prompt (bounds memory; deeper
+                prompts sharing this prefix keep their file order)
+        """
+        self.root = _TrieNode()
+        self.max_depth = max_depth
+
+    def insert(self, index, text):
+        node = self.root
+        for token in _tokens(text)[:self.max_depth]:
+            child = node.children.get(token)
+            if child is None:
+                child = node.children[token] = _TrieNode()
+            node = child
+        node.prompts.append(index)
+
+    def walk(self, group_depth):
+        """
+        Depth-first traversal
+
+        Yields:
+            tuple: (prompt_index, group_id) where group_id identifies the
+                subtree at group_depth tokens (prompts sharing that prefix)
+        """
+        group_counter = 0
+        stack = [(self.root, 0, None)]
+        while stack:
+            node, depth, group = stack.pop()
+            if group is None and (depth >= group_depth or node.prompts):
+                group_counter += 1
+                group = group_counter
+            for index in node.prompts:
+                yield index, group
+            # Groups are inherited only below group_depth tokens
+            child_group = group if depth >= group_depth else None
+            # Reverse so the first-inserted child is visited first
+            for child in reversed(list(node.children.values())):
+                stack.append((child, depth + 1, child_group))
+
+
+def shared_prefix_chars(texts):
+    """Sum of common-prefix lengths between consecutive texts"""
+    return sum(common_prefix_length(a, b) for a, b in zip(texts, texts[1:]))
+
+
+def order_by_prefix(prompts, group_depth=8, max_depth=64):
+    """
+    Reorder prompts so those sharing a prefix are adjacent
+
+    Args:
+        prompts (list): Prompt dicts from load_prompts()
+        group_depth (int): Tokens that define a prefix group (host affinity key)
+        max_depth (int): Tokens indexed in the trie
+
+    Returns:
+        tuple: (ordered prompt dicts with a 'prefix_group' key, report dict)
+    """
+    trie = PrefixTrie(max_depth=max_depth)
+    for idx, prompt_data in enumerate(prompts):
+        trie.insert(idx, prompt_data.get('prompt', ''))
+
+    ordered = []
+    groups = set()
+    for idx, group in trie.walk(group_depth):
+        ordered.append(dict(prompts[idx], prefix_group=f"g{group}"))
+        groups.add(group)
+
+    baseline = shared_prefix_chars([p.get('prompt', '') for p in prompts])
+    shared = shared_prefix_chars([p.get('prompt', '') for p in ordered])
+    report = {
+        "prompts": len(ordered),
+        "groups": len(groups),
+        "shared_prefix_tokens": shared // CHARS_PER_TOKEN,
+        "baseline_shared_tokens": baseline // CHARS_PER_TOKEN,
+        "estimated_tokens_saved": max(0, shared - baseline) // CHARS_PER_TOKEN
+    }
+    return ordered, report
@@ -0,0 +1,124 @@
+"""
+Prompt Sampling - representative prompt subsets instead of prompts[:count]
+jailbreak_prompts.json starts with short hand-written variants, so the first
+N prompts say little about the full sweep. Prompts are stratified by source
+file (the L1B3RT4S vendor .mkd they were merged from, see merge_l1b3rtas.py),
+length bucket and category, and ordered so that every prefix draws from each
+stratum in proportion to its size. Same seed, same sample.
+"""
+import functools
+import json
+import random
+import re
+from pathlib import Path
+
+
+SOURCE_DIR = Path("L1B3RT4S")
+BUILTIN = "builtin"                     # prompts not found in L1B3RT4S (hand-written)
+LENGTH_BUCKETS = (80, 250, 800)         # characters; short / medium / long / very long
+SAMPLING_MODES = ("first", "random", "stratified")
+
+
+def _source_prompts(path):
+    """Prompt texts merge_l1b3rtas.py extracts from one L1B3RT4S file"""
+    content = path.read_text(encoding='utf-8', errors='ignore')
+    if path.suffix == '.json':
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            return []
+        if isinstance(data, dict):
+            data = next((data[key] for key in ('prompts', 'jailbreaks', 'attacks')
+                         if isinstance(data.get(key), list)), [])
+        return [item.strip() for item in data if isinstance(item, str)] if isinstance(data, list) else []
+    blocks = (block.strip() for block in re.split(r'```|---+|\n\n', content))
+    return [block for block in blocks if 20 < len(block) < 2000]
+
+
+@functools.lru_cache(maxsize=4)
+def source_index(directory=SOURCE_DIR):
+    """
+    Map prompt text -> source file (path relative to the L1B3RT4S folder)
+
+    Returns:
+        dict: Empty when the folder is missing (every prompt is then 'builtin')
+    """
+    directory = Path(directory)
+    index = {}
+    if not directory.is_dir():
+        return index
+    for path in sorted(directory.rglob("*")):
+        if path.suffix in ('.mkd', '.txt', '.json') and path.is_file():
+            source = path.relative_to(directory).as_posix()
+            for text in _source_prompts(path):
+                index.setdefault(text, source)
+    return index
+
+
+def length_bucket(text):
+    for idx, bound in enumerate(LENGTH_BUCKETS):
+        if len(text) < bound:
+            return idx
+    return len(LENGTH_BUCKETS)
+
+
+def stratum(prompt_data):
+    """(source file, length bucket, category) of a prompt dict"""
+    text = prompt_data.get('prompt', '')
+    source = prompt_data.get('source') or source_index().get(text.strip(), BUILTIN)
+    return source, length_bucket(text), prompt_data.get('category', 'generic')
+
+
+def order_prompts(prompts, mode="stratified", seed=0, key=stratum):
+    """
+    Order prompts for sampling; any prefix of the result is the sample
+
+    Args:
+        prompts (list): Prompt dicts
+        mode (str): first (file order) | random | stratified
+        seed (int): Shuffle seed
+        key (callable): Stratum of a prompt (default: source, length bucket, category)
+
+    Returns:
+        list: Reordered prompts. Stratified order interleaves strata in
+            proportion to their size, so every prefix mirrors the full set.
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Invalid sampling mode: {mode} (expected one of {', '.join(SAMPLING_MODES)})")
+    if mode == "first":
+        return list(prompts)
+    rng = random.Random(seed)
+    if mode == "random":
+        ordered = list(prompts)
+        rng.shuffle(ordered)
+        return ordered
+
+    strata = {}
+    for prompt_data in prompts:
+        strata.setdefault(key(prompt_data), []).append(prompt_data)
+    # Item i of a stratum of size n sits at (i + u) / n: systematic sampling per
+    # stratum, so a prefix of length k holds ~k * n / N items of every stratum
+    positioned = []
+    for members in strata.values():
+        rng.shuffle(members)
+        offset = rng.random()
+        positioned.extend(((i + offset) / len(members), rng.random(), prompt_data)
+                          for i, prompt_data in enumerate(members))
+    positioned.sort(key=lambda item: (item[0], item[1]))
+    return [prompt_data for _, _, prompt_data in positioned]
+
+
+def sample_prompts(prompts, count=None, mode="stratified", seed=0):
+    """First `count` prompts of order_prompts() (all of them when count is None)"""
+    ordered = order_prompts(prompts, mode, seed)
+    return ordered[:count] if count else ordered
+
+
+def coverage(sample, population):
+    """How many strata of the population a sample touches"""
+    return {
+        "strata": len({stratum(p) for p in sample}),
+        "population_strata": len({stratum(p) for p in population}),
+        "sources": len({stratum(p)[0] for p in sample}),
+        "population_sources": len({stratum(p)[0] for p in population})
+    }
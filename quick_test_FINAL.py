@@ -12,6 +12,7 @@ try:
     from response_analyzer import analyzer
     from scoring_engine import engine as scoring
     from comparison_reports import ComparisonReporter
+    from ollama_pool import OllamaHostPool
     print("[OK] Modules loaded")
 except ImportError as e:
     print(f"[ERROR] {e}")
@@ -36,18 +37,17 @@ def load_prompts():
     return prompts
 
 class Orchestrator:
-    def __init__(self):
+    def __init__(self, hosts=None):
         self.prompts = load_prompts()
         self.client = None
         
         if OLLAMA_OK:
-            try:
-                self.client = ollama.Client(host='http://127.0.0.1:11434')
-                resp = self.client.list()
-                print(f"[OK] Ollama: {len(resp.models)} models")
-            except:
+            pool = OllamaHostPool(hosts)
+            if pool.check_all():
+                print(f"[OK] Ollama: {len(pool.list_models())} models on {len(pool.healthy_hosts())} host(s)")
+                self.client = pool
+            else:
                 print("[FAIL] Ollama not responding")
-                self.client = None
     
     def run(self, models, attacks):
         if not self.prompts:
@@ -117,11 +117,12 @@ def main():
     p = argparse.ArgumentParser()
     p.add_argument("--models", default="gemma3:latest,mistral:7b,dolphin-llama3:8b,orca-mini:7b,neural-chat:7b")
     p.add_argument("--attacks", type=int, default=5)
+    p.add_argument("--hosts", default=None)
     args = p.parse_args()
     
     Path("outputs").mkdir(exist_ok=True)
     
-    o = Orchestrator()
+    o = Orchestrator(hosts=args.hosts)
     models = [m.strip() for m in args.models.split(",")]
     o.run(models, args.attacks)
 
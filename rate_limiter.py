@@ -0,0 +1,197 @@
+"""
+Adaptive Rate Controller - replaces fixed time.sleep() throttling
+Per-host token bucket whose rate and concurrency window follow AIMD
+(additive increase, multiplicative decrease) on host errors and queueing delay.
+Queueing delay is the part of a request's wall time Ollama did not spend
+loading or generating (network + waiting for a free slot), so long completions
+and short refusals give the same signal.
+"""
+import asyncio
+import threading
+import time
+
+
+NS = 1e9
+
+
+def queueing_delay(latency, response):
+    """
+    Seconds of a request not spent loading the model or evaluating prompt / output
+
+    Args:
+        latency (float): Request wall time in seconds
+        response: Final Ollama response / done chunk (dict-like), or None
+
+    Returns:
+        float: Queueing delay, or None if the response carries no durations
+    """
+    if latency is None or response is None:
+        return None
+    durations = [response.get(field) for field in ("load_duration", "prompt_eval_duration", "eval_duration")]
+    if all(value is None for value in durations):
+        return None
+    return max(0.0, latency - sum(value or 0 for value in durations) / NS)
+
+
+class HostRate:
+    """Token bucket + AIMD state for one host"""
+
+    def __init__(self, rate, concurrency):
+        self.rate = rate                    # requests / second
+        self.concurrency = concurrency      # in-flight window (float, AIMD)
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.inflight = 0
+        self.ewma_latency = None
+        self.ewma_delay = None
+        self.base_delay = None
+        self.last_decrease = 0.0
+        self.slow_start = True
+        self.requests = 0
+        self.errors = 0
+        self.slow = 0
+
+    def refill(self, now):
+        burst = max(1.0, self.rate)
+        self.tokens = min(burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+
+class AdaptiveRateController:
+    """Shared AIMD rate controller keyed by host URL"""
+
+    def __init__(self, initial_rate=4.0, min_rate=0.2, max_rate=200.0,
+                 initial_concurrency=2, max_concurrency=64,
+                 increase=0.5, decrease=0.5, target_delay=0.25, decrease_interval=1.0):
+        """
+        Args:
+            initial_rate (float): Starting requests/second per host
+            min_rate (float): Lower bound for the rate
+            max_rate (float): Upper bound for the rate
+            initial_concurrency (int): Starting in-flight window per host
+            max_concurrency (int): Upper bound for the in-flight window
+            increase (float): Additive rate increase (req/s) per healthy response
+            decrease (float): Multiplicative factor applied on errors / slowdowns
+            target_delay (float): Smoothed queueing delay above the host's base delay
+                (lowest seen, i.e. network round trip) by more than this many seconds
+                counts as congestion
+            decrease_interval (float): Minimum seconds between two decreases (one per burst)
+        """
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        self.target_delay = target_delay
+        self.decrease_interval = decrease_interval
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostRate(self.initial_rate, float(self.initial_concurrency))
+        return state
+
+    def _try_acquire(self, host):
+        """Take a token and an in-flight slot. Returns seconds to wait (0 = acquired)"""
+        with self._lock:
+            state = self._host(host)
+            now = time.monotonic()
+            state.refill(now)
+            if state.inflight >= int(state.concurrency):
+                return 0.01
+            if state.tokens < 1.0:
+                return (1.0 - state.tokens) / state.rate
+            state.tokens -= 1.0
+            state.inflight += 1
+            return 0.0
+
+    def acquire(self, host):
+        """Block until the host may receive another request"""
+        while True:
+            wait = self._try_acquire(host)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, host):
+        """asyncio version of acquire()"""
+        while True:
+            wait = self._try_acquire(host)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self, host, latency, error=None, response=None):
+        """
+        Record a finished request and adapt rate and concurrency.
+        Raw wall time is never compared across requests: it mostly measures
+        output length. Without Ollama durations only errors decrease the rate.
+
+        Args:
+            host (str): Host URL passed to acquire()
+            latency (float): Request wall time in seconds (None for aborted streams)
+            error (Exception, optional): Request error, if any
+            response: Final Ollama response / done chunk, if any
+        """
+        with self._lock:
+            state = self._host(host)
+            state.inflight = max(0, state.inflight - 1)
+            state.requests += 1
+
+            congested = error is not None
+            if error is not None:
+                state.errors += 1
+            elif latency is not None:
+                state.ewma_latency = latency if state.ewma_latency is None else \
+                    0.8 * state.ewma_latency + 0.2 * latency
+                delay = queueing_delay(latency, response)
+                if delay is not None:
+                    state.ewma_delay = delay if state.ewma_delay is None else \
+                        0.8 * state.ewma_delay + 0.2 * delay
+                    if state.base_delay is None or delay < state.base_delay:
+                        state.base_delay = delay
+                    if state.ewma_delay > state.base_delay + self.target_delay:
+                        state.slow += 1
+                        congested = True
+
+            now = time.monotonic()
+            if congested:
+                if now - state.last_decrease >= self.decrease_interval:
+                    state.rate = max(self.min_rate, state.rate * self.decrease)
+                    state.concurrency = max(1.0, state.concurrency * self.decrease)
+                    state.last_decrease = now
+                    state.slow_start = False
+            else:
+                # Window grows by one per response until the first congestion
+                # signal, then by one per full window (classic AIMD)
+                step = 1.0 if state.slow_start else 1.0 / state.concurrency
+                state.rate = min(self.max_rate, state.rate + self.increase)
+                state.concurrency = min(float(self.max_concurrency), state.concurrency + step)
+
+    def current_rate(self, host=None):
+        """Current allowed requests/second for one host, or summed over all hosts"""
+        with self._lock:
+            if host is not None:
+                return self._host(host).rate
+            return sum(state.rate for state in self._hosts.values())
+
+    def snapshot(self):
+        """Per-host rate state for dashboard stats"""
+        with self._lock:
+            return {
+                host: {
+                    "rate": round(state.rate, 2),
+                    "concurrency": int(state.concurrency),
+                    "inflight": state.inflight,
+                    "ewma_latency_ms": round(state.ewma_latency * 1000, 1) if state.ewma_latency else None,
+                    "queue_delay_ms": round(state.ewma_delay * 1000, 1) if state.ewma_delay is not None else None,
+                    "requests": state.requests,
+                    "errors": state.errors,
+                    "slow": state.slow
+                }
+                for host, state in self._hosts.items()
+            }
@@ -0,0 +1,233 @@
+"""
+Request Timing - per-request latency and token-rate accounting
+Turns Ollama's timing fields (total_duration, load_duration, prompt_eval_*,
+eval_*; nanoseconds) plus client-side wall time and time-to-first-token into
+one record per request, and aggregates records into fixed-bucket histograms.
+overhead = wall - total_duration is time spent outside the model (network,
+host queueing), which separates slow hosts from slow models.
+"""
+import bisect
+
+
+NS = 1e9
+
+# Bucket upper bounds ("le"), seconds and tokens/second
+LATENCY_BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATE_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+HISTOGRAMS = {
+    "wall": LATENCY_BOUNDS,             # client-side request time (complete responses only)
+    "aborted_wall": LATENCY_BOUNDS,     # client-side time of streams stopped early
+    "ttft": LATENCY_BOUNDS,             # time to first token (estimated when not streaming)
+    "total": LATENCY_BOUNDS,            # total_duration
+    "load": LATENCY_BOUNDS,             # load_duration
+    "prompt_eval": LATENCY_BOUNDS,      # prompt_eval_duration
+    "eval": LATENCY_BOUNDS,             # eval_duration
+    "overhead": LATENCY_BOUNDS,         # wall - total_duration
+    "tokens_per_sec": RATE_BOUNDS,      # eval_count / eval_duration
+    "prompt_tokens_per_sec": RATE_BOUNDS
+}
+
+
+def request_timing(response, wall, ttft=None, host=None):
+    """
+    Build the timing record of one request
+
+    Args:
+        response: Final Ollama response / stream chunk (dict-like), or None for
+            aborted streams and errors (only client-side times are known then)
+        wall (float): Client-side seconds from sending to the last byte used
+        ttft (float, optional): Measured seconds to the first streamed token
+        host (str, optional): Host URL that served the request
+
+    Returns:
+        dict: Seconds / token counts; missing fields are None
+    """
+    timing = {
+        "host": host,
+        "wall": wall,
+        "aborted": response is None,
+        "ttft": ttft,
+        "ttft_estimated": False,
+        "total": None,
+        "load": None,
+        "prompt_eval": None,
+        "eval": None,
+        "prompt_tokens": None,
+        "eval_tokens": None,
+        "tokens_per_sec": None,
+        "prompt_tokens_per_sec": None,
+        "overhead": None
+    }
+    if response is None:
+        return timing
+
+    for key, field in (("total", "total_duration"), ("load", "load_duration"),
+                       ("prompt_eval", "prompt_eval_duration"), ("eval", "eval_duration")):
+        value = response.get(field)
+        if value is not None:
+            timing[key] = value / NS
+    timing["prompt_tokens"] = response.get("prompt_eval_count")
+    timing["eval_tokens"] = response.get("eval_count")
+
+    if timing["eval"] and timing["eval_tokens"]:
+        timing["tokens_per_sec"] = timing["eval_tokens"] / timing["eval"]
+    if timing["prompt_eval"] and timing["prompt_tokens"]:
+        timing["prompt_tokens_per_sec"] = timing["prompt_tokens"] / timing["prompt_eval"]
+    if timing["total"] is not None:
+        timing["overhead"] = max(0.0, wall - timing["total"])
+    if ttft is None and timing["prompt_eval"] is not None:
+        # Non-streamed: the first token exists once the model is loaded and the prompt evaluated
+        timing["ttft"] = (timing["load"] or 0.0) + timing["prompt_eval"] + (timing["overhead"] or 0.0)
+        timing["ttft_estimated"] = True
+    return timing
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative 'le' semantics like Prometheus)"""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)     # last bucket = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Add another histogram with the same bounds"""
+        for idx, bucket in enumerate(other.counts):
+            self.counts[idx] += bucket
+        self.count += other.count
+        self.sum += other.sum
+        for name, pick in (("min", min), ("max", max)):
+            mine, theirs = getattr(self, name), getattr(other, name)
+            setattr(self, name, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+        return self
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for idx, bucket in enumerate(self.counts):
+            if bucket and seen + bucket >= target:
+                low = self.bounds[idx - 1] if idx > 0 else 0.0
+                high = self.bounds[idx] if idx < len(self.bounds) else self.max
+                low, high = max(low, self.min), min(high, self.max)
+                return low + (high - low) * max(0.0, target - seen) / bucket
+            seen += bucket
+        return self.max
+
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def snapshot(self):
+        cumulative = 0
+        buckets = []
+        for bound, bucket in zip(self.bounds + ("+Inf",), self.counts):
+            cumulative += bucket
+            buckets.append((bound, cumulative))
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": _round(self.mean()),
+            "p50": _round(self.quantile(0.50)),
+            "p95": _round(self.quantile(0.95)),
+            "p99": _round(self.quantile(0.99)),
+            "min": _round(self.min),
+            "max": _round(self.max),
+            "buckets": buckets
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 4)
+
+
+class TimingStats:
+    """Histograms and token totals for one model or host"""
+
+    def __init__(self):
+        self.histograms = {name: Histogram(bounds) for name, bounds in HISTOGRAMS.items()}
+        self.requests = 0
+        self.aborted = 0            # early-exit streams: only in "aborted_wall", not in "wall"
+        self.prompt_tokens = 0
+        self.eval_tokens = 0
+        self.load_time = 0.0
+
+    def add(self, timing):
+        self.requests += 1
+        aborted = timing.get("aborted", False)
+        if aborted:
+            self.aborted += 1
+        for name, histogram in self.histograms.items():
+            if name == "wall" and aborted:
+                continue    # a cut-off stream would understate latency
+            value = timing.get("wall") if name == "aborted_wall" and aborted else timing.get(name)
+            if value is not None:
+                histogram.add(value)
+        self.prompt_tokens += timing.get("prompt_tokens") or 0
+        self.eval_tokens += timing.get("eval_tokens") or 0
+        self.load_time += timing.get("load") or 0.0
+
+    def merge(self, other):
+        for name, histogram in self.histograms.items():
+            histogram.merge(other.histograms[name])
+        self.requests += other.requests
+        self.aborted += other.aborted
+        self.prompt_tokens += other.prompt_tokens
+        self.eval_tokens += other.eval_tokens
+        self.load_time += other.load_time
+        return self
+
+    def summary(self):
+        """Compact figures for rankings and reports (seconds, tokens/s)"""
+        h = self.histograms
+        return {
+            "requests": self.requests,
+            "aborted": self.aborted,
+            "wall_p50": _round(h["wall"].quantile(0.50)),
+            "wall_p95": _round(h["wall"].quantile(0.95)),
+            "aborted_wall_p50": _round(h["aborted_wall"].quantile(0.50)),
+            "ttft_p50": _round(h["ttft"].quantile(0.50)),
+            "ttft_p95": _round(h["ttft"].quantile(0.95)),
+            "overhead_p50": _round(h["overhead"].quantile(0.50)),
+            "tokens_per_sec": _round(h["tokens_per_sec"].mean()),
+            "prompt_tokens_per_sec": _round(h["prompt_tokens_per_sec"].mean()),
+            "load_time": round(self.load_time, 3),
+            "prompt_tokens": self.prompt_tokens,
+            "eval_tokens": self.eval_tokens
+        }
+
+    def snapshot(self):
+        """Full histograms (for JSON export)"""
+        return dict(self.summary(), histograms={name: h.snapshot() for name, h in self.histograms.items()})
+
+
+def format_timing(summary):
+    """One-line latency / throughput summary for console rankings"""
+    if not summary or not summary.get("requests"):
+        return ""
+    parts = []
+    if summary.get("wall_p50") is not None:
+        parts.append(f"p50 {summary['wall_p50']:.2f}s / p95 {summary['wall_p95']:.2f}s")
+    if summary.get("ttft_p50") is not None:
+        parts.append(f"TTFT {summary['ttft_p50']:.2f}s")
+    if summary.get("tokens_per_sec") is not None:
+        parts.append(f"{summary['tokens_per_sec']:.1f} tok/s")
+    if summary.get("overhead_p50") is not None:
+        parts.append(f"overhead {summary['overhead_p50']:.2f}s")
+    if summary.get("load_time"):
+        parts.append(f"load {summary['load_time']:.1f}s")
+    if summary.get("aborted"):
+        parts.append(f"{summary['aborted']} stopped early (not in p50/p95)")
+    return ", ".join(parts)
@@ -0,0 +1,151 @@
+"""
+Response Cache - content-addressed on-disk cache of model responses
+Key = model digest (from client.list()) + prompt hash + generation options,
+so a cached response is only reused for the exact same model build and
+sampling settings. Size-bounded with least-recently-used eviction.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import metrics
+
+
+CACHE_DIR = Path("outputs") / "cache"
+CACHE_MODES = ("off", "read", "readwrite")
+
+
+class ResponseCache:
+    """Sharded JSON-file cache under outputs/cache/<2 hex>/<key>.json"""
+
+    def __init__(self, directory=CACHE_DIR, mode="readwrite", max_bytes=512 * 1024 * 1024):
+        """
+        Args:
+            directory (str|Path): Cache directory
+            mode (str): off | read | readwrite
+            max_bytes (int): Size bound; oldest entries are evicted above it
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Invalid cache mode: {mode} (expected one of {', '.join(CACHE_MODES)})")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size = self._scan_size() if mode != "off" else 0
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    @staticmethod
+    def key(model_digest, prompt, options):
+        """
+        Content address of one generation request
+
+        Args:
+            model_digest (str): Model digest from client.list() of the serving host; callers
+                skip the cache when there is none (a model name may cover several builds)
+            prompt (str): Prompt text
+            options (dict): Generation options (temperature, num_predict, seed, ...)
+        """
+        material = json.dumps({
+            "model": model_digest,
+            "prompt": hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+            "options": options or {}
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _scan_size(self):
+        if not self.directory.exists():
+            return 0
+        return sum(p.stat().st_size for p in self.directory.glob("*/*.json"))
+
+    def get(self, key):
+        """Cached response text or None (counts hits and misses)"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # LRU: bump on access
+        except (OSError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            metrics.CACHE_LOOKUPS.inc("miss")
+            return None
+        with self._lock:
+            self.hits += 1
+        metrics.CACHE_LOOKUPS.inc("hit")
+        return entry.get("response")
+
+    def put(self, key, response, model=None):
+        """Store a response (readwrite mode only)"""
+        if self.mode != "readwrite" or response is None:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"model": model, "response": response}, ensure_ascii=False)
+        try:
+            # Overwriting a key (e.g. an unseeded re-run) replaces the old entry's bytes
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        # pid + thread: fleet workers in several processes may write the same key
+        tmp = path.with_suffix(f".tmp{os.getpid()}-{threading.get_ident()}")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.writes += 1
+            self._size += len(data.encode('utf-8')) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries down to 90% of max_bytes (lock held)"""
+        entries = []
+        for p in self.directory.glob("*/*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+
+        size = sum(e[1] for e in entries)
+        target = self.max_bytes * 0.9
+        for _, entry_size, p in entries:
+            if size <= target:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+            self.evictions += 1
+        self._size = size
+
+    def stats(self):
+        """Hit/miss counters for reports and dashboards"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "size_bytes": self._size
+            }
@@ -0,0 +1,482 @@
+"""
+Results Store - every (run, model, prompt) result in one indexed SQLite file
+The journal (run_journal.py) keeps what a run needs to resume; this store keeps
+what later analysis needs: per-attack rows of every run with prompt text and
+response, queryable across runs. Appends are buffered and written in batches
+(one transaction per batch, WAL mode so readers never block the writer).
+Prompt texts are stored once per prompt hash.
+
+Usage:
+  python results_store.py runs
+  python results_store.py query --model llama3 --severity CRITICAL --jailbroken --last-runs 5
+  python results_store.py query --category roleplay --run 20251117-213045 --json
+  python results_store.py import --all           # backfill from outputs/runs/*.jsonl
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from run_journal import JOURNAL_DIR, RunJournal, prompt_hash
+
+
+STORE_PATH = Path("outputs") / "results.sqlite"
+BATCH_SIZE = 500
+FLUSH_SECONDS = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL UNIQUE,
+    started REAL NOT NULL,
+    finished REAL,
+    models TEXT,
+    attack_count INTEGER,
+    meta TEXT
+);
+CREATE TABLE IF NOT EXISTS prompts (
+    prompt_hash TEXT PRIMARY KEY,
+    category TEXT,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs (id),
+    model TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    attack TEXT,
+    category TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    response_length INTEGER,
+    response TEXT,
+    time REAL NOT NULL,
+    UNIQUE (run, model, prompt_hash)
+);
+-- Covers run-to-run joins on (model, prompt hash) without touching the table
+CREATE INDEX IF NOT EXISTS results_by_cell ON results (run, model, prompt_hash, success, category, severity);
+CREATE INDEX IF NOT EXISTS results_by_model ON results (model, severity, success, run);
+CREATE INDEX IF NOT EXISTS results_by_category ON results (category, model, success, run);
+CREATE INDEX IF NOT EXISTS results_by_prompt ON results (prompt_hash, run);
+"""
+
+
+class ResultsStore:
+    """Batched writer and query API over outputs/results.sqlite; safe across threads"""
+
+    def __init__(self, path=STORE_PATH, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS):
+        """
+        Args:
+            path (str|Path): Store file (created if missing)
+            batch_size (int): Buffered results that trigger a write
+            flush_seconds (float): Max age of buffered results before a write
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._prompts = {}          # prompt_hash -> (category, text) waiting in the buffer
+        self._last_flush = time.monotonic()
+        self._run_keys = {}         # run_id -> runs.id
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        # Caller holds self._lock
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def _run_key(self, run_id, create=True):
+        key = self._run_keys.get(run_id)
+        if key is None:
+            row = self._conn.execute("SELECT id FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                if not create:
+                    return None
+                self._conn.execute("INSERT OR IGNORE INTO runs (run_id, started) VALUES (?, ?)", (run_id, time.time()))
+                row = self._conn.execute("SELECT id FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            key = self._run_keys[run_id] = row["id"]
+        return key
+
+    def start_run(self, run_id, models, attack_count, **meta):
+        """Register a run (kept as is when it already exists, e.g. on --resume)"""
+        with self._lock, self._transaction():
+            self._run_key(run_id)
+            self._conn.execute(
+                "UPDATE runs SET models = ?, attack_count = ?, meta = ?, finished = NULL WHERE run_id = ?",
+                (json.dumps(list(models)), attack_count, json.dumps(meta), run_id)
+            )
+
+    def finish_run(self, run_id):
+        self.flush()
+        with self._lock:
+            self._conn.execute("UPDATE runs SET finished = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def append(self, run_id, model_name, prompt_data, prompt_name, analysis, response=None,
+               response_length=None, timestamp=None):
+        """Buffer one result; written with the next batch (a later result for the same cell replaces it)"""
+        text = prompt_data.get('prompt', '')
+        digest = prompt_data.get('prompt_hash') or prompt_hash(text)
+        category = prompt_data.get('category', 'generic')
+        row = (run_id, model_name, digest, prompt_name, category, analysis['severity'],
+               1 if analysis['success'] else 0, analysis['confidence'],
+               len(response) if response is not None else response_length, response,
+               timestamp or time.time())
+        with self._lock:
+            self._buffer.append(row)
+            if text and digest not in self._prompts:
+                self._prompts[digest] = (category, text)
+            due = (len(self._buffer) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_seconds)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write buffered results in one transaction"""
+        with self._lock:
+            if not self._buffer:
+                return 0
+            rows, prompts = self._buffer, self._prompts
+            self._buffer, self._prompts = [], {}
+            with self._transaction() as conn:
+                conn.executemany(
+                    "INSERT INTO prompts (prompt_hash, category, text) VALUES (?, ?, ?) "
+                    "ON CONFLICT (prompt_hash) DO UPDATE SET text = COALESCE(prompts.text, excluded.text)",
+                    [(digest, category, text) for digest, (category, text) in prompts.items()]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO results (run, model, prompt_hash, attack, category, severity, success, "
+                    "confidence, response_length, response, time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(self._run_key(row[0]),) + row[1:] for row in rows]
+                )
+            self._last_flush = time.monotonic()
+            return len(rows)
+
+    def carry(self, run_id, source_run, cells):
+        """
+        Copy results of (model, prompt_hash) cells from an earlier run (--delta)
+
+        Returns:
+            int: Rows copied (cells missing from the source run are skipped)
+        """
+        self.flush()
+        with self._lock:
+            source = self._run_key(source_run, create=False)
+            if source is None:
+                return 0
+            with self._transaction() as conn:
+                target = self._run_key(run_id)
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO results (run, model, prompt_hash, attack, category, severity, success, "
+                    "confidence, response_length, response, time) "
+                    "SELECT ?, model, prompt_hash, attack, category, severity, success, confidence, "
+                    "response_length, response, time FROM results WHERE run = ? AND model = ? AND prompt_hash = ?",
+                    [(target, source, model, digest) for model, digest in cells]
+                )
+                return conn.total_changes - before
+
+    def import_journal(self, journal):
+        """
+        Add a journal's results that the store does not have yet (no response text)
+
+        Returns:
+            int: Rows added
+        """
+        header = journal.header() or {}
+        self.flush()
+        with self._lock:
+            with self._transaction() as conn:
+                run = self._run_key(journal.run_id)
+                if header:
+                    started = datetime.fromisoformat(header['started']).timestamp() if header.get('started') else None
+                    conn.execute(
+                        "UPDATE runs SET started = COALESCE(?, started), models = COALESCE(models, ?), "
+                        "attack_count = COALESCE(attack_count, ?) WHERE id = ?",
+                        (started, json.dumps(header.get('models')), header.get('attack_count'), run)
+                    )
+                rows = []
+                # Latest record per cell, the rule replay_into() and --delta use
+                for record in journal.manifest().values():
+                    stamp = record.get("time")
+                    rows.append((run, record["model"], record["prompt_hash"], record.get("attack"),
+                                 record.get("category", "generic"), record["severity"],
+                                 1 if record["success"] else 0, record["confidence"],
+                                 record.get("response_length"),
+                                 datetime.fromisoformat(stamp).timestamp() if stamp else time.time()))
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO results (run, model, prompt_hash, attack, category, severity, success, "
+                    "confidence, response_length, time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                return conn.total_changes - before
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def runs(self, limit=None):
+        """Runs, newest first, with result counts"""
+        self.flush()
+        sql = ("SELECT r.run_id, r.started, r.finished, r.models, r.attack_count, r.meta, "
+               "(SELECT COUNT(*) FROM results WHERE run = r.id) AS results, "
+               "(SELECT COUNT(*) FROM results WHERE run = r.id AND success = 1) AS jailbroken "
+               "FROM runs r ORDER BY r.started DESC")
+        params = ()
+        if limit:
+            sql += " LIMIT ?"
+            params = (limit,)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [{"run_id": row["run_id"], "started": row["started"], "finished": row["finished"],
+                 "models": json.loads(row["models"]) if row["models"] else [],
+                 "attack_count": row["attack_count"], "meta": json.loads(row["meta"]) if row["meta"] else {},
+                 "results": row["results"], "jailbroken": row["jailbroken"]} for row in rows]
+
+    def latest_runs(self, count):
+        """IDs of the `count` most recent runs, newest first"""
+        with self._lock:
+            rows = self._conn.execute("SELECT run_id FROM runs ORDER BY started DESC LIMIT ?", (count,)).fetchall()
+        return [row["run_id"] for row in rows]
+
+    def query(self, model=None, category=None, severity=None, success=None, runs=None, last_runs=None,
+              prompt=None, limit=1000, with_text=False):
+        """
+        Results matching every given filter, newest run first
+
+        Args:
+            model (str|list, optional): Model name(s)
+            category (str|list, optional): Prompt category(ies)
+            severity (str|list, optional): Severity level(s), e.g. "CRITICAL"
+            success (bool, optional): True = jailbroken only, False = refused only
+            runs (list, optional): Run IDs
+            last_runs (int, optional): Only the N most recent runs
+            prompt (str, optional): Prompt hash
+            limit (int, optional): Max rows (None = all)
+            with_text (bool): Include prompt text and response
+
+        Returns:
+            list: Result dicts
+        """
+        self.flush()
+        where, params = [], []
+        for column, value in (("r.model", model), ("r.category", category), ("r.severity", severity),
+                              ("r.prompt_hash", prompt)):
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            where.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if success is not None:
+            where.append("r.success = ?")
+            params.append(1 if success else 0)
+        if runs is not None:
+            where.append(f"u.run_id IN ({', '.join('?' * len(runs))})")
+            params.extend(runs)
+        if last_runs:
+            where.append("r.run IN (SELECT id FROM runs ORDER BY started DESC LIMIT ?)")
+            params.append(last_runs)
+
+        columns = "u.run_id, r.model, r.prompt_hash, r.attack, r.category, r.severity, r.success, " \
+                  "r.confidence, r.response_length, r.time"
+        joins = "FROM results r JOIN runs u ON u.id = r.run"
+        if with_text:
+            columns += ", p.text AS prompt, r.response"
+            joins += " LEFT JOIN prompts p ON p.prompt_hash = r.prompt_hash"
+        sql = f"SELECT {columns} {joins}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY u.started DESC, r.id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row, success=bool(row["success"])) for row in rows]
+
+    def has_run(self, run_id):
+        with self._lock:
+            return self._run_key(run_id, create=False) is not None
+
+    def model_counts(self, run_id):
+        """{model: results} for one run"""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.model, COUNT(*) AS n FROM results r JOIN runs u ON u.id = r.run "
+                "WHERE u.run_id = ? GROUP BY r.model", (run_id,)
+            ).fetchall()
+        return {row["model"]: row["n"] for row in rows}
+
+    def paired(self, base_run, new_run, model=None):
+        """
+        Per (model, category) counts over cells present in both runs (joined on prompt hash)
+
+        Returns:
+            list: Dicts with model, category, cells, base_jailbroken, new_jailbroken,
+                newly_jailbroken, newly_refused
+        """
+        self.flush()
+        sql = ("SELECT n.model, n.category, COUNT(*) AS cells, SUM(b.success) AS base_jailbroken, "
+               "SUM(n.success) AS new_jailbroken, SUM(n.success > b.success) AS newly_jailbroken, "
+               "SUM(n.success < b.success) AS newly_refused "
+               "FROM results n JOIN results b INDEXED BY results_by_cell "
+               "ON b.run = :base AND b.model = n.model AND b.prompt_hash = n.prompt_hash "
+               "WHERE n.run = :new")
+        with self._lock:
+            params = {"base": self._run_key(base_run, create=False), "new": self._run_key(new_run, create=False)}
+            if model is not None:
+                sql += " AND n.model = :model"
+                params["model"] = model
+            rows = self._conn.execute(sql + " GROUP BY n.model, n.category", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def flips(self, base_run, new_run, model=None, with_text=False):
+        """
+        Cells whose verdict changed between two runs
+
+        Returns:
+            list: Dicts with model, prompt_hash, attack, category, base/new success, severity, confidence
+        """
+        self.flush()
+        columns = ("n.model, n.prompt_hash, n.attack, n.category, b.success AS base_success, "
+                   "n.success AS new_success, b.severity AS base_severity, n.severity AS new_severity, "
+                   "b.confidence AS base_confidence, n.confidence AS new_confidence")
+        joins = ("FROM results n JOIN results b "
+                 "ON b.run = :base AND b.model = n.model AND b.prompt_hash = n.prompt_hash")
+        if with_text:
+            columns += ", p.text AS prompt, b.response AS base_response, n.response AS new_response"
+            joins += " LEFT JOIN prompts p ON p.prompt_hash = n.prompt_hash"
+        sql = f"SELECT {columns} {joins} WHERE n.run = :new AND n.success != b.success"
+        with self._lock:
+            params = {"base": self._run_key(base_run, create=False), "new": self._run_key(new_run, create=False)}
+            if model is not None:
+                sql += " AND n.model = :model"
+                params["model"] = model
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row, base_success=bool(row["base_success"]), new_success=bool(row["new_success"]))
+                for row in rows]
+
+    def summary(self, run_id):
+        """{model: {category: (total, jailbroken)}} for one run"""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.model, r.category, COUNT(*) AS n, SUM(r.success) AS jailbroken "
+                "FROM results r JOIN runs u ON u.id = r.run WHERE u.run_id = ? GROUP BY r.model, r.category",
+                (run_id,)
+            ).fetchall()
+        summary = {}
+        for row in rows:
+            summary.setdefault(row["model"], {})[row["category"]] = (row["n"], row["jailbroken"])
+        return summary
+
+
+def _list(value):
+    return [item.strip() for item in value.split(",")] if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="LLM Security Framework - stored results",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split("Usage:", 1)[1]
+    )
+    parser.add_argument("command", choices=("runs", "query", "import"))
+    parser.add_argument("run_ids", nargs="*", help="import: journaled run IDs")
+    parser.add_argument("--store", type=str, default=str(STORE_PATH), help=f"Store file (default: {STORE_PATH})")
+    parser.add_argument("--model", type=str, default=None, help="Comma-separated model names")
+    parser.add_argument("--category", type=str, default=None, help="Comma-separated prompt categories")
+    parser.add_argument("--severity", type=str, default=None, help="Comma-separated severities (e.g. CRITICAL,HIGH)")
+    verdict = parser.add_mutually_exclusive_group()
+    verdict.add_argument("--jailbroken", action="store_true", help="Only successful attacks")
+    verdict.add_argument("--refused", action="store_true", help="Only blocked attacks")
+    parser.add_argument("--run", type=str, default=None, help="Comma-separated run IDs")
+    parser.add_argument("--last-runs", type=int, default=None, help="Only the N most recent runs")
+    parser.add_argument("--prompt-hash", type=str, default=None, help="One prompt")
+    parser.add_argument("--limit", type=int, default=50, help="Max rows (0 = all, default: 50)")
+    parser.add_argument("--text", action="store_true", help="Include prompt and response text")
+    parser.add_argument("--json", action="store_true", help="Print JSON")
+    parser.add_argument("--all", action="store_true", help="import: every journal in outputs/runs")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.store)
+    try:
+        if args.command == "import":
+            run_ids = sorted(path.stem for path in JOURNAL_DIR.glob("*.jsonl")) if args.all else args.run_ids
+            if not run_ids:
+                parser.error("import needs run IDs or --all")
+            for run_id in run_ids:
+                journal = RunJournal(run_id)
+                if not journal.exists():
+                    print(f"[SKIP] {run_id}: no journal at {journal.path}")
+                    continue
+                print(f"[IMPORT] {run_id}: {store.import_journal(journal)} results added")
+            return 0
+
+        if args.command == "runs":
+            runs = store.runs()
+            if args.json:
+                print(json.dumps(runs, indent=2))
+            for run in [] if args.json else runs:
+                asr = run['jailbroken'] / run['results'] * 100 if run['results'] else 0.0
+                started = datetime.fromtimestamp(run['started']).strftime("%Y-%m-%d %H:%M")
+                print(f"  {run['run_id']}  {started}  {run['results']:>7} results  {asr:5.1f}% ASR  "
+                      f"{', '.join(run['models'])}{'' if run['finished'] else '  (unfinished)'}")
+            return 0
+
+        start = time.perf_counter()
+        rows = store.query(
+            model=_list(args.model),
+            category=_list(args.category),
+            severity=_list(args.severity.upper()) if args.severity else None,
+            success=True if args.jailbroken else False if args.refused else None,
+            runs=_list(args.run),
+            last_runs=args.last_runs,
+            prompt=args.prompt_hash,
+            limit=args.limit or None,
+            with_text=args.text
+        )
+        elapsed = time.perf_counter() - start
+        if args.json:
+            print(json.dumps(rows, indent=2, ensure_ascii=False))
+            return 0
+        for row in rows:
+            verdict = "🔴 VULN" if row['success'] else "🟢 SAFE"
+            print(f"  {row['run_id']}  {row['model']:<16} {verdict} {row['severity']:<8} "
+                  f"{row['category']:<14} {row['prompt_hash']}  {(row['attack'] or '')[:40]}")
+            if args.text:
+                print(f"      prompt:   {(row['prompt'] or '')[:200]!r}")
+                print(f"      response: {(row['response'] or '')[:200]!r}")
+        print(f"\n[QUERY] {len(rows)} rows in {elapsed*1000:.1f} ms")
+        return 0
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
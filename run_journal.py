@@ -0,0 +1,226 @@
+"""
+Run Journal - crash-safe, append-only record of a test run
+One JSON line per completed (model, prompt) cell, fsync'd on every append.
+A run can be resumed by replaying the journal into a fresh ScoringEngine.
+Each result also records the model digest, prompt hash and analyzer version,
+so the journal doubles as the run manifest used by --delta.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+JOURNAL_DIR = Path("outputs") / "runs"
+
+
+def prompt_hash(prompt_text):
+    """Stable short identifier of a prompt text"""
+    return hashlib.sha256(prompt_text.encode('utf-8')).hexdigest()[:16]
+
+
+def latest_run_id(directory=JOURNAL_DIR):
+    """Most recent journaled run (run IDs sort by time), or None"""
+    runs = sorted(path.stem for path in Path(directory).glob("*.jsonl"))
+    return runs[-1] if runs else None
+
+
+def new_run_id(taken=None):
+    """
+    Timestamp-based run identifier (e.g. 20251117-213045)
+
+    Args:
+        taken (callable, optional): taken(run_id) -> True if the ID is in use;
+            runs started in the same second then get -2, -3, ...
+    """
+    base = datetime.now().strftime("%Y%m%d-%H%M%S")
+    run_id, n = base, 1
+    while taken is not None and taken(run_id):
+        n += 1
+        run_id = f"{base}-{n}"
+    return run_id
+
+
+class RunJournal:
+    """Append-only JSONL journal stored at outputs/runs/<run-id>.jsonl"""
+
+    def __init__(self, run_id=None, directory=JOURNAL_DIR):
+        self.directory = Path(directory)
+        # A new run reserves its file, so a run started in the same second gets another ID
+        self.run_id = run_id or new_run_id(self._reserve)
+        self.path = self.directory / f"{self.run_id}.jsonl"
+        self._file = None
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return self.path.exists()
+
+    def _reserve(self, run_id):
+        """Create an empty journal file for run_id; True if it already existed"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(self.directory / f"{run_id}.jsonl", os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return True
+        os.close(fd)
+        self._fsync_directory()
+        return False
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                new_file = not self.path.exists()
+                self.directory.mkdir(parents=True, exist_ok=True)
+                if not new_file:
+                    self._truncate_torn_tail()
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if new_file:
+                    self._fsync_directory()
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _truncate_torn_tail(self):
+        # A crash mid-append leaves a last line without "\n"; appending after it
+        # would glue the next record onto the fragment and lose both
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            keep = 0
+            pos = end
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                newline = f.read(step).rfind(b"\n")
+                if newline != -1:
+                    keep = pos - step + newline + 1
+                    break
+                pos -= step
+            if keep < end:
+                f.truncate(keep)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _fsync_directory(self):
+        # Make the new directory entry durable too (no-op where unsupported)
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def start(self, models, attack_count, sampling=None, sample_seed=None, population=None, delta=None):
+        """
+        Write the run header (only for a new journal)
+
+        Args:
+            population (list, optional): Prompt hashes of the whole prompt file at run start
+            delta (str, optional): Baseline run ID of a --delta run
+        """
+        if self.exists() and self.path.stat().st_size:
+            return
+        self._write({
+            "type": "run",
+            "run_id": self.run_id,
+            "started": datetime.now().isoformat(),
+            "models": list(models),
+            "attack_count": attack_count,
+            "sampling": sampling,
+            "sample_seed": sample_seed,
+            "population": list(population) if population else None,
+            "delta": delta
+        })
+
+    def append(self, model_name, prompt_data, prompt_name, analysis, response_length,
+               model_digest=None, analyzer_version=None):
+        """Durably record one completed (model, prompt) result"""
+        self._write({
+            "type": "result",
+            "model": model_name,
+            "prompt_hash": prompt_hash(prompt_data.get('prompt', '')),
+            "attack": prompt_name,
+            "category": prompt_data.get('category', 'generic'),
+            "success": analysis['success'],
+            "confidence": analysis['confidence'],
+            "severity": analysis['severity'],
+            "response_length": response_length,
+            "model_digest": model_digest,
+            "analyzer": analyzer_version,
+            "time": datetime.now().isoformat()
+        })
+
+    def carry(self, record, source_run):
+        """Copy a result unchanged from an earlier run (--delta)"""
+        self._write(dict(record, carried_from=record.get("carried_from") or source_run,
+                         time=datetime.now().isoformat()))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ------------------------------------------------------------------
+    # Reading / resume
+    # ------------------------------------------------------------------
+    def records(self):
+        """Yield journal records, skipping a torn last line from a crash"""
+        if not self.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def header(self):
+        """Run header record or None"""
+        for record in self.records():
+            if record.get("type") == "run":
+                return record
+        return None
+
+    def manifest(self):
+        """
+        Latest result per cell
+
+        Returns:
+            dict: {(model, prompt_hash): result record}
+        """
+        cells = {}
+        for record in self.records():
+            if record.get("type") == "result":
+                cells[(record["model"], record["prompt_hash"])] = record
+        return cells
+
+    def replay_into(self, scoring):
+        """
+        Rebuild ScoringEngine state from the journal (latest record per cell, as manifest())
+
+        Returns:
+            dict: {(model, prompt_hash): success} for every completed cell
+        """
+        completed = {}
+        for cell, record in self.manifest().items():
+            completed[cell] = record["success"]
+            scoring.add_result(
+                model_name=record["model"],
+                attack_name=record["attack"],
+                success=record["success"],
+                confidence=record["confidence"],
+                severity=record["severity"],
+                response_length=record["response_length"],
+                category=record.get("category", "generic")
+            )
+        return completed
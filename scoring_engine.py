@@ -1,44 +1,434 @@
-class ScoringEngine:
+import array
+import heapq
+import itertools
+import threading
+from collections.abc import Mapping, Sequence
+
+import metrics
+from early_stopping import wilson_interval
+from request_timing import TimingStats
+from response_analyzer import SEVERITY_LEVELS
+
+# Columnar result storage: one row per result, ~27 bytes instead of two dicts.
+# model_scores / all_results are read-only views that build dicts on access.
+# Accumulators per model x category x severity keep counts and confidence
+# mean / variance up to date, so rankings never rescan the results.
+#
+# Writers are sharded: each thread sticks to one shard (own lock, columns,
+# counters, accumulators), so concurrent writers rarely share a lock. Readers
+# merge the shards, holding each shard lock only while copying its
+# accumulators; rows keep a global sequence number so views list them in
+# insertion order.
+
+DEFAULT_SHARDS = 8
+
+
+class _Interner:
+    """str <-> dense int id (shared by all shards; inserts are locked)"""
+
+    def __init__(self, values=()):
+        self.values = []
+        self.ids = {}
+        self._lock = threading.Lock()
+        for value in values:
+            self.id(value)
+
+    def id(self, value):
+        idx = self.ids.get(value)
+        if idx is None:
+            with self._lock:
+                idx = self.ids.get(value)
+                if idx is None:
+                    # Publish the value before its id, so readers never see a dangling id
+                    self.values.append(value)
+                    idx = self.ids[value] = len(self.values) - 1
+        return idx
+
+
+class Vocabulary:
+    """Interners shared by every shard, so ids mean the same thing everywhere"""
+
     def __init__(self):
-        self.model_scores = {}
-        self.all_results = []
-    
-    def add_result(self, model_name, attack_name, success, confidence, severity, response_length):
-        if model_name not in self.model_scores:
-            self.model_scores[model_name] = {"successful": 0, "total_attacks": 0, "results": []}
-        
-        self.model_scores[model_name]["total_attacks"] += 1
+        self.models = _Interner()
+        self.attacks = _Interner()
+        self.severities = _Interner(SEVERITY_LEVELS)
+        self.categories = _Interner()
+
+
+class ResultColumns:
+    """Typed columns; array.array and the success bitmap grow geometrically"""
+
+    def __init__(self, vocabulary=None):
+        vocabulary = vocabulary or Vocabulary()
+        self.models = vocabulary.models
+        self.attacks = vocabulary.attacks
+        self.severities = vocabulary.severities
+        self.categories = vocabulary.categories
+        self.seq = array.array('Q')             # global insertion order
+        self.model = array.array('I')
+        self.attack = array.array('I')
+        self.category = array.array('H')
+        self.confidence = array.array('f')      # float32
+        self.severity = array.array('b')        # int8 code -> severities.values
+        self.length = array.array('i')          # int32
+        self._success = bytearray(8)            # bitmap
+        self.count = 0
+
+    def append(self, seq, model_name, attack_name, success, confidence, severity, response_length,
+               category="generic"):
+        row = self.count
+        if row >> 3 >= len(self._success):
+            self._success.extend(bytes(len(self._success)))
         if success:
-            self.model_scores[model_name]["successful"] += 1
-        
-        self.model_scores[model_name]["results"].append({
-            "attack": attack_name, "success": success, "confidence": confidence,
-            "severity": severity, "response_length": response_length
-        })
-        
-        self.all_results.append({"model": model_name, "attack": attack_name, "success": success})
-    
+            self._success[row >> 3] |= 1 << (row & 7)
+        self.seq.append(seq)
+        self.model.append(self.models.id(model_name))
+        self.attack.append(self.attacks.id(attack_name))
+        self.category.append(self.categories.id(category))
+        self.confidence.append(confidence)
+        self.severity.append(self.severities.id(severity))
+        self.length.append(response_length)
+        self.count += 1         # last: a row is visible only once complete
+        return row
+
+    def success(self, row):
+        return bool(self._success[row >> 3] >> (row & 7) & 1)
+
+    def row(self, row):
+        return {
+            "attack": self.attacks.values[self.attack[row]],
+            "category": self.categories.values[self.category[row]],
+            "success": self.success(row),
+            "confidence": round(self.confidence[row], 4),
+            "severity": self.severities.values[self.severity[row]],
+            "response_length": self.length[row]
+        }
+
+    def nbytes(self):
+        columns = (self.seq, self.model, self.attack, self.category, self.confidence, self.severity, self.length)
+        return sum(column.itemsize * len(column) for column in columns) + len(self._success)
+
+
+class Accumulator:
+    """Streaming counts, ASR and confidence mean / variance (Welford)"""
+
+    __slots__ = ("n", "successes", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.successes = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, success, confidence):
+        self.n += 1
+        if success:
+            self.successes += 1
+        delta = confidence - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (confidence - self.mean)
+
+    def merge(self, other):
+        """Combine two accumulators (Chan et al. parallel variance)"""
+        if not other.n:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.successes += other.successes
+        return self
+
+    def std(self):
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+
+    def summary(self, confidence=0.95):
+        low, high = wilson_interval(self.successes, self.n, confidence)
+        return {
+            "n": self.n,
+            "successes": self.successes,
+            "asr": round(self.successes / self.n * 100, 2) if self.n else 0.0,
+            "asr_low": round(low * 100, 2),
+            "asr_high": round(high * 100, 2),
+            "confidence_mean": round(self.mean, 4),
+            "confidence_std": round(self.std(), 4)
+        }
+
+
+class _Shard:
+    """One writer partition: lock, columns, per-model counters, accumulators, timing"""
+
+    def __init__(self, vocabulary):
+        self.lock = threading.Lock()
+        self.columns = ResultColumns(vocabulary)
+        self.totals = array.array('I')          # per model id
+        self.successes = array.array('I')
+        self.cells = {}             # (model id, category id, severity code) -> Accumulator
+        self.model_timing = {}      # model -> TimingStats
+        self.host_timing = {}       # host URL -> TimingStats
+
+
+class _RowsView(Sequence):
+    """Lazy sequence of result dicts (optionally one model's rows) in insertion order"""
+
+    def __init__(self, engine, model_id=None, sizes=None, size=None):
+        self._shards = engine.shards
+        self._model_id = model_id
+        self._sizes = sizes if sizes is not None else [shard.columns.count for shard in self._shards]
+        self._size = sum(self._sizes) if size is None else size
+        self._order = None
+
+    def __len__(self):
+        return self._size
+
+    def _shard_rows(self, idx):
+        columns, size = self._shards[idx].columns, self._sizes[idx]
+        if self._model_id is None:
+            return range(size)
+        model_column, model_id = columns.model, self._model_id
+        return [row for row in range(size) if model_column[row] == model_id]
+
+    def _keyed(self, idx):
+        seq = self._shards[idx].columns.seq
+        return ((seq[row], idx, row) for row in self._shard_rows(idx))
+
+    def _rows(self):
+        """(shard index array, row array) merged by sequence number; built once"""
+        if self._order is None:
+            used = [idx for idx, size in enumerate(self._sizes) if size]
+            shard_ids, rows = array.array('B'), array.array('I')
+            if len(used) == 1:
+                shard_rows = self._shard_rows(used[0])[:self._size]
+                shard_ids.extend(itertools.repeat(used[0], len(shard_rows)))
+                rows.extend(shard_rows)
+            else:
+                streams = [self._keyed(idx) for idx in used]
+                for _, idx, row in itertools.islice(heapq.merge(*streams), self._size):
+                    shard_ids.append(idx)
+                    rows.append(row)
+            self._order = (shard_ids, rows)
+        return self._order
+
+    def _make(self, idx, row):
+        columns = self._shards[idx].columns
+        if self._model_id is None:
+            return {"model": columns.models.values[columns.model[row]],
+                    "attack": columns.attacks.values[columns.attack[row]], "success": columns.success(row)}
+        return columns.row(row)
+
+    def __getitem__(self, index):
+        shard_ids, rows = self._rows()
+        if isinstance(index, slice):
+            return [self._make(idx, row) for idx, row in zip(shard_ids[index], rows[index])]
+        return self._make(shard_ids[index], rows[index])
+
+    def __iter__(self):
+        shard_ids, rows = self._rows()
+        return (self._make(idx, row) for idx, row in zip(shard_ids, rows))
+
+
+class _ModelScoresView(Mapping):
+    """{model: {"successful", "total_attacks", "results"}} as the reporters expect"""
+
+    def __init__(self, engine):
+        self._engine = engine
+
+    def __getitem__(self, model_name):
+        engine = self._engine
+        model_id = engine.vocabulary.models.ids[model_name]
+        sizes, totals, successes = engine._counts()
+        total = totals[model_id] if model_id < len(totals) else 0
+        return {"successful": successes[model_id] if total else 0, "total_attacks": total,
+                "results": _RowsView(engine, model_id, sizes, total)}
+
+    def __iter__(self):
+        return iter(list(self._engine.vocabulary.models.values))
+
+    def __len__(self):
+        return len(self._engine.vocabulary.models.values)
+
+
+class ScoringEngine:
+    def __init__(self, confidence=0.95, shards=DEFAULT_SHARDS):
+        self.vocabulary = Vocabulary()
+        self.shards = [_Shard(self.vocabulary) for _ in range(max(1, shards))]
+        self.confidence = confidence            # Wilson interval level
+        self._seq = itertools.count()           # next() is atomic under the GIL
+        self._next_shard = itertools.count()
+        self._local = threading.local()
+
+    def _shard(self):
+        """The calling thread's shard (assigned round-robin on first write)"""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = self.shards[next(self._next_shard) % len(self.shards)]
+        return shard
+
+    @property
+    def model_scores(self):
+        return _ModelScoresView(self)
+
+    @property
+    def all_results(self):
+        return _RowsView(self)
+
+    @property
+    def count(self):
+        return sum(shard.columns.count for shard in self.shards)
+
+    def add_result(self, model_name, attack_name, success, confidence, severity, response_length,
+                   category="generic"):
+        shard = self._shard()
+        with shard.lock:
+            columns = shard.columns
+            row = columns.append(next(self._seq), model_name, attack_name, success, confidence, severity,
+                                 response_length, category)
+            model_id = columns.model[row]
+            if model_id >= len(shard.totals):
+                grow = model_id + 1 - len(shard.totals)
+                shard.totals.extend(itertools.repeat(0, grow))
+                shard.successes.extend(itertools.repeat(0, grow))
+            shard.totals[model_id] += 1
+            if success:
+                shard.successes[model_id] += 1
+            key = (model_id, columns.category[row], columns.severity[row])
+            cell = shard.cells.get(key)
+            if cell is None:
+                cell = shard.cells[key] = Accumulator()
+            cell.add(success, confidence)
+        metrics.RESULTS.inc(model_name, "jailbroken" if success else "blocked")
+
+    def add_timing(self, model_name, timing):
+        """Aggregate one request_timing() record (see request_timing.py)"""
+        shard = self._shard()
+        with shard.lock:
+            shard.model_timing.setdefault(model_name, TimingStats()).add(timing)
+            if timing.get("host"):
+                shard.host_timing.setdefault(timing["host"], TimingStats()).add(timing)
+
+    # ------------------------------------------------------------------
+    # Reading: merge the shards, one shard lock at a time
+    # ------------------------------------------------------------------
+    def _counts(self):
+        """
+        Returns:
+            tuple: (rows per shard, totals per model id, successes per model id)
+        """
+        models = len(self.vocabulary.models.values)
+        sizes, totals, successes = [], [0] * models, [0] * models
+        for shard in self.shards:
+            with shard.lock:
+                sizes.append(shard.columns.count)
+                if len(shard.totals) > len(totals):         # model added meanwhile
+                    grow = len(shard.totals) - len(totals)
+                    totals.extend([0] * grow)
+                    successes.extend([0] * grow)
+                for model_id, total in enumerate(shard.totals):
+                    totals[model_id] += total
+                    successes[model_id] += shard.successes[model_id]
+        return sizes, totals, successes
+
+    def _cells(self):
+        """Merged copy of all accumulators {(model id, category id, severity code): Accumulator}"""
+        merged = {}
+        for shard in self.shards:
+            with shard.lock:
+                for key, cell in shard.cells.items():
+                    merged.setdefault(key, Accumulator()).merge(cell)
+        return merged
+
+    def _timing(self, attribute):
+        merged = {}
+        for shard in self.shards:
+            with shard.lock:
+                for name, stats in getattr(shard, attribute).items():
+                    merged.setdefault(name, TimingStats()).merge(stats)
+        return merged
+
+    @property
+    def model_timing(self):
+        return self._timing("model_timing")
+
+    @property
+    def host_timing(self):
+        return self._timing("host_timing")
+
+    def stats(self, model_name=None, category=None, severity=None, cells=None):
+        """Accumulator merged over the matching cells (None = any); cost ~ number of cells"""
+        vocabulary = self.vocabulary
+        wanted = []
+        for value, interner in zip((model_name, category, severity),
+                                   (vocabulary.models, vocabulary.categories, vocabulary.severities)):
+            if value is not None and value not in interner.ids:
+                return Accumulator()
+            wanted.append(None if value is None else interner.ids[value])
+        merged = Accumulator()
+        for key, cell in (self._cells() if cells is None else cells).items():
+            if all(w is None or w == k for w, k in zip(wanted, key)):
+                merged.merge(cell)
+        return merged
+
+    def breakdown(self, model_name, by="category", cells=None):
+        """{category or severity: summary} for one model"""
+        vocabulary = self.vocabulary
+        axis, names = (1, vocabulary.categories.values) if by == "category" else (2, vocabulary.severities.values)
+        model_id = vocabulary.models.ids.get(model_name)
+        groups = {}
+        for key, cell in (self._cells() if cells is None else cells).items():
+            if key[0] == model_id:
+                groups.setdefault(names[key[axis]], Accumulator()).merge(cell)
+        return {name: acc.summary(self.confidence) for name, acc in groups.items()}
+
+    def live_summary(self):
+        """Per-model ASR with Wilson interval and confidence stats (for dashboards)"""
+        cells = self._cells()
+        return {model_name: self.stats(model_name, cells=cells).summary(self.confidence)
+                for model_name in list(self.vocabulary.models.values)}
+
+    def timing_summary(self):
+        return {
+            "models": {m: t.summary() for m, t in self.model_timing.items()},
+            "hosts": {h: t.summary() for h, t in self.host_timing.items()}
+        }
+
     def get_asr(self, model_name):
-        if model_name not in self.model_scores:
+        model_id = self.vocabulary.models.ids.get(model_name)
+        if model_id is None:
+            return 0.0
+        _, totals, successes = self._counts()
+        if model_id >= len(totals) or not totals[model_id]:
             return 0.0
-        scores = self.model_scores[model_name]
-        return (scores["successful"] / scores["total_attacks"] * 100) if scores["total_attacks"] > 0 else 0.0
-    
+        return successes[model_id] / totals[model_id] * 100
+
     def get_ranking(self):
+        _, totals, successes = self._counts()
+        cells = self._cells()
+        model_timing = self.model_timing
         ranking = []
-        for model_name in self.model_scores:
-            asr = self.get_asr(model_name)
+        for model_id, model_name in enumerate(list(self.vocabulary.models.values)[:len(totals)]):
+            summary = self.stats(model_name, cells=cells).summary(self.confidence)
             ranking.append({
                 "model": model_name,
-                "asr": asr,
-                "successful": self.model_scores[model_name]["successful"],
-                "total": self.model_scores[model_name]["total_attacks"]
+                "asr": (successes[model_id] / totals[model_id] * 100) if totals[model_id] > 0 else 0.0,
+                "asr_low": summary["asr_low"],
+                "asr_high": summary["asr_high"],
+                "confidence_mean": summary["confidence_mean"],
+                "confidence_std": summary["confidence_std"],
+                "successful": successes[model_id],
+                "total": totals[model_id],
+                "categories": self.breakdown(model_name, "category", cells),
+                "severity": {name: s["n"] for name, s in self.breakdown(model_name, "severity", cells).items()},
+                "timing": model_timing[model_name].summary() if model_name in model_timing else None
             })
         return sorted(ranking, key=lambda x: x["asr"], reverse=True)
-    
+
     def export_to_json(self, filename):
         import json
-        data = {"models": self.model_scores, "ranking": self.get_ranking(), "total_results": len(self.all_results)}
+        models = {m: dict(scores, results=list(scores["results"])) for m, scores in self.model_scores.items()}
+        data = {"models": models, "ranking": self.get_ranking(), "total_results": self.count,
+                "timing": {"models": {m: t.snapshot() for m, t in self.model_timing.items()},
+                           "hosts": {h: t.snapshot() for h, t in self.host_timing.items()}}}
         with open(filename, 'w') as f:
             json.dump(data, f, indent=2)
 
@@ -0,0 +1,214 @@
+"""
+Stage Profiler - sampling profiler with pipeline-stage tags (--profile)
+A daemon thread snapshots the Python stacks of the running threads every few
+milliseconds (sys._current_frames). Every sample is filed under the stage its
+thread was in (load, send, analyze, score, journal, broadcast, report, print),
+set with `with PROFILER.stage("analyze"):`. Output is a collapsed-stack file
+("stage;thread;frame;frame count" per line), ready for flamegraph.pl or
+speedscope, plus per-stage sample shares and wall times for the console.
+
+A sampler is used instead of cProfile because it sees every thread, costs the
+same whatever the call rate, and keeps whole stacks (cProfile only keeps
+caller/callee pairs, which cannot be turned back into a flamegraph).
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+
+DEFAULT_INTERVAL = 0.005        # seconds between samples (200 Hz)
+UNTAGGED = "other"
+
+
+class _Stage:
+    """Context manager tagging the current thread with a stage name"""
+
+    __slots__ = ("profiler", "name", "previous", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        tags = self.profiler._tags
+        ident = threading.get_ident()
+        self.previous = tags.get(ident)
+        tags[ident] = self.name
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        ident = threading.get_ident()
+        if self.previous is None:
+            self.profiler._tags.pop(ident, None)
+        else:
+            self.profiler._tags[ident] = self.previous
+        self.profiler._add_time(self.name, self.previous, elapsed)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _StageWriter:
+    """sys.stdout proxy: console output counts as the 'print' stage"""
+
+    def __init__(self, stream, profiler):
+        self._stream = stream
+        self._profiler = profiler
+
+    def write(self, text):
+        with self._profiler.stage("print"):
+            return self._stream.write(text)
+
+    def flush(self):
+        with self._profiler.stage("print"):
+            return self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class StageProfiler:
+    """Stage-tagged stack sampler; stage() is a no-op while stopped"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()            # collapsed stack -> samples
+        self.stage_samples = Counter()      # stage -> samples
+        self.stage_seconds = defaultdict(float)     # stage -> exclusive wall seconds
+        self.sample_rounds = 0
+        self.running = False
+        self._tags = {}                     # thread ident -> current stage
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stdout = None
+        self._started = None
+        self.duration = 0.0
+
+    def stage(self, name):
+        """with PROFILER.stage("send"): ... (nested stages take the time)"""
+        if not self.running:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def _add_time(self, name, parent, elapsed):
+        with self._lock:
+            self.stage_seconds[name] += elapsed
+            if parent is not None:
+                self.stage_seconds[parent] -= elapsed
+
+    def start(self, interval=None, capture_stdout=True):
+        """Start sampling; console writes are tagged 'print' unless capture_stdout is False"""
+        if self.running:
+            return
+        if interval:
+            self.interval = interval
+        self.running = True
+        self._stop.clear()
+        self._started = time.perf_counter()
+        if capture_stdout:
+            self._stdout = sys.stdout
+            sys.stdout = _StageWriter(sys.stdout, self)
+        self._thread = threading.Thread(target=self._sample_loop, name="stage-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        if self._stdout is not None:
+            sys.stdout = self._stdout
+            self._stdout = None
+        self.running = False
+        self.duration += time.perf_counter() - self._started
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        main = threading.main_thread().ident
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            tags = dict(self._tags)
+            for ident, frame in sys._current_frames().items():
+                # Idle helper threads (health monitor, dashboard server) are left out
+                if ident == own or (ident != main and ident not in tags):
+                    continue
+                stage = tags.get(ident, UNTAGGED)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stack.append(stage)
+                self.samples[";".join(reversed(stack))] += 1
+                self.stage_samples[stage] += 1
+            self.sample_rounds += 1
+
+    def write_collapsed(self, filename):
+        """Write 'frame;frame;... count' lines (flamegraph.pl / speedscope input)"""
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+    def summary(self, top=8):
+        """
+        Per-stage shares and the hottest functions
+
+        Returns:
+            dict: stages (name -> samples, share, seconds), top_functions, samples, duration
+        """
+        total = sum(self.stage_samples.values())
+        stages = {}
+        for name in sorted(set(self.stage_samples) | set(self.stage_seconds),
+                           key=lambda n: -self.stage_samples.get(n, 0)):
+            samples = self.stage_samples.get(name, 0)
+            stages[name] = {
+                "samples": samples,
+                "share": round(samples / total, 4) if total else 0.0,
+                "seconds": round(max(0.0, self.stage_seconds.get(name, 0.0)), 3)
+            }
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            frames = stack.split(";")
+            if len(frames) > 2:
+                leaves[frames[-1]] += count
+        return {
+            "samples": total,
+            "duration": round(self.duration, 3),
+            "stages": stages,
+            "top_functions": [
+                {"function": name, "samples": count, "share": round(count / total, 4)}
+                for name, count in leaves.most_common(top)
+            ]
+        }
+
+    def print_summary(self, filename=None):
+        summary = self.summary()
+        print(f"  🔬 Profile: {summary['samples']} samples over {summary['duration']:.1f}s"
+              + (f" -> {filename}" if filename else ""))
+        for name, stage in summary["stages"].items():
+            print(f"     {name:<10} {stage['share']*100:5.1f}% of samples, {stage['seconds']:.2f}s")
+        if summary["top_functions"]:
+            print("     Hottest functions (self time):")
+            for entry in summary["top_functions"][:5]:
+                print(f"       {entry['share']*100:5.1f}%  {entry['function']}")
+
+
+PROFILER = StageProfiler()
@@ -0,0 +1,50 @@
+"""
+AnalysisPool: worker verdicts equal analyze(), shared-memory segments are freed
+"""
+from multiprocessing import shared_memory
+
+import pytest
+
+import analysis_pipeline
+from analysis_pipeline import AnalysisPool
+from response_analyzer import ResponseAnalyzer
+
+JAILBREAK = "Here's how to bypass it. Step 1: find the exploit. Step 2: get the password. "
+
+
+def test_shared_memory_handoff(monkeypatch):
+    created = []
+
+    class RecordingSharedMemory(shared_memory.SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                created.append(self.name)
+
+    monkeypatch.setattr(analysis_pipeline.shared_memory, "SharedMemory", RecordingSharedMemory)
+    small = "I'm sorry, but I cannot comply with that request."
+    large = JAILBREAK + "żółć filler " * 200
+    pool = AnalysisPool(workers=1, shm_threshold=1024)
+    try:
+        results = [pool.submit(text, "roleplay").result(timeout=60)[0] for text in (small, large)]
+    finally:
+        pool.close()
+
+    analyzer = ResponseAnalyzer()
+    assert results == [analyzer.analyze(small, "roleplay"), analyzer.analyze(large, "roleplay")]
+    assert pool.shared_handoffs == 1 and len(created) == 1
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=created[0])
+
+
+def test_full_queue_blocks_the_producer():
+    pool = AnalysisPool(workers=1, max_pending=1)
+    try:
+        futures = [pool.submit(JAILBREAK * 50) for _ in range(3)]
+        for future in futures:
+            future.result(timeout=60)
+    finally:
+        pool.close()
+    stats = pool.snapshot()
+    assert stats["items"] == 3 and stats["depth"] == 0
+    assert stats["waits"] == 2
@@ -0,0 +1,70 @@
+"""
+AsyncAttackEngine: every cell is delivered once and the in-flight limits hold
+"""
+import asyncio
+
+import async_engine
+from async_engine import AsyncAttackEngine
+from ollama_pool import OllamaHostPool
+from rate_limiter import AdaptiveRateController
+
+
+class FakeAsyncClient:
+    in_flight = {}
+    peak = {}
+
+    def __init__(self, host):
+        self.host = host
+
+    async def generate(self, model, prompt, options=None, keep_alive=None):
+        for key in ("total", model):
+            FakeAsyncClient.in_flight[key] = FakeAsyncClient.in_flight.get(key, 0) + 1
+            FakeAsyncClient.peak[key] = max(FakeAsyncClient.peak.get(key, 0), FakeAsyncClient.in_flight[key])
+        await asyncio.sleep(0.005)
+        for key in ("total", model):
+            FakeAsyncClient.in_flight[key] -= 1
+        if prompt == "boom":
+            raise ValueError("bad request")
+        return {"response": f"{model}: {prompt}", "done": True}
+
+
+def engine(monkeypatch, **kwargs):
+    FakeAsyncClient.in_flight, FakeAsyncClient.peak = {}, {}
+    monkeypatch.setattr(async_engine, "OLLAMA_AVAILABLE", True)
+    monkeypatch.setattr(async_engine.ollama, "AsyncClient", FakeAsyncClient)
+    rate = AdaptiveRateController(initial_rate=10000, initial_concurrency=64)
+    pool = OllamaHostPool(["http://127.0.0.1:11500", "http://127.0.0.1:11501"], rate=rate)
+    for host in pool.hosts:
+        host.healthy = True
+        host.models = {"llama3:latest": None, "mistral:latest": None}
+    return AsyncAttackEngine(pool, **kwargs)
+
+
+def test_every_cell_delivered_once_within_concurrency(monkeypatch):
+    prompts = [{"prompt": f"p{i}"} for i in range(12)] + [{"prompt": "boom"}]
+    cells = AsyncAttackEngine.build_cells(["llama3", "mistral"], prompts)
+    results = []
+    engine(monkeypatch, concurrency=3).run(cells, results.append)
+
+    assert sorted((r["model"], r["index"]) for r in results) == sorted((m, i) for m, i, _ in cells)
+    assert FakeAsyncClient.peak["total"] == 3
+    failed = [r for r in results if r["error"] is not None]
+    assert [(r["model"], r["prompt_data"]["prompt"]) for r in failed] == [("llama3", "boom"), ("mistral", "boom")]
+    assert all(r["response"] is None for r in failed)
+
+
+def test_per_model_limit(monkeypatch):
+    cells = AsyncAttackEngine.build_cells(["llama3", "mistral"], [{"prompt": f"p{i}"} for i in range(8)])
+    results = []
+    engine(monkeypatch, concurrency=6, max_per_model=2).run(cells, results.append)
+    assert len(results) == 16
+    assert FakeAsyncClient.peak["llama3"] <= 2 and FakeAsyncClient.peak["mistral"] <= 2
+
+
+def test_stopped_model_is_skipped(monkeypatch):
+    cells = AsyncAttackEngine.build_cells(["llama3", "mistral"], [{"prompt": "p"}] * 3)
+    results = []
+    attack_engine = engine(monkeypatch, concurrency=2)
+    attack_engine.stopped_models.add("mistral")
+    attack_engine.run(cells, results.append)
+    assert {r["model"] for r in results} == {"llama3"} and len(results) == 3
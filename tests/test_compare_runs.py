@@ -0,0 +1,53 @@
+"""
+compare_runs: exact McNemar p-values, Holm adjustment and paired regressions
+"""
+from math import comb
+
+import pytest
+
+from compare_runs import compare, holm, mcnemar_p
+from results_store import ResultsStore
+
+
+def exact_binomial_two_sided(a, b):
+    n, k = a + b, min(a, b)
+    return min(1.0, 2 * sum(comb(n, i) for i in range(k + 1)) / 2 ** n)
+
+
+@pytest.mark.parametrize("a,b", [(0, 1), (1, 0), (0, 5), (3, 9), (10, 2), (7, 8), (25, 40), (0, 60), (100, 130)])
+def test_mcnemar_matches_exact_binomial(a, b):
+    assert mcnemar_p(a, b) == pytest.approx(exact_binomial_two_sided(a, b), rel=1e-9, abs=1e-15)
+
+
+def test_mcnemar_without_imbalance():
+    assert mcnemar_p(0, 0) == 1.0
+    assert mcnemar_p(4, 4) == 1.0
+
+
+def test_holm():
+    assert holm([0.01, 0.04, 0.03, 0.005]) == pytest.approx([0.03, 0.06, 0.06, 0.02])
+    # Monotone in the sorted order and capped at 1
+    assert holm([0.5, 0.6, 0.001]) == pytest.approx([1.0, 1.0, 0.003])
+    assert holm([]) == []
+
+
+def test_compare_pairs_cells_on_prompt_hash(tmp_path):
+    store = ResultsStore(tmp_path / "results.sqlite")
+    verdicts = {
+        "base": {"p1": False, "p2": False, "p3": True, "dropped": True},
+        "new": {"p1": True, "p2": True, "p3": True, "added": True},
+    }
+    for run, cells in verdicts.items():
+        store.start_run(run, ["llama3"], len(cells))
+        for name, success in cells.items():
+            store.append(run, "llama3", {"prompt": name, "category": "roleplay"}, name,
+                         {"success": success, "confidence": 0.9, "severity": "HIGH"})
+
+    result = compare(store, "base", "new")
+    entry = result["models"]["llama3"]
+    assert (entry["cells"], entry["newly_jailbroken"], entry["newly_refused"]) == (3, 2, 0)
+    assert (entry["only_base"], entry["only_new"]) == (1, 1)
+    assert entry["p"] == pytest.approx(exact_binomial_two_sided(2, 0))
+    assert [r["category"] for r in result["regressions"]] == ["roleplay"]
+    assert sorted(p["attack"] for p in result["new_jailbreaks"]) == ["p1", "p2"]
+    store.close()
@@ -0,0 +1,53 @@
+"""
+metrics: per-thread shards sum to the same totals as a single writer
+"""
+import threading
+
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def run_threads(target, count=8):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_shards_sum_across_threads():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests", ("model",), registry=registry)
+    in_flight = Gauge("in_flight", "In flight", ("host",), registry=registry)
+    latency = Histogram("latency_seconds", "Latency", ("model",), bounds=(0.1, 1.0), registry=registry)
+
+    def work(i):
+        for _ in range(1000):
+            requests.inc("llama3")
+            in_flight.inc("a")
+            latency.observe(0.5, "llama3")
+            in_flight.dec("a")
+        requests.inc("mistral", amount=i)
+
+    run_threads(work)
+    assert requests.values() == {("llama3",): 8000, ("mistral",): sum(range(8))}
+    assert in_flight.values() == {("a",): 0}
+    counts, total = latency.values()[("llama3",)]
+    assert counts == [0, 8000, 0] and total == 4000.0
+    assert len(requests._shards) == 8
+
+
+def test_render_is_prometheus_text():
+    registry = Registry()
+    latency = Histogram("latency_seconds", "Latency", ("model",), bounds=(0.1, 1.0), registry=registry)
+    Counter("errors_total", "Errors", ("type",), registry=registry).inc('Bad "quote"\n')
+    for value in (0.05, 0.5, 2.0):
+        latency.observe(value, "llama3")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{model="llama3",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{model="llama3",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{model="llama3",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{model="llama3"} 3' in lines
+    assert 'latency_seconds_sum{model="llama3"} 2.55' in lines
+    assert 'errors_total{type="Bad \\"quote\\"\\n"} 1' in lines
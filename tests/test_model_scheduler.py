@@ -0,0 +1,74 @@
+"""
+ModelScheduler.can_preload: a preload must not evict a model that is still serving
+"""
+from model_scheduler import DEFAULT_MAX_RESIDENT, ModelScheduler
+
+GB = 1_000_000_000
+
+
+class FakeClient:
+    def __init__(self, models):
+        self.models = models
+        self.generated = []
+
+    def ps(self):
+        return {"models": self.models}
+
+    def generate(self, model, prompt, keep_alive=None):
+        self.generated.append(model)
+        return {"done": True, "load_duration": 0}
+
+
+class FakeHost:
+    url = "http://localhost:11434"
+
+    def __init__(self, models):
+        self.client = FakeClient(models)
+
+
+class FakePool:
+    def __init__(self, host):
+        self.host = host
+
+    def healthy_hosts(self, model=None):
+        return [self.host]
+
+
+def loaded(name, size=4 * GB, size_vram=4 * GB):
+    return {"name": name, "model": name, "size": size, "size_vram": size_vram}
+
+
+def test_one_model_per_host_keeps_serving_model():
+    host = FakeHost([loaded("llama3:latest")])
+    assert ModelScheduler(FakePool(host)).max_resident == DEFAULT_MAX_RESIDENT
+    scheduler = ModelScheduler(FakePool(host), max_resident=1)
+    assert not scheduler.can_preload(host, "mistral", serving=("llama3",))
+    # Once llama3 has no more work it may be unloaded
+    assert scheduler.can_preload(host, "mistral", serving=())
+
+
+def test_idle_resident_model_can_be_evicted():
+    host = FakeHost([loaded("llama3:latest"), loaded("gemma3:latest")])
+    scheduler = ModelScheduler(FakePool(host), max_resident=2)
+    assert scheduler.can_preload(host, "mistral", serving=("llama3",))
+    assert not scheduler.can_preload(host, "mistral", serving=("llama3", "gemma3"))
+
+
+def test_serving_model_spilled_to_cpu_blocks_preload():
+    host = FakeHost([loaded("llama3:latest", size=8 * GB, size_vram=6 * GB)])
+    scheduler = ModelScheduler(FakePool(host), max_resident=4)
+    assert not scheduler.can_preload(host, "mistral", serving=("llama3",))
+    assert scheduler.can_preload(host, "mistral", serving=())
+
+
+def test_skipped_preload_is_retried_when_tail_drains():
+    host = FakeHost([loaded("llama3:latest")])
+    scheduler = ModelScheduler(FakePool(host), preload_tail=5, max_resident=1)
+    scheduler._preloaded.add("mistral")
+    scheduler._preload_or_retry("mistral", ("llama3",))
+    assert host.client.generated == [] and scheduler.skipped_preloads == 1
+    assert "mistral" not in scheduler._preloaded
+
+    scheduler._preloaded.add("mistral")
+    scheduler._preload_or_retry("mistral", ())
+    assert host.client.generated == ["mistral"] and scheduler.preloads == 1
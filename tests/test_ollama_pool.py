@@ -0,0 +1,89 @@
+"""
+OllamaHostPool: model digests, routing, ejection and re-admission
+"""
+from ollama_pool import OllamaHostPool
+
+
+def pool_with(*host_models):
+    pool = OllamaHostPool([f"http://127.0.0.1:{11500 + idx}" for idx in range(len(host_models))])
+    for host, models in zip(pool.hosts, host_models):
+        host.models = dict(models)
+    return pool
+
+
+def test_digest_of_the_serving_host():
+    pool = pool_with({"llama3:latest": "sha256:aaa"}, {"llama3:latest": "sha256:bbb"})
+    assert pool.model_digest("llama3", pool.hosts[0]) == "sha256:aaa"
+    assert pool.model_digest("llama3", pool.hosts[1]) == "sha256:bbb"
+    # Different builds under one tag: no pool-wide digest
+    assert pool.model_digest("llama3") is None
+
+
+def test_digest_when_hosts_agree():
+    pool = pool_with({"llama3:latest": "sha256:aaa"}, {"llama3:latest": "sha256:aaa"}, {"mistral": "sha256:ccc"})
+    assert pool.model_digest("llama3") == "sha256:aaa"
+    assert pool.model_digest("mistral") == "sha256:ccc"
+
+
+def test_no_digest_is_none_not_the_model_name():
+    pool = pool_with({"llama3:latest": None}, {"llama3:latest": "sha256:aaa"})
+    assert pool.model_digest("llama3") is None
+    assert pool.model_digest("gemma3") is None
+
+
+class FakeClient:
+    def __init__(self, models=None):
+        self.models = models
+
+    def list(self):
+        if self.models is None:
+            raise ConnectionError("connection refused")
+        return {"models": [{"model": name, "digest": digest} for name, digest in self.models.items()]}
+
+
+def healthy_pool(count, max_failures=3):
+    pool = pool_with(*[{"llama3:latest": "sha256:aaa"}] * count)
+    pool.max_failures = max_failures
+    for host in pool.hosts:
+        host.healthy = True
+    return pool
+
+
+def test_least_outstanding_routing():
+    pool = healthy_pool(2)
+    first = pool.acquire("llama3")
+    second = pool.acquire("llama3")
+    assert first is not second
+    pool.release(first)
+    assert pool.acquire("llama3") is first
+
+
+def test_host_errors_eject_and_health_check_readmits():
+    pool = healthy_pool(2, max_failures=2)
+    bad, good = pool.hosts
+    for _ in range(2):
+        assert pool.acquire("llama3") is bad
+        pool.release(bad, ConnectionError("connection reset"))
+    assert not bad.healthy and bad.ejections == 1
+    assert [pool.acquire("llama3") for _ in range(3)] == [good] * 3
+
+    bad.client = FakeClient(None)
+    assert not pool.check_host(bad) and not bad.healthy
+    bad.client = FakeClient({"llama3:latest": "sha256:aaa"})
+    assert pool.check_host(bad)
+    assert bad.healthy and bad.consecutive_failures == 0
+    assert pool.acquire("llama3") is bad
+
+
+def test_request_errors_do_not_eject():
+    pool = healthy_pool(1, max_failures=1)
+    host = pool.acquire("llama3")
+    pool.release(host, ValueError("bad prompt"))
+    assert host.healthy and host.consecutive_failures == 0
+
+
+def test_no_healthy_host():
+    pool = healthy_pool(1, max_failures=1)
+    host = pool.acquire("llama3")
+    pool.release(host, ConnectionError("down"))
+    assert pool.acquire("llama3") is None
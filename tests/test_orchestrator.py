@@ -0,0 +1,17 @@
+"""
+FrameworkOrchestrator.run_full_test: --profile cleans up on every exit path
+"""
+import sys
+
+from main_orchestrator_FINAL import FrameworkOrchestrator
+from stage_profiler import PROFILER
+
+
+def test_profile_written_when_host_unreachable(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stdout = sys.stdout
+    orchestrator = FrameworkOrchestrator(hosts="http://127.0.0.1:9", profile=True)
+    orchestrator.run_full_test(["llama3"], 1)
+    assert sys.stdout is stdout
+    assert not PROFILER.running
+    assert (tmp_path / "outputs" / "profile.collapsed").exists()
@@ -0,0 +1,77 @@
+"""
+AdaptiveRateController: output length must not look like congestion
+"""
+import random
+
+from rate_limiter import AdaptiveRateController, queueing_delay
+
+
+HOST = "http://localhost:11434"
+NS = 1e9
+
+
+def ollama_response(generation, queued=0.0, network=0.01):
+    """(wall, response) of a request that generated for `generation` seconds"""
+    response = {
+        "load_duration": int(0.002 * NS),
+        "prompt_eval_duration": int(0.02 * NS),
+        "eval_duration": int(generation * NS),
+        "eval_count": int(generation * 50)
+    }
+    response["total_duration"] = response["load_duration"] + response["prompt_eval_duration"] \
+        + response["eval_duration"] + int(queued * NS)
+    return 0.022 + generation + queued + network, response
+
+
+def test_queueing_delay_excludes_load_and_generation():
+    wall, response = ollama_response(3.0, queued=0.5)
+    assert abs(queueing_delay(wall, response) - 0.51) < 1e-6
+    assert queueing_delay(wall, None) is None
+    assert queueing_delay(wall, {"done": True}) is None
+
+
+def test_mixed_short_and_long_responses_do_not_collapse_rate():
+    # 60% refusals (~0.3 s) and 40% full completions (~3.0 s), no queueing
+    controller = AdaptiveRateController(decrease_interval=0.0)
+    rng = random.Random(7)
+    for _ in range(400):
+        controller._try_acquire(HOST)
+        wall, response = ollama_response(0.3 if rng.random() < 0.6 else 3.0)
+        controller.release(HOST, wall, response=response)
+
+    state = controller.snapshot()[HOST]
+    assert state["slow"] == 0
+    assert state["rate"] == controller.max_rate
+    assert state["concurrency"] == controller.max_concurrency
+
+
+def test_uniform_latency_spread_keeps_window_open():
+    controller = AdaptiveRateController(decrease_interval=0.0, max_concurrency=8)
+    rng = random.Random(11)
+    for _ in range(200):
+        wall, response = ollama_response(rng.uniform(0.05, 0.6))
+        controller.release(HOST, wall, response=response)
+    assert controller.snapshot()[HOST]["concurrency"] == 8
+
+
+def test_queueing_delay_decreases_rate():
+    controller = AdaptiveRateController(decrease_interval=0.0)
+    for _ in range(20):
+        wall, response = ollama_response(0.3)
+        controller.release(HOST, wall, response=response)
+    healthy = controller.current_rate(HOST)
+    for _ in range(10):
+        wall, response = ollama_response(0.3, queued=2.0)
+        controller.release(HOST, wall, response=response)
+    state = controller.snapshot()[HOST]
+    assert state["slow"] > 0
+    assert state["rate"] < healthy
+
+
+def test_errors_decrease_rate_without_durations():
+    controller = AdaptiveRateController(decrease_interval=0.0)
+    controller.release(HOST, 0.5, error=ConnectionError("refused"))
+    assert controller.current_rate(HOST) == controller.initial_rate * controller.decrease
+    # Wall time alone (no Ollama durations) is not a congestion signal
+    controller.release(HOST, 30.0)
+    assert controller.snapshot()[HOST]["slow"] == 0
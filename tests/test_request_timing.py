@@ -0,0 +1,43 @@
+"""
+request_timing / TimingStats: aborted streams stay out of the latency histograms
+"""
+from request_timing import Histogram, LATENCY_BOUNDS, TimingStats, request_timing
+
+NS = 1e9
+
+
+def complete(wall):
+    return request_timing({"total_duration": int((wall - 0.01) * NS), "eval_duration": int((wall - 0.05) * NS),
+                           "eval_count": 100, "prompt_eval_duration": int(0.03 * NS)}, wall)
+
+
+def test_aborted_streams_not_in_wall_histogram():
+    stats = TimingStats()
+    for _ in range(10):
+        stats.add(complete(2.0))
+    for _ in range(30):
+        stats.add(request_timing(None, 0.2, ttft=0.1))
+    summary = stats.summary()
+    assert summary["requests"] == 40 and summary["aborted"] == 30
+    assert stats.histograms["wall"].count == 10
+    assert stats.histograms["aborted_wall"].count == 30
+    assert summary["wall_p50"] > 1.0
+    assert summary["aborted_wall_p50"] < 0.25
+
+
+def test_merge_matches_single_stats():
+    single, left, right = TimingStats(), TimingStats(), TimingStats()
+    records = [complete(0.1 * i) for i in range(1, 20)] + [request_timing(None, 0.3)] * 4
+    for idx, record in enumerate(records):
+        single.add(record)
+        (left if idx % 2 else right).add(record)
+    assert left.merge(right).summary() == single.summary()
+
+
+def test_histogram_quantile_within_bucket_bounds():
+    histogram = Histogram(LATENCY_BOUNDS)
+    for value in (0.02, 0.03, 0.04, 3.0):
+        histogram.add(value)
+    assert 0.01 <= histogram.quantile(0.5) <= 0.05
+    assert histogram.quantile(1.0) == 3.0
+    assert Histogram(LATENCY_BOUNDS).quantile(0.5) is None
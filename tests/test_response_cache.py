@@ -0,0 +1,26 @@
+"""
+ResponseCache: size accounting must match the bytes on disk
+"""
+from response_cache import ResponseCache
+
+
+def disk_size(cache):
+    return sum(p.stat().st_size for p in cache.directory.glob("*/*.json"))
+
+
+def test_overwrite_does_not_grow_size(tmp_path):
+    cache = ResponseCache(directory=tmp_path, max_bytes=10_000)
+    key = ResponseCache.key("sha256:abc", "prompt", {"temperature": 0.7})
+    for idx in range(100):
+        cache.put(key, f"response {idx} " * 10, model="llama3")
+    assert cache.stats()["size_bytes"] == disk_size(cache)
+    assert cache.evictions == 0
+    assert cache.get(key) == "response 99 " * 10
+
+
+def test_size_bound_evicts_distinct_keys(tmp_path):
+    cache = ResponseCache(directory=tmp_path, max_bytes=2_000)
+    for idx in range(50):
+        cache.put(ResponseCache.key("sha256:abc", f"prompt {idx}", {}), "x" * 100)
+    assert cache.evictions > 0
+    assert cache.stats()["size_bytes"] == disk_size(cache) <= 2_000
@@ -0,0 +1,63 @@
+"""
+ResultsStore: batched appends land once per cell and are queryable across runs
+"""
+from results_store import ResultsStore
+from run_journal import RunJournal, prompt_hash
+
+
+def verdict(success, severity="HIGH"):
+    return {"success": success, "confidence": 0.9, "severity": severity}
+
+
+def prompt(name, category="roleplay"):
+    return {"prompt": f"text of {name}", "name": name, "category": category}
+
+
+def test_buffered_appends_and_query(tmp_path):
+    store = ResultsStore(tmp_path / "results.sqlite", batch_size=100, flush_seconds=3600)
+    store.start_run("run1", ["llama3", "mistral"], 2)
+    store.append("run1", "llama3", prompt("a1"), "a1", verdict(False), response="no")
+    store.append("run1", "llama3", prompt("a1"), "a1", verdict(True, "CRITICAL"), response="sure")
+    store.append("run1", "mistral", prompt("a2", "encoding"), "a2", verdict(False), response="no")
+    assert store._buffer and store.flush() == 3 and not store._buffer
+
+    # A later result for the same cell replaces the earlier one
+    assert len(store.query(runs=["run1"])) == 2
+    assert store.query(model="llama3", with_text=True)[0]["response"] == "sure"
+    assert [r["attack"] for r in store.query(success=True)] == ["a1"]
+    assert [r["model"] for r in store.query(category="encoding")] == ["mistral"]
+    assert store.query(severity="CRITICAL", with_text=True)[0]["prompt"] == "text of a1"
+    assert store.summary("run1") == {"llama3": {"roleplay": (1, 1)}, "mistral": {"encoding": (1, 0)}}
+    store.close()
+
+
+def test_flips_between_runs(tmp_path):
+    store = ResultsStore(tmp_path / "results.sqlite")
+    for run, outcomes in (("base", (False, True)), ("new", (True, True))):
+        store.start_run(run, ["llama3"], 2)
+        for name, success in zip(("a1", "a2"), outcomes):
+            store.append(run, "llama3", prompt(name), name, verdict(success))
+    [flip] = store.flips("base", "new")
+    assert (flip["attack"], flip["base_success"], flip["new_success"]) == ("a1", False, True)
+    [pair] = store.paired("base", "new")
+    assert (pair["cells"], pair["newly_jailbroken"], pair["newly_refused"]) == (2, 1, 0)
+    store.close()
+
+
+def test_import_journal_adds_only_missing_cells(tmp_path):
+    journal = RunJournal("20250101-000000", directory=tmp_path / "runs")
+    journal.start(["llama3"], 2)
+    journal.append("llama3", prompt("a1"), "a1", verdict(False), 10)
+    journal.append("llama3", prompt("a1"), "a1", verdict(True), 10)
+    journal.append("llama3", prompt("a2"), "a2", verdict(False), 10)
+    journal.close()
+
+    store = ResultsStore(tmp_path / "results.sqlite")
+    store.start_run(journal.run_id, ["llama3"], 2)
+    store.append(journal.run_id, "llama3", prompt("a2"), "a2", verdict(False), response="stored")
+    assert store.import_journal(journal) == 1
+    rows = {r["prompt_hash"]: r for r in store.query(with_text=True)}
+    assert rows[prompt_hash("text of a1")]["success"] is True
+    assert rows[prompt_hash("text of a2")]["response"] == "stored"
+    assert store.import_journal(journal) == 0
+    store.close()
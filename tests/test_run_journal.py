@@ -0,0 +1,83 @@
+"""
+RunJournal: a torn last line from a crash must not swallow the next record
+"""
+from run_journal import RunJournal
+
+
+def result(journal, name, success=True):
+    journal.append("llama3", {"prompt": name, "category": "roleplay"}, name,
+                   {"success": success, "confidence": 0.9, "severity": "HIGH"}, 120)
+
+
+def test_append_after_torn_write(tmp_path):
+    journal = RunJournal("20250101-000000", directory=tmp_path)
+    journal.start(["llama3"], 3)
+    result(journal, "first")
+    journal.close()
+
+    # Crash in the middle of the second append: no trailing newline
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "result", "model": "llama3", "prompt_ha')
+
+    resumed = RunJournal("20250101-000000", directory=tmp_path)
+    assert len(resumed.manifest()) == 1
+    result(resumed, "second", success=False)
+    result(resumed, "third")
+    resumed.close()
+
+    records = list(RunJournal("20250101-000000", directory=tmp_path).records())
+    assert [r.get("attack") for r in records] == [None, "first", "second", "third"]
+    assert journal.path.read_text(encoding='utf-8').endswith("}\n")
+
+
+def test_torn_first_line(tmp_path):
+    journal = RunJournal("20250101-000001", directory=tmp_path)
+    tmp_path.joinpath(journal.path.name).write_text('{"type": "ru', encoding='utf-8')
+    journal.start(["llama3"], 1)    # header exists (torn) -> not rewritten
+    result(journal, "only")
+    journal.close()
+    assert [r["attack"] for r in journal.records()] == ["only"]
+
+
+def test_intact_journal_is_not_truncated(tmp_path):
+    journal = RunJournal("20250101-000002", directory=tmp_path)
+    journal.start(["llama3"], 2)
+    result(journal, "first")
+    journal.close()
+    size = journal.path.stat().st_size
+
+    result(journal, "second")
+    journal.close()
+    assert journal.path.stat().st_size > size
+    assert len(list(journal.records())) == 3
+
+
+def test_runs_in_the_same_second_get_their_own_journal(tmp_path):
+    first = RunJournal(directory=tmp_path)
+    second = RunJournal(directory=tmp_path)
+    assert first.run_id != second.run_id
+    first.start(["llama3"], 1)
+    second.start(["mistral"], 1)
+    assert first.header()["models"] == ["llama3"]
+    assert second.header()["models"] == ["mistral"]
+
+
+class Scoring:
+    def __init__(self):
+        self.results = []
+
+    def add_result(self, **kwargs):
+        self.results.append(kwargs)
+
+
+def test_replay_keeps_the_record_manifest_keeps(tmp_path):
+    journal = RunJournal("20250101-000003", directory=tmp_path)
+    journal.start(["llama3"], 1)
+    result(journal, "retried", success=False)
+    result(journal, "retried", success=True)
+    journal.close()
+
+    scoring = Scoring()
+    completed = journal.replay_into(scoring)
+    assert [r["success"] for r in scoring.results] == [True]
+    assert completed == {cell: r["success"] for cell, r in journal.manifest().items()}
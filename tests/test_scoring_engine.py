@@ -0,0 +1,100 @@
+"""
+ScoringEngine: columnar rows read back as the dicts the reporters expect;
+sharded writers give the same aggregates as a single writer
+"""
+import random
+import statistics
+import threading
+
+import pytest
+
+from scoring_engine import Accumulator, ResultColumns, ScoringEngine
+
+
+def add(engine, model, attack, success, confidence=0.8, severity="HIGH", length=100, category="generic"):
+    engine.add_result(model_name=model, attack_name=attack, success=success, confidence=confidence,
+                      severity=severity, response_length=length, category=category)
+
+
+def test_columns_round_trip():
+    columns = ResultColumns()
+    for row in range(20):
+        columns.append(row, "llama3", f"a{row}", row % 3 == 0, 0.25 * (row % 4), "CRITICAL", 10 * row, "roleplay")
+    assert columns.count == 20
+    assert [columns.success(row) for row in range(20)] == [row % 3 == 0 for row in range(20)]
+    assert columns.row(7) == {"attack": "a7", "category": "roleplay", "success": False,
+                              "confidence": 0.75, "severity": "CRITICAL", "response_length": 70}
+
+
+def test_views_match_added_results():
+    engine = ScoringEngine(shards=1)
+    added = [("llama3", "a1", True), ("mistral", "a1", False), ("llama3", "a2", False), ("llama3", "a3", True)]
+    for model, attack, success in added:
+        add(engine, model, attack, success)
+
+    assert [(r["model"], r["attack"], r["success"]) for r in engine.all_results] == added
+    scores = engine.model_scores["llama3"]
+    assert scores["successful"] == 2 and scores["total_attacks"] == 3
+    assert [r["attack"] for r in scores["results"]] == ["a1", "a2", "a3"]
+    assert scores["results"][0] == {"attack": "a1", "category": "generic", "success": True,
+                                    "confidence": 0.8, "severity": "HIGH", "response_length": 100}
+    assert list(engine.model_scores) == ["llama3", "mistral"]
+    assert engine.get_asr("llama3") == 2 / 3 * 100 and engine.get_asr("gemma3") == 0.0
+    assert [m["model"] for m in engine.get_ranking()] == ["llama3", "mistral"]
+
+
+def test_chan_merge_equals_single_pass_welford():
+    rng = random.Random(1)
+    values = [(rng.random() < 0.4, rng.random()) for _ in range(1000)]
+    single = Accumulator()
+    for success, confidence in values:
+        single.add(success, confidence)
+
+    parts = [Accumulator() for _ in range(7)]
+    for idx, (success, confidence) in enumerate(values):
+        parts[idx * 7 // len(values)].add(success, confidence)
+    merged = Accumulator().merge(Accumulator())
+    for part in parts + [Accumulator()]:
+        merged.merge(part)
+
+    assert (merged.n, merged.successes) == (single.n, single.successes)
+    assert merged.mean == pytest.approx(single.mean, rel=1e-12)
+    assert merged.m2 == pytest.approx(single.m2, rel=1e-9)
+    assert merged.std() == pytest.approx(statistics.stdev(c for _, c in values), rel=1e-9)
+
+
+def test_concurrent_writers_match_one_writer():
+    rows = [(f"m{i % 3}", f"a{i}", i % 4 == 0, (i % 10) / 10, ("LOW", "HIGH")[i % 2], ("x", "y")[i % 5 == 0])
+            for i in range(4000)]
+    single = ScoringEngine(shards=1)
+    for model, attack, success, confidence, severity, category in rows:
+        add(single, model, attack, success, confidence, severity, category=category)
+
+    sharded = ScoringEngine(shards=4)
+
+    def write(part):
+        for model, attack, success, confidence, severity, category in rows[part::8]:
+            add(sharded, model, attack, success, confidence, severity, category=category)
+
+    threads = [threading.Thread(target=write, args=(part,)) for part in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sharded.count == 4000 and sum(1 for shard in sharded.shards if shard.columns.count) > 1
+    attacks = [r["attack"] for r in sharded.all_results]
+    assert sorted(attacks) == sorted(attack for _, attack, *_ in rows)
+    # Rows come back in insertion order, so each writer's rows keep their order
+    position = {attack: idx for idx, attack in enumerate(attacks)}
+    for part in range(8):
+        order = [position[attack] for _, attack, *_ in rows[part::8]]
+        assert order == sorted(order)
+
+    ranking = {m["model"]: m for m in sharded.get_ranking()}
+    for expected in single.get_ranking():
+        actual = ranking[expected["model"]]
+        for key in ("asr", "successful", "total", "categories", "severity"):
+            assert expected[key] == actual[key]
+        assert expected["confidence_mean"] == pytest.approx(actual["confidence_mean"], abs=1e-4)
+        assert expected["confidence_std"] == pytest.approx(actual["confidence_std"], abs=1e-4)
@@ -0,0 +1,53 @@
+"""
+WorkQueue: expired leases are re-claimed and only the current holder may complete
+"""
+from work_queue import WorkQueue
+
+RESULT = {"success": True, "confidence": 0.9, "severity": "HIGH", "response_length": 120}
+
+
+def queue_with(tmp_path, prompts=2, max_attempts=3):
+    queue = WorkQueue(tmp_path / "queue.sqlite", max_attempts=max_attempts)
+    queue.create_run("run", ["llama3"], [{"prompt": f"p{i}", "name": f"a{i}"} for i in range(prompts)])
+    return queue
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = queue_with(tmp_path, prompts=1)
+    [task] = queue.lease("run", "w1", lease_seconds=-1)
+    assert queue.lease("run", "w2", lease_seconds=60)[0]["id"] == task["id"]
+
+    # The presumed-dead worker cannot overwrite the new holder's result
+    assert not queue.complete(task["id"], "w1", dict(RESULT, success=False))
+    assert queue.complete(task["id"], "w2", RESULT)
+    assert queue.counts("run") == {"queued": 0, "leased": 0, "done": 1, "failed": 0}
+    assert [result["success"] for _, _, result in queue.results("run")] == [True]
+    queue.close()
+
+
+def test_live_lease_is_not_taken(tmp_path):
+    queue = queue_with(tmp_path, prompts=1)
+    [task] = queue.lease("run", "w1", lease_seconds=-1)
+    assert queue.extend("w1", lease_seconds=60) == 1
+    assert queue.lease("run", "w2") == []
+    assert queue.complete(task["id"], "w1", RESULT)
+    queue.close()
+
+
+def test_task_fails_after_max_attempts(tmp_path):
+    queue = queue_with(tmp_path, prompts=1, max_attempts=2)
+    [task] = queue.lease("run", "w1", lease_seconds=-1)
+    assert queue.lease("run", "w2", lease_seconds=-1)[0]["attempts"] == 2
+    assert queue.lease("run", "w3") == []
+    assert queue.counts("run")["failed"] == 1
+    assert queue.failures("run") == [{"model": "llama3", "name": "a0", "error": "lease expired", "attempts": 2}]
+    queue.close()
+
+
+def test_create_run_keeps_existing_cells(tmp_path):
+    queue = queue_with(tmp_path, prompts=2)
+    [task] = queue.lease("run", "w1")
+    queue.complete(task["id"], "w1", RESULT)
+    assert queue.create_run("run", ["llama3"], [{"prompt": f"p{i}", "name": f"a{i}"} for i in range(3)]) == 1
+    assert queue.counts("run") == {"queued": 2, "leased": 0, "done": 1, "failed": 0}
+    queue.close()
@@ -1,6 +1,8 @@
 import json
 from pathlib import Path
 
+from prompt_sampling import sample_prompts
+
 class UnifiedPromptDB:
     def __init__(self):
         self.prompts = {}
@@ -19,9 +21,15 @@ class UnifiedPromptDB:
         return self.prompts
     
     def get_by_index(self, start, end):
+        # File order (paging); use sample() to pick a representative subset
         items = list(self.prompts.items())
         return dict(items[start:end])
     
+    def sample(self, count, seed=0):
+        """count prompts stratified by source file, length and category (see prompt_sampling.py)"""
+        keyed = [{'key': key, 'prompt': text} for key, text in self.prompts.items()]
+        return {item['key']: item['prompt'] for item in sample_prompts(keyed, count, seed=seed)}
+    
     def count(self):
         return len(self.prompts)
 
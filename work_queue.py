@@ -0,0 +1,330 @@
+"""
+Work Queue - persistent (model x prompt) task queue shared by a worker fleet
+Tasks live in one SQLite file (WAL mode, so readers never block the writer).
+Workers lease a few tasks at a time; a lease expires unless the worker keeps
+extending it, and expired tasks go back to the queue (or fail after
+max_attempts leases). Results are only accepted from the current lease holder,
+so a worker that was presumed dead cannot overwrite a newer result.
+
+Workers on other machines can share the file over a network filesystem, or
+talk to QueueServer (small JSON-over-HTTP front end) through RemoteQueue,
+which has the same methods as WorkQueue.
+"""
+import json
+import sqlite3
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from run_journal import prompt_hash
+from scoring_engine import ScoringEngine
+
+
+QUEUE_PATH = Path("outputs") / "fleet" / "queue.sqlite"
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    models TEXT NOT NULL,
+    attack_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    finished REAL,
+    UNIQUE (run_id, model, prompt_hash)
+);
+CREATE INDEX IF NOT EXISTS tasks_by_state ON tasks (run_id, state, model, position);
+CREATE INDEX IF NOT EXISTS tasks_by_worker ON tasks (worker, state);
+"""
+
+STATES = ("queued", "leased", "done", "failed")
+
+
+class WorkQueue:
+    """SQLite-backed task queue; safe across threads and processes"""
+
+    def __init__(self, path=QUEUE_PATH, max_attempts=MAX_ATTEMPTS):
+        """
+        Args:
+            path (str|Path): Queue file (created if missing)
+            max_attempts (int): Leases per task before it is marked failed
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # Transactions are explicit (BEGIN IMMEDIATE) so leases are atomic across processes
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Coordinator side
+    # ------------------------------------------------------------------
+    def create_run(self, run_id, models, prompts):
+        """
+        Expand the (model x prompt) matrix into queued tasks
+
+        Returns:
+            int: Tasks added (cells already queued for this run are kept as they are)
+        """
+        with self._transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO runs (run_id, created, models, attack_count) VALUES (?, ?, ?, ?)",
+                         (run_id, time.time(), json.dumps(models), len(prompts)))
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (run_id, model, prompt_hash, position, prompt) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, model, prompt_hash(prompt_data.get('prompt', '')), position,
+                  json.dumps(prompt_data, ensure_ascii=False))
+                 for model in models
+                 for position, prompt_data in enumerate(prompts, 1)]
+            )
+            return conn.total_changes - before
+
+    def run_info(self, run_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        return {"run_id": row["run_id"], "created": row["created"],
+                "models": json.loads(row["models"]), "attack_count": row["attack_count"]}
+
+    def latest_run(self):
+        with self._lock:
+            row = self._conn.execute("SELECT run_id FROM runs ORDER BY created DESC LIMIT 1").fetchone()
+        return row["run_id"] if row else None
+
+    def counts(self, run_id):
+        """Tasks per state, e.g. {"queued": 10, "leased": 4, "done": 86, "failed": 0}"""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) AS n FROM tasks WHERE run_id = ? GROUP BY state",
+                                      (run_id,)).fetchall()
+        counts = dict.fromkeys(STATES, 0)
+        counts.update({row["state"]: row["n"] for row in rows})
+        return counts
+
+    def results(self, run_id):
+        """(model, prompt_data, result) for every finished task, in matrix order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT model, prompt, result FROM tasks WHERE run_id = ? AND state = 'done' ORDER BY model, position",
+                (run_id,)
+            ).fetchall()
+        return [(row["model"], json.loads(row["prompt"]), json.loads(row["result"])) for row in rows]
+
+    def failures(self, run_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT model, prompt, error, attempts FROM tasks WHERE run_id = ? AND state = 'failed' "
+                "ORDER BY model, position", (run_id,)
+            ).fetchall()
+        return [{"model": row["model"], "name": json.loads(row["prompt"]).get("name"),
+                 "error": row["error"], "attempts": row["attempts"]} for row in rows]
+
+    def scoring(self, run_id):
+        """Aggregated ScoringEngine over all results written by the fleet"""
+        scoring = ScoringEngine()
+        for model, prompt_data, result in self.results(run_id):
+            scoring.add_result(
+                model_name=model,
+                attack_name=prompt_data.get('name', ''),
+                success=result['success'],
+                confidence=result['confidence'],
+                severity=result['severity'],
+                response_length=result['response_length'],
+                category=prompt_data.get('category', 'generic')
+            )
+            if result.get('timing'):
+                scoring.add_timing(model, result['timing'])
+        return scoring
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+    def lease(self, run_id, worker, count=1, lease_seconds=LEASE_SECONDS, prefer_model=None):
+        """
+        Take up to `count` queued tasks; expired leases are re-queued first
+
+        Args:
+            prefer_model (str, optional): Model the worker already has loaded
+
+        Returns:
+            list: dicts with id, model, prompt_data, attempts
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "error = COALESCE(error, 'lease expired'), worker = NULL, lease_expires = NULL "
+                "WHERE run_id = ? AND state = 'leased' AND lease_expires < ?",
+                (self.max_attempts, run_id, now)
+            )
+            rows = conn.execute(
+                "SELECT id, model, prompt, attempts FROM tasks WHERE run_id = ? AND state = 'queued' "
+                "ORDER BY model = ? DESC, model, position LIMIT ?",
+                (run_id, prefer_model, count)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                [(worker, now + lease_seconds, row["id"]) for row in rows]
+            )
+        return [{"id": row["id"], "model": row["model"], "prompt_data": json.loads(row["prompt"]),
+                 "attempts": row["attempts"] + 1} for row in rows]
+
+    def extend(self, worker, lease_seconds=LEASE_SECONDS):
+        """Heartbeat: push back the expiry of every task leased by `worker`"""
+        with self._transaction() as conn:
+            return conn.execute("UPDATE tasks SET lease_expires = ? WHERE worker = ? AND state = 'leased'",
+                                (time.time() + lease_seconds, worker)).rowcount
+
+    def complete(self, task_id, worker, result):
+        """Store a result; False if the lease was lost (the task belongs to someone else now)"""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET state = 'done', result = ?, error = NULL, finished = ?, lease_expires = NULL "
+                "WHERE id = ? AND state = 'leased' AND worker = ?",
+                (json.dumps(result), time.time(), task_id, worker)
+            ).rowcount == 1
+
+    def fail(self, task_id, worker, error):
+        """Give a task back after an error; it fails for good after max_attempts"""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "error = ?, worker = NULL, lease_expires = NULL "
+                "WHERE id = ? AND state = 'leased' AND worker = ?",
+                (self.max_attempts, str(error)[:500], task_id, worker)
+            ).rowcount == 1
+
+
+class _QueueHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        queue = self.server.queue
+        run_id = parse_qs(url.query).get("run", [None])[0] or self.server.run_id
+        if url.path == "/status":
+            self._reply({"run_id": run_id, "counts": queue.counts(run_id)})
+        elif url.path == "/run":
+            self._reply(queue.run_info(run_id))
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        queue = self.server.queue
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._reply({"error": f"invalid JSON: {e}"}, 400)
+            return
+        run_id = request.get("run_id") or self.server.run_id
+        path = urlparse(self.path).path
+        if path == "/lease":
+            self._reply(queue.lease(run_id, request["worker"], request.get("count", 1),
+                                    request.get("lease_seconds", LEASE_SECONDS), request.get("prefer_model")))
+        elif path == "/extend":
+            self._reply(queue.extend(request["worker"], request.get("lease_seconds", LEASE_SECONDS)))
+        elif path == "/complete":
+            self._reply(queue.complete(request["id"], request["worker"], request["result"]))
+        elif path == "/fail":
+            self._reply(queue.fail(request["id"], request["worker"], request.get("error", "")))
+        else:
+            self.send_error(404)
+
+
+def serve_queue(queue, run_id, port, host="0.0.0.0"):
+    """Expose a WorkQueue to remote workers from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _QueueHandler)
+    server.daemon_threads = True
+    server.queue = queue
+    server.run_id = run_id
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class RemoteQueue:
+    """WorkQueue client for a coordinator started with --serve"""
+
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode('utf-8')
+        request = urllib.request.Request(self.url + path, data=data,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def latest_run(self):
+        return self._call("/status")["run_id"]
+
+    def run_info(self, run_id):
+        return self._call(f"/run?run={run_id}")
+
+    def counts(self, run_id):
+        return self._call(f"/status?run={run_id}")["counts"]
+
+    def lease(self, run_id, worker, count=1, lease_seconds=LEASE_SECONDS, prefer_model=None):
+        return self._call("/lease", {"run_id": run_id, "worker": worker, "count": count,
+                                     "lease_seconds": lease_seconds, "prefer_model": prefer_model})
+
+    def extend(self, worker, lease_seconds=LEASE_SECONDS):
+        return self._call("/extend", {"worker": worker, "lease_seconds": lease_seconds})
+
+    def complete(self, task_id, worker, result):
+        return self._call("/complete", {"id": task_id, "worker": worker, "result": result})
+
+    def fail(self, task_id, worker, error):
+        return self._call("/fail", {"id": task_id, "worker": worker, "error": str(error)})
+
+    def close(self):
+        pass